@@ -1,42 +1,52 @@
 import json
 import os
-from collections import defaultdict
+from collections import Counter, defaultdict
 from datetime import datetime
+from itertools import chain
+from item_store import ItemStore
+from records import KeepaProduct, SoldItem, load_json
+import columnar_snapshot
 
 # Paths
-SOLD_ITEMS_FILE = "/Users/stephentaykor/Desktop/flipper_Simulation/my_items_recent/sold_items.json"
-ACTIVE_ITEMS_FILE = "/Users/stephentaykor/Desktop/flipper_Simulation/my_items_recent/items.json"
+STORE_FILE = "/Users/stephentaykor/Desktop/flipper_Simulation/my_items_safe/flipper_items.sqlite"
 KEEPA_SOLD_DATA = "/Users/stephentaykor/Desktop/flipper_Simulation/my_items_safe/keepa_sold_data.json"
 OUTPUT_FILE = "/Users/stephentaykor/Desktop/flipper_Simulation/my_items_recent/scored_combined_items.json"
+SNAPSHOT_MAX_AGE = 6 * 3600  # use the Parquet snapshot for trend learning if it is this fresh
+TREND_COLUMNS = ["item_id", "category", "price", "sold_price", "duration", "url"]
 
-# Load data
-sold_items = []
-if os.path.exists(SOLD_ITEMS_FILE):
-    with open(SOLD_ITEMS_FILE, 'r') as f:
-        sold_items = json.load(f)
-
-active_items = []
-if os.path.exists(ACTIVE_ITEMS_FILE):
-    with open(ACTIVE_ITEMS_FILE, 'r') as f:
-        active_items = json.load(f)
+# Load data (item store holds both the safe and recent feeds).
+# Sold and active rows are streamed as slot records (see records.py) — never held as dict lists
+store = ItemStore(STORE_FILE)
 
 keepa_items = []
 if os.path.exists(KEEPA_SOLD_DATA):
-    with open(KEEPA_SOLD_DATA, 'r') as f:
-        keepa_items = json.load(f)
+    keepa_items = load_json(KEEPA_SOLD_DATA, KeepaProduct)
+keepa_volume = Counter(p.item_id for p in keepa_items)  # Approx volume per Keepa id
+
+def snapshot_sold():
+    # Only the trend columns are mapped in — not every field of every sold listing
+    table = columnar_snapshot.read("sold", TREND_COLUMNS)
+    print(f"📦 Trends from columnar snapshot ({table.num_rows} sold rows)")
+    for batch in table.to_batches():
+        for r in batch.to_pylist():
+            yield SoldItem(r["item_id"], r["duration"], price=r["price"], sold_price=r["sold_price"],
+                           url=r["url"], category=r["category"] or "")
 
 # Combine sold and keepa data for learning
-all_sold = sold_items + keepa_items
+if columnar_snapshot.available("sold", max_age=SNAPSHOT_MAX_AGE):
+    learn_from = chain(snapshot_sold(), keepa_items)
+else:
+    learn_from = chain(store.sold(typed=True, cold=True), keepa_items)  # long tail matters for trends
 category_trends = defaultdict(lambda: {"total_profit": 0, "count": 0, "avg_profit": 0, "sales_volume": 0, "avg_duration": 0})
 
-for item in all_sold:
-    if item.get("sold") or ("sold_price" in item and item.get("sold_price")):  # Handle both formats
-        category = item.get("categoryPath", "").lower()
-        profit = float(item.get("sold_price", 0)) - float(item.get("price", 0)) if "price" in item else 0
-        duration = int(item.get("duration", "1 day").split()[0]) if item.get("duration") else 1
+for item in learn_from:
+    if item.sold or item.sold_price:  # Handle both formats
+        category = (item.category or "").lower()
+        profit = (item.sold_price or 0) - (item.price or 0) if item.price is not None else 0
+        duration = int(item.duration.split()[0]) if item.duration else 1
         count = 1  # Assume 1 sale per item from sold_items
-        if "keepa_sold_data" in item.get("url", ""):  # Keepa data
-            count = sum(1 for entry in keepa_items if entry["item_id"] == item["item_id"])  # Approx volume
+        if "keepa_sold_data" in (item.url or ""):  # Keepa data
+            count = keepa_volume[item.item_id]
         category_trends[category]["total_profit"] += profit
         category_trends[category]["count"] += count
         category_trends[category]["sales_volume"] += count
@@ -48,34 +58,52 @@ for cat, data in category_trends.items():
         data["avg_duration"] = data["avg_duration"] / data["count"]
 
 # Score active items using enhanced trends
-scored_active = []
-for item in active_items:
-    category = item.get("categoryPath", "").lower()
-    trend = category_trends.get(category, {"total_profit": 0, "count": 0, "avg_profit": 0, "sales_volume": 0, "avg_duration": 0})
-    
-    # Estimate profit with trend or 30% margin fallback
-    estimated_profit = trend["avg_profit"] or (float(item.get("price", 0)) * 0.3)
-    
-    # Confidence based on volume and duration
-    confidence = 0.5
-    if trend["sales_volume"] > 5:  # High sales volume boosts confidence
-        confidence += 0.2
-    if trend["avg_duration"] < 7:  # Faster sales = higher confidence
-        confidence += 0.1
-    if "electronics" in category or "laptops" in category:
-        confidence = min(0.9, confidence + 0.1)  # Cap at 0.9
-    
-    score = estimated_profit * confidence
-    item["profit"] = estimated_profit
-    item["confidence"] = confidence
-    item["score"] = score
-    item["flip_potential"] = "high" if score > 100 else "medium" if score > 50 else "low"
-    item["predicted_duration"] = f"{int(trend['avg_duration'])} days" if trend["count"] > 0 else "7 days"
-    scored_active.append(item)
+scores = []  # (item_id, score) — fed back to the re-check schedule (see recheck.py)
+
+def scored(items):
+    for item in items:
+        category = (item.category or "").lower()
+        trend = category_trends.get(category, {"total_profit": 0, "count": 0, "avg_profit": 0, "sales_volume": 0, "avg_duration": 0})
+
+        # Estimate profit with trend or 30% margin fallback
+        estimated_profit = trend["avg_profit"] or ((item.price or 0) * 0.3)
+
+        # Confidence based on volume and duration
+        confidence = 0.5
+        if trend["sales_volume"] > 5:  # High sales volume boosts confidence
+            confidence += 0.2
+        if trend["avg_duration"] < 7:  # Faster sales = higher confidence
+            confidence += 0.1
+        if "electronics" in category or "laptops" in category:
+            confidence = min(0.9, confidence + 0.1)  # Cap at 0.9
+
+        score = estimated_profit * confidence
+        out = item.to_dict()
+        out["profit"] = estimated_profit
+        out["confidence"] = confidence
+        out["score"] = score
+        scores.append((item.item_id, score))
+        out["flip_potential"] = "high" if score > 100 else "medium" if score > 50 else "low"
+        out["predicted_duration"] = f"{int(trend['avg_duration'])} days" if trend["count"] > 0 else "7 days"
+        yield out
+
+def write_feed(path, records):
+    """Stream a JSON array — the combined feed is never built as one list."""
+    counts = Counter()
+    with open(path, 'w') as f:
+        f.write("[")
+        for kind, rec in records:
+            f.write(",\n" if counts else "\n")
+            f.write(json.dumps(rec, indent=2))
+            counts[kind] += 1
+        f.write("\n]")
+    return counts
 
-# Combine and save (growing feed)
-combined_scored = all_sold + scored_active
-with open(OUTPUT_FILE, 'w') as f:
-    json.dump(combined_scored, f, indent=2)
+# Combine and save (growing feed) — recent sales from the hot tier only
+all_sold = chain((r.to_dict() for r in store.sold(typed=True)), (p.to_dict() for p in keepa_items))
+active = scored(store.items(status=None, typed=True))  # active + not yet re-verified
+counts = write_feed(OUTPUT_FILE, chain((("sold", d) for d in all_sold), (("active", d) for d in active)))
+store.set_scores(scores)
+store.close()
 
-print(f"✅ Scored {len(scored_active)} active items using trends from {len(all_sold)} sold items. Combined feed saved to {OUTPUT_FILE}.")
\ No newline at end of file
+print(f"✅ Scored {counts['active']} active items using trends from {counts['sold']} sold items. Combined feed saved to {OUTPUT_FILE}.")
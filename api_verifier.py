@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+api_verifier.py
+Listing status from the Browse API — BATCH_IDS items per call — so the browser
+verifiers only open pages the API could not answer for.
+
+✅ getItems (GET /buy/browse/v1/item/?item_ids=...) instead of one page load per item
+✅ Same OAuth token as the scrapers (token_provider); 401 → invalidate + retry
+✅ Shared "browse" rate limit, 429/503 honoured, 5xx retried with backoff
+✅ One aiohttp session for the whole run
+✅ Calls are debited from the shared daily Browse cap (quota_allocator.py); once it is
+   spent every id comes back None and the browser tiers take over
+
+Status per item:
+    returned, IN_STOCK / LIMITED_STOCK, not past itemEndDate  → "active"
+    returned, OUT_OF_STOCK or past itemEndDate                → "sold"   (price = last price)
+    not returned, warning says not found / ended (GONE_ERRORS)→ "sold"
+    anything else (call failed, 404 / silently left out,
+    other warning, odd id, daily cap spent)                    → None  → browser fallback
+
+Usage:
+    async with BrowseStatus(token_provider.get_token(), quota=QuotaAllocator(f"{SAFE_DIR}/browse_quota.json")) as api:
+        status = await api.statuses([it.item_id for it in batch])   # {item_id: (status, price) | None}
+    # or api = BrowseStatus(token) ... await api.close()
+"""
+
+import asyncio, re
+from datetime import datetime, timezone
+import aiohttp
+import rate_limiter
+import token_provider
+from records import _num
+
+GET_ITEMS_URL   = "https://api.ebay.com/buy/browse/v1/item/"
+BATCH_IDS       = 20          # getItems limit
+MAX_PARALLEL    = 4
+MAX_RETRIES     = 4
+REQUEST_TIMEOUT = 30
+RETRY_STATUSES  = {500, 502, 504}
+THROTTLE_STATUSES = {429, 503}
+GONE_ERRORS     = {11001}     # "item not found / no longer available"
+AVAILABLE       = {"IN_STOCK", "LIMITED_STOCK"}
+_LEGACY_ID      = re.compile(r"^\d+$")
+
+def rest_id(item_id):
+    """Browse item id for a stored id: v1|<legacy>|0 for plain legacy numbers, None if unusable."""
+    item_id = str(item_id or "")
+    if item_id.startswith("v1|"):
+        return item_id
+    return f"v1|{item_id}|0" if _LEGACY_ID.match(item_id) else None
+
+def _status(item, now):
+    avail = {a.get("estimatedAvailabilityStatus") for a in item.get("estimatedAvailabilities") or []}
+    price = _num((item.get("price") or {}).get("value"))
+    end = item.get("itemEndDate")
+    if end:
+        try:
+            if datetime.fromisoformat(end.replace("Z", "+00:00")) <= now:
+                return ("sold", price)
+        except ValueError:
+            pass
+    if avail and not avail & AVAILABLE:
+        return ("sold", price)
+    return ("active", None)
+
+class BrowseStatus:
+    def __init__(self, token, on_unauthorized=token_provider.invalidate, max_parallel=MAX_PARALLEL, log=print,
+                 quota=None):
+        """`quota`: a QuotaAllocator on the scraper's quota file — getItems shares its daily cap."""
+        self.auth = {"token": token}
+        self.on_unauthorized = on_unauthorized
+        self.log = log
+        self.quota = quota
+        self.exhausted = False
+        self.limiter = rate_limiter.get("browse")
+        self.sem = asyncio.Semaphore(max_parallel)
+        self.stats = {"calls": 0, "resolved": 0, "unresolved": 0}
+        self._max_parallel = max_parallel
+        self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def _get_items(self, ids):
+        """One getItems call → response JSON, or None when it could not be made."""
+        params = {"item_ids": ",".join(ids)}
+        if self.session is None:
+            self.session = aiohttp.ClientSession(headers={"Accept-Encoding": "gzip"},
+                                                 timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                                                 connector=aiohttp.TCPConnector(limit=self._max_parallel))
+        for attempt in range(MAX_RETRIES):
+            await self.limiter.acquire_async()
+            async with self.sem:
+                try:
+                    sent = self.auth["token"]
+                    async with self.session.get(GET_ITEMS_URL, params=params,
+                                                headers={"Authorization": f"Bearer {sent}",
+                                                         "X-EBAY-C-MARKETPLACE-ID": "EBAY_US"}) as r:
+                        self.stats["calls"] += 1
+                        self.limiter.observe(r.status, r.headers.get("Retry-After"))
+                        if r.status in THROTTLE_STATUSES:
+                            continue
+                        if r.status == 200:
+                            return await r.json()
+                        if r.status == 401 and self.on_unauthorized:
+                            fresh = await asyncio.to_thread(self.on_unauthorized, sent)
+                            if fresh:
+                                self.auth["token"] = fresh
+                                continue
+                        if r.status == 404:   # only the ids its errors name are known to be gone
+                            try:
+                                return await r.json(content_type=None)
+                            except ValueError:
+                                return None
+                        if r.status not in RETRY_STATUSES:
+                            self.log(f"⚠️ getItems → {r.status} {(await r.text())[:200]}")
+                            return None
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    self.log(f"💥 getItems request error: {e}")
+            await asyncio.sleep(2 ** attempt)
+        return None
+
+    async def _batch(self, pairs, out):
+        data = await self._get_items([rid for _, rid in pairs])
+        by_rest = {rid: iid for iid, rid in pairs}
+        if data is None:
+            for iid, _ in pairs:
+                out[iid] = None
+            return
+        now = datetime.now(timezone.utc)
+        for item in data.get("items") or []:
+            iid = by_rest.pop(item.get("itemId"), None)
+            if iid is not None:
+                out[iid] = _status(item, now)
+        # Left-overs were not returned: gone only if eBay names them, otherwise let the browser decide
+        gone = set()
+        for w in (data.get("warnings") or []) + (data.get("errors") or []):
+            if w.get("errorId") in GONE_ERRORS:
+                for p in w.get("parameters") or []:
+                    gone.add(p.get("value"))
+        for rid, iid in by_rest.items():
+            out[iid] = ("sold", None) if rid in gone else None
+
+    async def statuses(self, item_ids):
+        """{item_id: (status, sold_price)} — None for ids the API left unresolved."""
+        out, pairs = {}, []
+        for iid in item_ids:
+            rid = rest_id(iid)
+            if rid:
+                pairs.append((iid, rid))
+            else:
+                out[iid] = None
+        batches = [pairs[i:i + BATCH_IDS] for i in range(0, len(pairs), BATCH_IDS)]
+        granted, calls = len(batches), self.stats["calls"]
+        if self.quota and batches:
+            granted = 0 if self.exhausted else await asyncio.to_thread(self.quota.take, len(batches))
+            if granted < len(batches) and not self.exhausted:
+                self.exhausted = True
+                self.log("🚫 Daily Browse cap spent — getItems off, the browser tiers take over")
+            for batch in batches[granted:]:
+                for iid, _ in batch:
+                    out[iid] = None
+        await asyncio.gather(*(self._batch(batch, out) for batch in batches[:granted]))
+        if self.quota and self.stats["calls"] - calls != granted:   # retries cost calls, failures none
+            await asyncio.to_thread(self.quota.charge, self.stats["calls"] - calls - granted)
+        unresolved = sum(1 for v in out.values() if v is None)
+        self.stats["resolved"] += len(out) - unresolved
+        self.stats["unresolved"] += unresolved
+        return out
+
+async def resolved(result):
+    """An API answer as an awaitable, so it can sit in the same gather() as the browser checks."""
+    return result
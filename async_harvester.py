@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+async_harvester.py
+Concurrent Browse API sweep used by the category × condition scrapers.
+
+✅ One aiohttp session for the whole sweep (keep-alive, no per-call handshake)
+✅ Bounded parallel requests (MAX_PARALLEL in flight)
+✅ One shared rate limit across every category/condition (rate_limiter "browse")
+✅ First page reads `total`, the remaining pages fan out in parallel
+✅ Per-query call budget (same cap scrape() used to enforce by hand)
+✅ 429/503 slow the shared limiter down (Retry-After honoured), 5xx retried with backoff
+"""
+
+import asyncio
+import aiohttp
+import rate_limiter
+
+# ───────────────────────────────────────────────
+# SETTINGS
+# ───────────────────────────────────────────────
+BROWSE_SEARCH_URL = "https://api.ebay.com/buy/browse/v1/item_summary/search"
+PAGE_SIZE        = 200
+MAX_OFFSET       = 10000     # Browse refuses offset+limit beyond this
+MAX_PARALLEL     = 8         # requests in flight at once
+MAX_RETRIES      = 4
+REQUEST_TIMEOUT  = 60
+RETRY_STATUSES   = {500, 502, 504}
+THROTTLE_STATUSES = {429, 503}
+
+# ───────────────────────────────────────────────
+# QUERIES
+# ───────────────────────────────────────────────
+def build_queries(categories, conditions, extra_filter=None, max_calls=10,
+                  use_keyword=True, fieldgroups="PRODUCT"):
+    """
+    One query per (category, condition). `max_calls` is the per-category cap;
+    it is split across that category's conditions so both get pages.
+    """
+    per_cond = max(1, max_calls // max(1, len(conditions)))
+    queries = []
+    for cat in categories:
+        for cond in conditions:
+            flt = f"conditionIds:{cond['id']}"
+            if extra_filter:
+                flt += f",{extra_filter}"
+            params = {"category_ids": cat["id"], "filter": flt}
+            if use_keyword:
+                params["q"] = cat["name"].lower()
+            if fieldgroups:
+                params["fieldgroups"] = fieldgroups
+            queries.append({"key": f"{cat['id']}:{cond['id']}:{params.get('q', '')}",
+                            "category": cat, "condition": cond,
+                            "params": params, "max_calls": per_cond})
+    return queries
+
+# ───────────────────────────────────────────────
+# HARVEST
+# ───────────────────────────────────────────────
+async def harvest(token, queries, on_page, on_done=None, on_unauthorized=None, user_agent=None,
+                  max_parallel=MAX_PARALLEL, log=print):
+    """
+    Run every query concurrently, starting at query["start_offset"] (default 0).
+    `on_page(query, offset, summaries)` is called as pages arrive, in offset order
+    per query. `on_done(query, complete)` fires once per query; complete is False
+    when a page failed or the call budget ran out before the last page, or when
+    the result set is deeper than MAX_OFFSET — then query["truncated"] is set.
+    `on_unauthorized(bad_token)` (e.g. token_provider.invalidate) is run in a
+    thread on a 401 and must return a fresh token; the page is then retried.
+    Returns {"calls": n, "items": n, "failed": n}.
+    """
+    limiter = rate_limiter.get("browse")
+    sem = asyncio.Semaphore(max_parallel)
+    stats = {"calls": 0, "items": 0, "failed": 0}
+    auth = {"token": token}
+    headers = {"Accept-Encoding": "gzip"}
+    if user_agent:
+        headers["User-Agent"] = user_agent
+
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=max_parallel)
+    async with aiohttp.ClientSession(headers=headers, timeout=timeout, connector=connector) as session:
+
+        async def fetch(query, offset):
+            params = dict(query["params"], limit=str(PAGE_SIZE), offset=str(offset))
+            for attempt in range(MAX_RETRIES):
+                await limiter.acquire_async()
+                async with sem:
+                    try:
+                        sent = auth["token"]
+                        async with session.get(BROWSE_SEARCH_URL, params=params,
+                                               headers={"Authorization": f"Bearer {sent}"}) as r:
+                            stats["calls"] += 1
+                            limiter.observe(r.status, r.headers.get("Retry-After"))
+                            if r.status in THROTTLE_STATUSES:
+                                continue   # limiter already paused the upstream
+                            if r.status == 200:
+                                return await r.json()
+                            if r.status == 401 and on_unauthorized:
+                                fresh = await asyncio.to_thread(on_unauthorized, sent)
+                                if fresh:
+                                    auth["token"] = fresh
+                                    continue
+                            body = (await r.text())[:200]
+                            if r.status not in RETRY_STATUSES:
+                                log(f"⚠️ {query['category']['name']} ({query['condition']['name']}) "
+                                    f"offset {offset} → {r.status} {body}")
+                                break
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        log(f"💥 Browse request error: {e}")
+                await asyncio.sleep(2 ** attempt)
+            stats["failed"] += 1
+            return None
+
+        def finish(query, complete):
+            if on_done:
+                on_done(query, complete)
+
+        async def run(query):
+            start = query.get("start_offset", 0)
+            first = await fetch(query, start)
+            if not first:
+                return finish(query, False)
+            batch = first.get("itemSummaries", [])
+            stats["items"] += len(batch)
+            on_page(query, start, batch)
+            if len(batch) < PAGE_SIZE:
+                return finish(query, True)
+
+            total = first.get("total", 0)
+            end = min(total, MAX_OFFSET)
+            stop = min(end, start + query["max_calls"] * PAGE_SIZE)
+            offsets = list(range(start + PAGE_SIZE, stop, PAGE_SIZE))
+            # All pages in flight at once, but handed to on_page in offset order
+            # so a caller's cursor only ever moves over contiguous pages.
+            tasks = [asyncio.ensure_future(fetch(query, o)) for o in offsets]
+            for offset, task in zip(offsets, tasks):
+                page = await task
+                if not page:
+                    for t in tasks:
+                        t.cancel()
+                    return finish(query, False)
+                batch = page.get("itemSummaries", [])
+                stats["items"] += len(batch)
+                on_page(query, offset, batch)
+            if end < total and stop >= end:
+                query["truncated"] = True
+                log(f"⚠️ {query['category']['name']} ({query['condition']['name']}): {total} results, "
+                    f"Browse stops at offset {MAX_OFFSET}")
+            finish(query, stop >= total)
+
+        await asyncio.gather(*(run(q) for q in queries))
+
+    return stats
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+browser_pool.py
+Warm Playwright contexts for the verifiers — one Chromium, N contexts per proxy endpoint,
+one page per context reused between navigations.
+
+✅ Chromium is launched once per process, not once per URL
+✅ CONTEXTS_PER_PROXY contexts per proxy endpoint; a checkout waits for a free one
+✅ Between uses: cookies and permissions cleared, page parked on about:blank
+✅ A context is recycled (closed, re-created on next checkout with a fresh user agent)
+   after MAX_USES navigations, after a bot-detection hit (recycle(page)) or when a use raised
+✅ shared() gives every verifier entry point in the process the same pool
+✅ Lean navigation: only ALLOWED_TYPES requests (the document) reach the network —
+   images, fonts, CSS, scripts, ads and trackers are aborted before they cost proxy bandwidth
+✅ page(proxy, full=True) checks out a separate context that also runs scripts / XHR
+   (CHALLENGE_TYPES) — for retrying a page that came back as a JS bot challenge
+✅ Bytes per check are measured (request + response, headers + encoded body) and
+   totalled in stats["bytes"] — what the proxy will bill, for callers that budget bandwidth
+
+Usage:
+    pool = await browser_pool.shared()
+    async with pool.page(proxy_url) as page:
+        await page.goto(url)
+        if "Pardon Our Interruption" in await page.content():
+            pool.recycle(page)   # then retry on pool.page(proxy_url, full=True)
+    await browser_pool.close_shared()
+"""
+
+import asyncio, random
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+CONTEXTS_PER_PROXY = 4
+MAX_USES = 50
+ALLOWED_TYPES = frozenset({"document"})   # eBay item pages are server-rendered — the HTML is enough to classify
+CHALLENGE_TYPES = frozenset({"document", "script", "xhr", "fetch"})   # enough for a JS challenge to run
+LAUNCH_ARGS = ["--no-sandbox", "--disable-gpu"]
+VIEWPORT = {"width": 1280, "height": 900}
+USER_AGENTS = [
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+]
+STEALTH_SCRIPT = """
+() => {
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    window.chrome = { runtime: {} };
+    Object.defineProperty(navigator, 'languages', {get: () => ['en-US','en']});
+    Object.defineProperty(navigator, 'plugins', {get: () => [1,2,3]});
+}
+"""
+
+class _Slot:
+    __slots__ = ("context", "page", "uses", "burned", "bytes", "pending")
+
+    def __init__(self):
+        self.context = self.page = None
+        self.uses = 0
+        self.burned = False
+        self.bytes = 0          # transferred during the current use
+        self.pending = set()    # size lookups still in flight
+
+class BrowserPool:
+    def __init__(self, contexts_per_proxy=CONTEXTS_PER_PROXY, max_uses=MAX_USES, headless=True,
+                 allowed_types=ALLOWED_TYPES, log=print):
+        self.contexts_per_proxy = contexts_per_proxy
+        self.max_uses = max_uses
+        self.headless = headless
+        self.allowed_types = allowed_types   # None = load everything
+        self.log = log
+        self.stats = {"navigations": 0, "contexts": 0, "recycled": 0, "blocked": 0, "bytes": 0, "max_check_bytes": 0}
+        self._pw = self._browser = None
+        self._slots = {}    # (proxy, full) → asyncio.Queue of _Slot
+        self._by_page = {}  # page → its slot, for recycle()
+
+    async def start(self):
+        if self._browser is None:
+            self._pw = await async_playwright().start()
+            self._browser = await self._pw.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        return self
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        for queue in self._slots.values():
+            while not queue.empty():
+                await self._drop(queue.get_nowait())
+        self._slots.clear()
+        if self._browser:
+            await self._browser.close()
+            await self._pw.stop()
+            self._browser = self._pw = None
+
+    # ─── slots ────────────────────────────────────
+    def _queue(self, key):
+        if key not in self._slots:
+            queue = asyncio.Queue()
+            for _ in range(self.contexts_per_proxy):
+                queue.put_nowait(_Slot())   # contexts are opened on first checkout
+            self._slots[key] = queue
+        return self._slots[key]
+
+    async def _open(self, slot, proxy, full=False):
+        kwargs = {"user_agent": random.choice(USER_AGENTS), "viewport": VIEWPORT}
+        if proxy:
+            kwargs["proxy"] = {"server": proxy}
+        slot.context = await self._browser.new_context(**kwargs)
+        await slot.context.add_init_script(STEALTH_SCRIPT)
+        allowed = CHALLENGE_TYPES if full else self.allowed_types
+        if allowed is not None:
+            await slot.context.route("**/*", lambda route: self._filter(route, allowed))
+        slot.page = await slot.context.new_page()
+        slot.page.on("requestfinished", lambda request: self._measure(slot, request))
+        self._by_page[slot.page] = slot
+        slot.uses, slot.burned = 0, False
+        self.stats["contexts"] += 1
+
+    async def _drop(self, slot):
+        if slot.context is not None:
+            self._by_page.pop(slot.page, None)
+            try:
+                await slot.context.close()
+            except Exception as e:
+                self.log(f"[Playwright close error] context: {e}")
+        slot.context = slot.page = None
+
+    async def _filter(self, route, allowed):
+        if route.request.resource_type in allowed:
+            await route.continue_()
+        else:
+            self.stats["blocked"] += 1
+            await route.abort()
+
+    def _measure(self, slot, request):
+        async def count():
+            try:
+                sizes = await request.sizes()
+            except Exception:
+                return
+            slot.bytes += (sizes["requestHeadersSize"] + sizes["requestBodySize"]
+                           + sizes["responseHeadersSize"] + sizes["responseBodySize"])
+        task = asyncio.ensure_future(count())
+        slot.pending.add(task)
+        task.add_done_callback(slot.pending.discard)
+
+    async def _settle(self, slot):
+        """Fold this use's bytes into the totals once every size lookup has answered."""
+        if slot.pending:
+            await asyncio.gather(*slot.pending, return_exceptions=True)
+        self.stats["bytes"] += slot.bytes
+        self.stats["max_check_bytes"] = max(self.stats["max_check_bytes"], slot.bytes)
+        slot.bytes = 0
+
+    async def _reset(self, slot):
+        """Leave nothing from this use behind for the next one."""
+        await slot.context.clear_cookies()
+        await slot.context.clear_permissions()
+        await slot.page.goto("about:blank")
+
+    # ─── checkout ─────────────────────────────────
+    @asynccontextmanager
+    async def page(self, proxy=None, full=False):
+        """
+        A warm page on a context for `proxy`; goes back to the pool (reset or recycled) on exit.
+        full=True: a context that runs scripts, for pages that answered with a challenge.
+        """
+        await self.start()
+        queue = self._queue((proxy, full))
+        slot = await queue.get()
+        try:
+            if slot.context is None:
+                await self._open(slot, proxy, full)
+            self.stats["navigations"] += 1
+            try:
+                yield slot.page
+            except BaseException:
+                slot.burned = True   # page state unknown after a failed use
+                raise
+            finally:
+                slot.uses += 1
+                await self._settle(slot)
+                if slot.burned or slot.uses >= self.max_uses:
+                    self.stats["recycled"] += 1
+                    await self._drop(slot)
+                else:
+                    try:
+                        await self._reset(slot)
+                    except Exception:
+                        await self._drop(slot)
+        finally:
+            queue.put_nowait(slot)
+
+    def recycle(self, page):
+        """Bot wall / captcha on this page: its context is thrown away when the page is returned."""
+        slot = self._by_page.get(page)
+        if slot:
+            slot.burned = True
+
+# ─── one pool per process ─────────────────────────
+_shared = None
+
+async def shared(**kwargs):
+    """The process-wide pool every verifier entry point uses (started on first call)."""
+    global _shared
+    if _shared is None:
+        _shared = BrowserPool(**kwargs)
+    return await _shared.start()
+
+async def close_shared():
+    global _shared
+    if _shared is not None:
+        await _shared.close()
+        _shared = None
@@ -1,18 +1,14 @@
-import json
+from keyword_queue import KeywordQueue
 
-KEYWORDS_PATH = "/Users/stephentaykor/Desktop/flipper_Simulation/Flipper_AI/usable_category_paths_fixed_final.txt"
-PROGRESS_FILE = "/Users/stephentaykor/Desktop/flipper_Simulation/my_items_safe/progress.json"
+QUEUE_DB = "/Users/stephentaykor/Desktop/flipper_Simulation/my_items_safe/keyword_queue.sqlite"
 
-# Load total keywords
-with open(KEYWORDS_PATH, 'r') as f:
-    total_keywords = len([line.strip() for line in f if line.strip()])
-
-# Load progress
-with open(PROGRESS_FILE, 'r') as f:
-    progress = json.load(f)
-completed = len(progress.get('done', {}))
+# One GROUP BY on the indexed status column (the crawler keeps the queue in sync with the keyword file)
+counts = KeywordQueue(QUEUE_DB).counts()
+total_keywords = sum(counts.values())
+completed = counts.get("done", 0)
 
 remaining = total_keywords - completed
 print(f"Total keywords: {total_keywords}")
 print(f"Completed: {completed}")
-print(f"Remaining: {remaining}")
\ No newline at end of file
+print(f"Running: {counts.get('running', 0)}")
+print(f"Remaining: {remaining}")
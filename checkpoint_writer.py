@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+checkpoint_writer.py
+Background writer for verifier results.
+
+✅ Verifiers put results on a queue and go straight back to checking URLs
+✅ A writer thread merges them into pending state — latest result per item_id,
+   so an item re-checked before the flush is written once
+✅ Flushes every FLUSH_SECONDS or FLUSH_ROWS pending items, whichever comes first
+✅ Each flush is ONE item-store transaction (ItemStore.apply_results) — cost scales
+   with the items that changed, never with the inventory
+✅ The thread owns its own SQLite connection; close() drains and flushes
+✅ If the thread dies (e.g. the store can't be opened) the error is re-raised to the
+   caller by the next sold() / checked() / flush() / close() — results are never dropped silently
+
+Usage:
+    writer = CheckpointWriter(STORE)
+    writer.sold(item, evidence="api")        # item dict, moves to the sold table
+    writer.checked(item_id, "active", evidence="http")   # stays in inventory
+    writer.close()                           # final flush
+"""
+
+import queue, threading, time
+from item_store import ItemStore, STORE_FILE
+from records import Item
+
+FLUSH_SECONDS = 2.0
+FLUSH_ROWS    = 500
+_FLUSH = object()   # queue marker: flush now
+_STOP  = object()   # queue marker: flush and exit
+
+class CheckpointWriter:
+    def __init__(self, store_path=STORE_FILE, flush_seconds=FLUSH_SECONDS, flush_rows=FLUSH_ROWS, log=print):
+        self.store_path = store_path
+        self.flush_seconds = flush_seconds
+        self.flush_rows = flush_rows
+        self.log = log
+        self.written = {"sold": 0, "checked": 0, "flushes": 0}
+        self._queue = queue.Queue()
+        self._flushed = threading.Event()
+        self._error = None   # what killed the writer thread, re-raised in the caller
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    # ─── producers (any thread / event loop) ──────
+    def sold(self, item, evidence=None):
+        """item dict or records.Item (converted to a dict on the writer thread)."""
+        self._raise()
+        if isinstance(item, Item):
+            self._queue.put(("sold", item.item_id, (item, evidence)))
+        else:
+            self._queue.put(("sold", item["item_id"], (dict(item), evidence)))
+
+    def checked(self, item_id, status, sold_price=None, evidence=None):
+        """`evidence` = what decided it ("api", "http", "browser", ...) — kept with the cached result."""
+        self._raise()
+        self._queue.put(("checked", item_id, (item_id, status, sold_price, evidence)))
+
+    def flush(self, wait=True):
+        """Write whatever is pending now (blocks until it is on disk when wait=True)."""
+        self._raise()
+        self._flushed.clear()
+        self._queue.put(_FLUSH)
+        if wait:
+            while not self._flushed.wait(1.0) and self._thread.is_alive():
+                pass
+            self._raise()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._raise()
+
+    def _raise(self):
+        if self._error is not None:
+            raise self._error
+
+    # ─── writer thread ────────────────────────────
+    def _run(self):
+        try:
+            store = ItemStore(self.store_path, log=self.log)
+        except Exception as e:
+            self._fail(e)
+            return
+        pending = {}   # item_id → (kind, payload); a later result replaces an earlier one
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    msg = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    msg = _FLUSH   # time threshold
+                if msg is _FLUSH or msg is _STOP:
+                    self._write(store, pending)
+                    deadline = self._next_deadline(pending)
+                    self._flushed.set()
+                    if msg is _STOP:
+                        if pending:
+                            self.log(f"⚠️ {len(pending)} verifier results were not written")
+                        return
+                    continue
+                kind, item_id, payload = msg
+                pending[item_id] = (kind, payload)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+                if len(pending) >= self.flush_rows:   # size threshold
+                    self._write(store, pending)
+                    deadline = self._next_deadline(pending)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            store.close()
+
+    def _fail(self, error):
+        self.log(f"❌ Checkpoint writer stopped: {error}")
+        self._error = error
+        self._flushed.set()   # wake a flush(wait=True) — it re-raises
+
+    def _next_deadline(self, pending):
+        # a failed write leaves rows pending — try again after another interval
+        return time.monotonic() + self.flush_seconds if pending else None
+
+    def _write(self, store, pending):
+        if not pending:
+            return
+        sold = [p[0] for kind, p in pending.values() if kind == "sold"]
+        evidence = {iid: p[1] for iid, (kind, p) in pending.items() if kind == "sold" and p[1]}
+        checks = [p for kind, p in pending.values() if kind == "checked"]
+        try:
+            store.apply_results(sold, checks, evidence)
+        except Exception as e:
+            self.log(f"⚠️ Checkpoint of {len(pending)} results failed, will retry: {e}")
+            return   # pending is kept and goes out with the next flush
+        self.written["sold"] += len(sold)
+        self.written["checked"] += len(checks)
+        self.written["flushes"] += 1
+        pending.clear()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+columnar_snapshot.py
+Parquet snapshots of the item store for analytics and scoring.
+
+✅ items / sold exported as Parquet, hive-partitioned by date and category
+✅ Streams the store in batches — the export never holds the whole table
+✅ New snapshot is built beside the old one and swapped in with a rename
+✅ read() memory-maps the files and materialises ONLY the columns asked for,
+   pruning partitions by date range / category before touching any data
+
+pyarrow is optional: everything else in the pipeline runs without it.
+
+Usage:
+    python columnar_snapshot.py                      # export STORE_FILE → SNAPSHOT_DIR
+    t = read("sold", ["category", "price", "sold_price", "duration"], since="2025-10-01")
+    for row in t.to_pylist(): ...
+"""
+
+import os, shutil, time
+from item_store import ItemStore, STORE_FILE, BASE, _category, _num
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+except ImportError:   # optional dependency
+    pa = None
+
+SNAPSHOT_DIR = f"{BASE}/my_items_safe/snapshots"
+BATCH_ROWS   = 50_000
+
+# column → (pyarrow type name, how to pull it from a stored record)
+COLUMNS = {
+    "item_id":    ("string",  lambda it: it.get("item_id")),
+    "title":      ("string",  lambda it: it.get("title")),
+    "price":      ("float64", lambda it: _num(it.get("price"))),
+    "sold_price": ("float64", lambda it: _num(it.get("sold_price"))),
+    "category":   ("string",  _category),
+    "condition":  ("string",  lambda it: it.get("condition")),
+    "duration":   ("string",  lambda it: it.get("duration")),
+    "url":        ("string",  lambda it: it.get("url")),
+    "scraped_at": ("string",  lambda it: it.get("scraped_at")),
+    "sold_at":    ("string",  lambda it: it.get("sold_at")),
+}
+def _require():
+    if pa is None:
+        raise RuntimeError("columnar snapshots need pyarrow — pip install pyarrow")
+
+def _partitioning():
+    return ds.partitioning(pa.schema([("date", pa.string()), ("category", pa.string())]), flavor="hive")
+
+def _schema():
+    return pa.schema([(name, getattr(pa, kind)()) for name, (kind, _) in COLUMNS.items()] + [("date", pa.string())])
+
+def _batches(rows, date_field):
+    """Store rows → RecordBatches of BATCH_ROWS, with a `date` partition column."""
+    schema = _schema()
+    cols = {name: [] for name in schema.names}
+    for it in rows:
+        for name, (_, get) in COLUMNS.items():
+            cols[name].append(get(it))
+        stamp = it.get(date_field) or it.get("scraped_at") or ""
+        cols["date"].append(stamp[:10] or "unknown")
+        if len(cols["item_id"]) >= BATCH_ROWS:
+            yield pa.RecordBatch.from_pydict(cols, schema=schema)
+            cols = {name: [] for name in schema.names}
+    if cols["item_id"]:
+        yield pa.RecordBatch.from_pydict(cols, schema=schema)
+
+def export(store_path=STORE_FILE, out_dir=SNAPSHOT_DIR, log=print):
+    """Write items/ and sold/ Parquet datasets, then swap them in."""
+    _require()
+    start = time.time()
+    store = ItemStore(store_path, log=log)
+    os.makedirs(out_dir, exist_ok=True)
+    try:
+        for table, rows, date_field in (("items", store.items(status=None), "scraped_at"),
+                                        ("sold", store.sold(cold=True), "sold_at")):
+            final = os.path.join(out_dir, table)
+            tmp = f"{final}.tmp-{os.getpid()}"
+            ds.write_dataset(_batches(rows, date_field), tmp, schema=_schema(), format="parquet",
+                             partitioning=_partitioning(), existing_data_behavior="delete_matching",
+                             max_rows_per_group=BATCH_ROWS)
+            # Swap: readers that already listed the old files keep their mmaps
+            old = f"{final}.old-{os.getpid()}"
+            if os.path.exists(final):
+                os.rename(final, old)
+            os.rename(tmp, final)
+            shutil.rmtree(old, ignore_errors=True)
+    finally:
+        store.close()
+    log(f"📦 Columnar snapshot written to {out_dir} in {time.time() - start:.1f}s")
+
+def read(table, columns, since=None, until=None, categories=None, snapshot_dir=SNAPSHOT_DIR):
+    """
+    pyarrow.Table with just `columns` of items|sold. since/until (YYYY-MM-DD, until exclusive)
+    and categories prune whole partitions; files are memory-mapped, not read into buffers.
+    """
+    _require()
+    dataset = ds.dataset(os.path.join(snapshot_dir, table), format="parquet", partitioning=_partitioning(),
+                         filesystem=pafs.LocalFileSystem(use_mmap=True))
+    expr = None
+    for cond in ((ds.field("date") >= since) if since else None,
+                 (ds.field("date") < until) if until else None,
+                 ds.field("category").isin(list(categories)) if categories else None):
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+    return dataset.to_table(columns=list(columns), filter=expr)
+
+def available(table="sold", snapshot_dir=SNAPSHOT_DIR, max_age=None):
+    """True when pyarrow is installed and a snapshot exists (and is newer than max_age seconds)."""
+    path = os.path.join(snapshot_dir, table)
+    if pa is None or not os.path.isdir(path):
+        return False
+    return max_age is None or time.time() - os.path.getmtime(path) < max_age
+
+if __name__ == "__main__":
+    export()
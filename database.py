@@ -1,81 +1,347 @@
-import os
-import json
-import pyodbc
+#!/usr/bin/env python3
+"""
+database.py
+Bulk loader: the JSON item files in folder_path → one Items table (SQL Server or SQLite).
+
+✅ Streams every file (JSON array or JSON Lines) — a file is never loaded whole
+✅ CHUNK_ROWS records per round trip: executemany into a staging table, then ONE upsert
+   (SQL Server MERGE / SQLite ON CONFLICT DO UPDATE) — re-loading a file updates rows, never fails on them
+✅ sold / sold_price (KEEP_IF_MISSING) are only overwritten by records that carry them —
+   re-loading a scrape file never un-sells a row
+✅ A chunk the database rejects is retried row by row; only the bad rows are logged and skipped
+✅ Commits per chunk together with the file's progress — an interrupted load resumes where it stopped
+✅ Duplicates are counted per chunk, not logged one by one; the log file is opened once
+✅ --sqlite runs locally without SQL Server
+
+Usage:
+    python database.py                          # SQL Server (pyodbc) → Flipper.Items
+    python database.py --sqlite [flipper.db]    # local SQLite file → items
+"""
+
+import itertools, json, os, sqlite3, sys
 from datetime import datetime
+from records import _num
 
-# Database connection (adjust SERVER if needed)
-conn = pyodbc.connect('DRIVER={SQL Server};SERVER=localhost;DATABASE=flipper;Trusted_Connection=yes')
-cursor = conn.cursor()
+try:
+    import pyodbc
+except ImportError:   # only needed for the SQL Server backend
+    pyodbc = None
 
 # Folder path and log file
 folder_path = '/Users/stephentaykor/Desktop/flipper_Simulation'
 log_file = os.path.join(folder_path, 'database_log.txt')
+SQLSERVER_DSN = 'DRIVER={SQL Server};SERVER=localhost;DATABASE=flipper;Trusted_Connection=yes'
+SQLITE_FILE = os.path.join(folder_path, 'flipper_load.sqlite')
+
+CHUNK_ROWS  = 5000      # records per executemany + upsert + commit
+SAMPLE_ROWS = 1000      # records read from the head of each file to infer columns
+READ_BYTES  = 1 << 20   # JSON read buffer
 
+# Default columns for Flipper
+required_columns = ['item_id', 'title', 'price', 'url', 'categoryPath', 'scraped_at', 'sold', 'sold_price']
+NUMERIC = {'price', 'sold_price'}
+KEEP_IF_MISSING = {'sold', 'sold_price'}   # set by the verifiers; NULL from a record without them
+
+_log = None
 def log_message(message):
-    with open(log_file, 'a') as f:
-        f.write(f"{datetime.now()}: {message}\n")
+    global _log
+    if _log is None:
+        _log = open(log_file, 'a', buffering=1)   # line-buffered, opened once
+    _log.write(f"{datetime.now()}: {message}\n")
     print(message)
 
-# Step 1: Analyze JSON files to determine structure
-json_files = [f for f in os.listdir(folder_path) if f.endswith('.json')]
-if not json_files:
-    log_message("No JSON files found in folder.")
-    exit()
+# ─── streaming JSON ───────────────────────────────
+def stream_json(path):
+    """Yield the records of a JSON array / JSON Lines file without reading it all into memory."""
+    with open(path, 'r') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        decoder = json.JSONDecoder()
+        buf, pos, eof, started = '', 0, False, False
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError("unexpected end of file")
+                more = f.read(READ_BYTES)
+                buf, pos, eof = buf[pos:] + more, 0, not more
+                continue
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError("not a JSON array")
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                obj, end = None, len(buf)   # record runs past the buffer
+            if end >= len(buf) and not eof:
+                # Might be cut off (or a number split in two) — read more and decode again
+                more = f.read(READ_BYTES)
+                buf, pos, eof = buf[pos:] + more, 0, not more
+                continue
+            yield obj
+            pos = end
 
-# Sample first file to infer schema
-sample_file = os.path.join(folder_path, json_files[0])
-with open(sample_file, 'r') as f:
-    sample_data = json.load(f)
-    inferred_columns = {key for item in sample_data for key in item.keys()}
-    inferred_columns = sorted(list(inferred_columns))  # Unique column names
+# ─── backends ─────────────────────────────────────
+class SqlServer:
+    table, progress, staging = 'Flipper.Items', 'Flipper.LoadProgress', '#staging'
+    errors = (pyodbc.Error,) if pyodbc else ()
 
-# Add default columns for Flipper
-required_columns = ['item_id', 'title', 'price', 'url', 'categoryPath', 'scraped_at', 'sold', 'sold_price']
-all_columns = list(set(required_columns + inferred_columns))
-log_message(f"Inferred columns: {all_columns}")
+    def __init__(self):
+        if pyodbc is None:
+            raise RuntimeError("SQL Server backend needs pyodbc — pip install pyodbc, or use --sqlite")
+        self.conn = pyodbc.connect(SQLSERVER_DSN)
+        self.cursor = self.conn.cursor()
+        self.cursor.fast_executemany = True   # one round trip per chunk, not per row
 
-# Step 2: Create or update table
-table_name = 'Flipper.Items'
-try:
-    cursor.execute(f"SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = 'Flipper' AND TABLE_NAME = 'Items'")
-    if cursor.fetchone()[0] == 0:
-        create_table_sql = f"""
-        CREATE TABLE {table_name} (
-            {', '.join([f"{col} VARCHAR(255)" for col in all_columns if col not in ['price', 'sold', 'sold_price']]) + ', ' +
-             ', '.join([f"price DECIMAL(10, 2)", f"sold BIT DEFAULT 0", f"sold_price DECIMAL(10, 2)"])}
-        );
-        """
-        cursor.execute(create_table_sql)
-        log_message(f"Created table {table_name} with columns: {all_columns}")
+    @staticmethod
+    def q(col):
+        return '[' + col.replace(']', ']]') + ']'
+
+    def columns(self):
+        self.cursor.execute("SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS "
+                            "WHERE TABLE_SCHEMA = 'Flipper' AND TABLE_NAME = 'Items'")
+        return [r[0] for r in self.cursor.fetchall()]
+
+    def column_sql(self, col):
+        if col == 'item_id':
+            return f"{self.q(col)} VARCHAR(255) NOT NULL PRIMARY KEY"
+        if col in NUMERIC:
+            return f"{self.q(col)} DECIMAL(10, 2)"
+        if col == 'sold':
+            return f"{self.q(col)} BIT DEFAULT 0"
+        return f"{self.q(col)} NVARCHAR(MAX)"
+
+    def add_column_sql(self, col):
+        return f"ALTER TABLE {self.table} ADD {self.column_sql(col)}"
+
+    def prepare(self, cols):
+        self.cursor.execute(f"IF OBJECT_ID('{self.progress}') IS NULL CREATE TABLE {self.progress} ("
+                            "[file] NVARCHAR(400) NOT NULL PRIMARY KEY, [size] BIGINT, [mtime] FLOAT, "
+                            "[rows] BIGINT, [done] BIT)")
+        self.cursor.execute(f"SELECT TOP 0 {', '.join(map(self.q, cols))} INTO #staging FROM {self.table}")
+        self.conn.commit()
+
+    def upsert_sql(self, cols):
+        sets = ', '.join(f"t.{self.q(c)} = {update_value(c, 's.' + self.q(c), 't.' + self.q(c))}"
+                         for c in cols if c != 'item_id')
+        values = ', '.join(f"COALESCE(s.{self.q(c)}, 0)" if c == 'sold' else f"s.{self.q(c)}" for c in cols)
+        return [f"MERGE {self.table} AS t USING #staging AS s ON t.item_id = s.item_id "
+                f"WHEN MATCHED THEN UPDATE SET {sets} "
+                f"WHEN NOT MATCHED THEN INSERT ({', '.join(map(self.q, cols))}) VALUES ({values});"]
+
+    def save_progress_sql(self):
+        return (f"MERGE {self.progress} AS t USING (SELECT ? AS [file], ? AS [size], ? AS [mtime], ? AS [rows], ? AS [done]) AS s "
+                "ON t.[file] = s.[file] WHEN MATCHED THEN UPDATE SET [size] = s.[size], [mtime] = s.[mtime], "
+                "[rows] = s.[rows], [done] = s.[done] WHEN NOT MATCHED THEN INSERT ([file], [size], [mtime], [rows], [done]) "
+                "VALUES (s.[file], s.[size], s.[mtime], s.[rows], s.[done]);")
+
+class Sqlite:
+    table, progress, staging = 'items', 'load_progress', 'staging'
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path=SQLITE_FILE):
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.cursor = self.conn.cursor()
+
+    @staticmethod
+    def q(col):
+        return '"' + col.replace('"', '""') + '"'
+
+    def columns(self):
+        return [r[1] for r in self.cursor.execute(f"PRAGMA table_info({self.table})")]
+
+    def column_sql(self, col):
+        if col == 'item_id':
+            return f"{self.q(col)} TEXT PRIMARY KEY"
+        if col in NUMERIC:
+            return f"{self.q(col)} REAL"
+        if col == 'sold':
+            return f"{self.q(col)} INTEGER DEFAULT 0"
+        return f"{self.q(col)} TEXT"
+
+    def add_column_sql(self, col):
+        return f"ALTER TABLE {self.table} ADD COLUMN {self.column_sql(col)}"
+
+    def prepare(self, cols):
+        self.cursor.execute(f"CREATE TABLE IF NOT EXISTS {self.progress} "
+                            '("file" TEXT PRIMARY KEY, "size" INTEGER, "mtime" REAL, "rows" INTEGER, "done" INTEGER)')
+        self.cursor.execute(f"CREATE TEMP TABLE staging AS SELECT {', '.join(map(self.q, cols))} FROM {self.table} WHERE 0")
+        self.conn.commit()
+
+    def upsert_sql(self, cols):
+        sets = ', '.join(f"{self.q(c)} = {update_value(c, 'excluded.' + self.q(c), self.table + '.' + self.q(c))}"
+                         for c in cols if c != 'item_id')
+        names = ', '.join(map(self.q, cols))
+        # excluded.* is the row as inserted, so new rows get their sold = 0 default afterwards
+        return [f"INSERT INTO {self.table} ({names}) SELECT {names} FROM staging WHERE true "
+                f"ON CONFLICT (item_id) DO UPDATE SET {sets}",
+                f"UPDATE {self.table} SET sold = 0 WHERE sold IS NULL "
+                f"AND item_id IN (SELECT item_id FROM staging)"]
+
+    def save_progress_sql(self):
+        return f'INSERT OR REPLACE INTO {self.progress} ("file", "size", "mtime", "rows", "done") VALUES (?, ?, ?, ?, ?)'
+
+def update_value(col, new, old):
+    return f"COALESCE({new}, {old})" if col in KEEP_IF_MISSING else new
+
+# ─── loader ───────────────────────────────────────
+def row_values(item, cols):
+    values = []
+    for col in cols:
+        v = item.get(col)
+        if col in NUMERIC:
+            v = _num(v)
+        elif col == 'sold':
+            v = None if col not in item else 1 if v is True else 0
+        elif isinstance(v, (dict, list)):
+            v = json.dumps(v)
+        elif v is not None:
+            v = str(v)
+        values.append(v)
+    return values
+
+def ensure_table(db, files):
+    """Create the table (or add columns) for the keys found at the head of each file."""
+    inferred = set()
+    for path in files:
+        try:
+            for item in itertools.islice(stream_json(path), SAMPLE_ROWS):
+                if isinstance(item, dict):
+                    inferred.update(item.keys())
+        except ValueError:
+            pass   # not an item file — reported when it is loaded
+    wanted = list(dict.fromkeys(required_columns + sorted(inferred)))
+    existing = db.columns()
+    if not existing:
+        db.cursor.execute(f"CREATE TABLE {db.table} ({', '.join(db.column_sql(c) for c in wanted)})")
+        log_message(f"Created table {db.table} with columns: {wanted}")
     else:
-        log_message(f"Table {table_name} already exists, proceeding with insert.")
-except Exception as e:
-    log_message(f"Error creating table: {e}")
-    conn.close()
-    exit()
-
-# Step 3: Upload all JSON data
-total_items = 0
-duplicate_items = 0
-for filename in json_files:
-    file_path = os.path.join(folder_path, filename)
-    log_message(f"Processing {filename}...")
-    with open(file_path, 'r') as f:
-        items = json.load(f)
-        for item in items:
-            try:
-                # Prepare values, defaulting missing fields
-                values = [item.get(col, '') for col in all_columns if col not in ['sold', 'sold_price']]
-                values.extend([float(item.get('price', 0)) if item.get('price') else 0, 0, None])
-                cursor.execute(f"INSERT INTO {table_name} ({', '.join(all_columns)}) VALUES ({', '.join(['?' for _ in all_columns])})", values)
-                total_items += 1
-            except pyodbc.IntegrityError:
-                duplicate_items += 1
-                log_message(f"Duplicate item_id skipped in {filename}: {item.get('item_id')}")
-            except Exception as e:
-                log_message(f"Error inserting item from {filename}: {e}")
-
-# Commit and close
-conn.commit()
-conn.close()
-log_message(f"Upload complete! Total items: {total_items}, Duplicates skipped: {duplicate_items}")
\ No newline at end of file
+        added = [c for c in wanted if c not in existing]
+        for col in added:
+            db.cursor.execute(db.add_column_sql(col))
+        log_message(f"Table {db.table} already exists" + (f", added columns: {added}" if added else ""))
+    db.conn.commit()
+    return wanted
+
+def upsert_chunk(db, rows, insert_sql, upsert_sql):
+    """Staging insert + ONE upsert (not committed); returns how many of `rows` already existed."""
+    if not rows:
+        return 0
+    db.cursor.executemany(insert_sql, rows)
+    db.cursor.execute(f"SELECT COUNT(*) FROM {db.staging} s JOIN {db.table} t ON t.item_id = s.item_id")
+    existing = db.cursor.fetchone()[0]
+    for sql in upsert_sql:
+        db.cursor.execute(sql)
+    db.cursor.execute(f"DELETE FROM {db.staging}")
+    return existing
+
+def load_file(db, path, cols, insert_sql, upsert_sql):
+    name = os.path.basename(path)
+    st = os.stat(path)
+    db.cursor.execute(f"SELECT {', '.join(map(db.q, ('size', 'mtime', 'rows', 'done')))} FROM {db.progress} "
+                      f"WHERE {db.q('file')} = ?", (name,))
+    prev = db.cursor.fetchone()
+    skip = 0
+    if prev and prev[0] == st.st_size and prev[1] == st.st_mtime:
+        if prev[3]:
+            log_message(f"Skipping {name} (already loaded)")
+            return 0, 0
+        skip = prev[2]
+        log_message(f"Resuming {name} after {skip} records")
+    else:
+        log_message(f"Processing {name}...")
+
+    loaded = duplicates = invalid = failed = 0
+    done = skip
+    records = itertools.islice(stream_json(path), skip, None)
+    while True:
+        chunk = list(itertools.islice(records, CHUNK_ROWS))
+        if not chunk:
+            break
+        done += len(chunk)
+        # Last record per item_id wins — the upsert must not see one key twice
+        rows = {}
+        for item in chunk:
+            if isinstance(item, dict) and item.get('item_id'):
+                rows[str(item['item_id'])] = row_values(item, cols)
+        rejected = 0
+        try:
+            existing = upsert_chunk(db, list(rows.values()), insert_sql, upsert_sql)
+        except db.errors as e:
+            db.conn.rollback()
+            log_message(f"{name}: chunk ending at record {done} rejected ({e}), retrying row by row")
+            existing = 0
+            for item_id, values in list(rows.items()):
+                try:
+                    existing += upsert_chunk(db, [values], insert_sql, upsert_sql)
+                    db.conn.commit()
+                except db.errors as e:
+                    db.conn.rollback()
+                    log_message(f"Error inserting item {item_id} from {name}: {e}")
+                    del rows[item_id]
+                    rejected += 1
+        db.cursor.execute(db.save_progress_sql(), (name, st.st_size, st.st_mtime, done, 0))
+        db.conn.commit()
+        valid = sum(1 for item in chunk if isinstance(item, dict) and item.get('item_id'))
+        loaded += len(rows) - existing
+        duplicates += valid - len(rows) - rejected + existing
+        invalid += len(chunk) - valid
+        failed += rejected
+    db.cursor.execute(db.save_progress_sql(), (name, st.st_size, st.st_mtime, done, 1))
+    db.conn.commit()
+    log_message(f"{name}: {loaded} new, {duplicates} duplicates updated in place"
+                + (f", {invalid} records without item_id skipped" if invalid else "")
+                + (f", {failed} rows rejected by the database" if failed else ""))
+    return loaded, duplicates
+
+def main():
+    if '--sqlite' in sys.argv:
+        i = sys.argv.index('--sqlite')
+        path = sys.argv[i + 1] if len(sys.argv) > i + 1 else SQLITE_FILE
+        db = Sqlite(path)
+    else:
+        db = SqlServer()
+
+    json_files = sorted(os.path.join(folder_path, f) for f in os.listdir(folder_path)
+                        if f.endswith(('.json', '.jsonl')))
+    if not json_files:
+        log_message("No JSON files found in folder.")
+        return
+
+    try:
+        cols = ensure_table(db, json_files)
+    except Exception as e:
+        log_message(f"Error creating table: {e}")
+        db.conn.close()
+        return
+    db.prepare(cols)
+    insert_sql = f"INSERT INTO {db.staging} ({', '.join(map(db.q, cols))}) VALUES ({', '.join('?' for _ in cols)})"
+    upsert_sql = db.upsert_sql(cols)
+
+    total_items = duplicate_items = 0
+    for path in json_files:
+        try:
+            loaded, dups = load_file(db, path, cols, insert_sql, upsert_sql)
+        except ValueError as e:
+            db.conn.rollback()
+            log_message(f"Skipping {os.path.basename(path)}: {e}")
+            continue
+        total_items += loaded
+        duplicate_items += dups
+    db.conn.close()
+    log_message(f"Upload complete! Total items: {total_items}, Duplicates updated: {duplicate_items}")
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,9 @@
-import requests
+import http_client
+import token_provider
 from bs4 import BeautifulSoup
 import json
 import time
 import random
-import base64
 from dotenv import load_dotenv
 import os
 
@@ -17,29 +17,22 @@ if not SCRAPINGDOG_API or not EBAY_CLIENT_ID or not EBAY_CLIENT_SECRET:
 
 AMAZON_BASE_URL = f"https://api.scrapingdog.com/scrape?api_key={SCRAPINGDOG_API}"
 
+EBAY_BASE_URL = "https://api.ebay.com/buy/browse/v1/item_summary/search"
+
 def get_ebay_token():
-    auth_string = base64.b64encode(f"{EBAY_CLIENT_ID}:{EBAY_CLIENT_SECRET}".encode()).decode()
-    headers = {"Authorization": f"Basic {auth_string}", "Content-Type": "application/x-www-form-urlencoded"}
-    data = {"grant_type": "client_credentials", "scope": "https://api.ebay.com/oauth/api_scope"}
+    # Application token from the shared cache (token_provider.py) — fetched lazily, not at import
     try:
-        response = requests.post("https://api.ebay.com/identity/v1/oauth2/token", headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json().get("access_token")
-        print(f"eBay token request failed: {response.status_code} - {response.text}")
-        return None
+        return token_provider.get_token(grant="client_credentials", client_id=EBAY_CLIENT_ID,
+                                        client_secret=EBAY_CLIENT_SECRET)
     except Exception as e:
         print(f"eBay token error: {e}")
         return None
 
-EBAY_TOKEN = get_ebay_token()
-EBAY_AVAILABLE = bool(EBAY_TOKEN)
-EBAY_BASE_URL = "https://api.ebay.com/buy/browse/v1/item_summary/search" if EBAY_AVAILABLE else None
-
 def scrape_amazon_product(url, max_retries=3):
     for attempt in range(max_retries):
         try:
             params = {'url': url, 'render_js': 'false', 'country_code': 'US'}
-            response = requests.get(AMAZON_BASE_URL, params=params, timeout=15)
+            response = http_client.get(AMAZON_BASE_URL, params=params, timeout=15)
             if response.status_code != 200:
                 print(f"Amazon error on {url}: {response.status_code}")
                 time.sleep(2 ** attempt)
@@ -70,11 +63,15 @@ def scrape_amazon_product(url, max_retries=3):
 def scrape_ebay_product(item_id, max_retries=3):
     for attempt in range(max_retries):
         try:
-            if not EBAY_AVAILABLE:
+            token = get_ebay_token()
+            if not token:
                 return None
             url = f"https://api.ebay.com/buy/browse/v1/item/{item_id}"
-            headers = {"Authorization": f"Bearer {EBAY_TOKEN}", "Accept": "application/json"}
-            response = requests.get(url, headers=headers, timeout=10)
+            headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+            response = http_client.get(url, headers=headers, timeout=10)
+            if response.status_code == 401:
+                token_provider.invalidate(token, grant="client_credentials")
+                continue
             if response.status_code != 200:
                 print(f"eBay error on {item_id}: {response.status_code}")
                 time.sleep(2 ** attempt)
@@ -106,7 +103,7 @@ def scrape_amazon_search(query, max_pages=1):
         print(f"Scraping Amazon page {page}: {url}")
         try:
             params = {'url': url, 'render_js': 'true', 'country_code': 'US'}
-            response = requests.get(AMAZON_BASE_URL, params=params, timeout=15)
+            response = http_client.get(AMAZON_BASE_URL, params=params, timeout=15)
             if response.status_code != 200:
                 print(f"Amazon search page {page} failed: {response.status_code}")
                 continue
@@ -132,12 +129,13 @@ def scrape_amazon_search(query, max_pages=1):
     return results
 
 def scrape_ebay_search(query, max_entries=100):
-    if not EBAY_AVAILABLE:
+    token = get_ebay_token()
+    if not token:
         print("eBay not available, skipping...")
         return []
     results = []
     headers = {
-        "Authorization": f"Bearer {EBAY_TOKEN}",
+        "Authorization": f"Bearer {token}",
         "Accept": "application/json"
     }
     params = {
@@ -150,7 +148,7 @@ def scrape_ebay_search(query, max_entries=100):
     }
     try:
         print(f"Scraping eBay for '{query}'...")
-        response = requests.get(EBAY_BASE_URL, headers=headers, params=params, timeout=15)
+        response = http_client.get(EBAY_BASE_URL, headers=headers, params=params, timeout=15)
         if response.status_code != 200:
             print(f"eBay search failed: {response.status_code} - {response.text}")
             return results
@@ -188,13 +186,10 @@ def dual_platform_search(query, amazon_pages=1, ebay_entries=100):
     print(f"✅ Amazon: {len(amazon_results)} items scraped")
     
     # eBay search
-    if EBAY_AVAILABLE:
-        print("\n🛒 --- EBAY SEARCH ---")
-        ebay_results = scrape_ebay_search(query, max_entries=ebay_entries)
-        all_results.extend(ebay_results)
-        print(f"✅ eBay: {len(ebay_results)} items scraped")
-    else:
-        print("\n⚠️ eBay: Skipped (token unavailable)")
+    print("\n🛒 --- EBAY SEARCH ---")
+    ebay_results = scrape_ebay_search(query, max_entries=ebay_entries)
+    all_results.extend(ebay_results)
+    print(f"✅ eBay: {len(ebay_results)} items scraped")
     
     # Save combined catalog
     timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
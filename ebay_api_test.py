@@ -1,4 +1,4 @@
-import requests
+import http_client
 import os
 from dotenv import load_dotenv
 
@@ -20,7 +20,7 @@ params = {
 
 try:
     print(f"Testing eBay API key: {EBAY_APP_ID}")
-    response = requests.get(endpoint, params=params, timeout=10)
+    response = http_client.get(endpoint, params=params, timeout=10)
     print(f"Status code: {response.status_code}")
     if response.status_code == 200:
         print("API key is activated and working!")
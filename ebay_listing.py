@@ -1,6 +1,7 @@
-import requests
+import http_client
 import json
 import os
+from pack_store import PackStore
 from dotenv import load_dotenv
 
 # Load .env file
@@ -27,7 +28,7 @@ params = {
 
 try:
     print(f"Making request to: {endpoint}")
-    response = requests.get(endpoint, params=params, timeout=10)
+    response = http_client.get(endpoint, params=params, timeout=10)
     response.raise_for_status()
     data = response.json()
     print(f"API response: {json.dumps(data, indent=2)[:500]}...")  # Log first 500 chars
@@ -95,7 +96,7 @@ params = {"q": "laptop", "limit": 50}
 
 try:
     print(f"Making request to: {url}")
-    response = requests.get(url, headers=headers, params=params, timeout=10)
+    response = http_client.get(url, headers=headers, params=params, timeout=10)
     response.raise_for_status()
     data = response.json()
     print(f"API response: {json.dumps(data, indent=2)[:500]}...")  # Log first 500 chars
@@ -127,19 +128,12 @@ for item in search_results:
     }
     items.append(item_info)
 
-# Save metadata JSON for all items
+# Save metadata for all items into the pack store (see pack_store.py) — one append, not one file per listing.
+# Older per-item files: python pack_store.py migrate <base_dir>/json <base_dir>/pack
 base_dir = "/Users/stephentaykor/Desktop/flipper_Simulation/Flipper/Flipper/ebay_images"
-json_dir = os.path.join(base_dir, "json")
-os.makedirs(json_dir, exist_ok=True)
-
-for item in items:
-    title = item.get("title", "unknown_item")
-    item_id = item.get("itemId", "unknown_id")
-    safe_title = "".join(c if c.isalnum() or c in " _-" else "_" for c in title)[:50]
-    json_filename = f"{safe_title}_{item_id}.json"
-    json_path = os.path.join(json_dir, json_filename)
-    with open(json_path, "w") as f:
-        json.dump(item, f, indent=2)
-    print(f"Saved metadata for {title} to {json_path}")
+pack = PackStore(os.path.join(base_dir, "pack"))
+saved = pack.put_many((item["itemId"], item) for item in items if item.get("itemId"))
+print(f"Saved metadata for {saved} items to {pack.path} ({len(pack)} in the pack)")
+pack.close()
 
 # Test Browse API (already in the code)
@@ -2,40 +2,68 @@
 """
 Unified eBay Scraper + Verifier
 
-✅ Scrapes all eBay categories
-✅ Appends items to ONE items.json
+✅ Scrapes all eBay categories (concurrent, see async_harvester.py)
+✅ Plans the smallest query set first (duplicates / conditions merged, see query_planner.py)
+✅ Splits the daily call cap by per-query yield (see quota_allocator.py)
+✅ Stores only never-seen items (see seen_index.py) in the item store (see item_store.py)
+✅ Per-category watermarks + page cursor (crash-safe resume, see watermarks.py)
+✅ Run several workers (--workers N, or one per machine on a shared SAFE_DIR) —
+   they split the queries through a lease table (see shard_leases.py); --workers N also
+   splits the rate limits N ways (rate_limiter.share)
 ✅ Saves identifiers (GTIN/UPC/EAN/MPN)
 ✅ Creates Keepa UPC/EAN list
 ✅ Verifies listings (sold/ended vs active)
-✅ Moves sold → sold_items.json
-✅ Keeps active → items.json
-✅ Refreshes token every run
+✅ Moves sold → sold table
+✅ Keeps active in the items table
+✅ Reuses the shared cached token until it nears expiry (see token_provider.py)
 ✅ Soft OAuth reset every 26h
 """
 
-import os, json, time, random, base64, asyncio, requests
+import os, sys, json, time, random, asyncio, itertools
+import multiprocessing
+import token_provider
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from playwright.async_api import async_playwright
+import browser_pool
+import http_verifier
+import rate_limiter
+from async_harvester import harvest
+import query_planner
+from quota_allocator import QuotaAllocator
+from item_store import ItemStore
+from records import Item, Identifier
+from checkpoint_writer import CheckpointWriter
+from api_verifier import BrowseStatus
+from seen_index import SeenIndex
+from shard_leases import LeaseCoordinator, file_lock
+from watermarks import WatermarkStore, utc_stamp
 
 # ------------------- PATHS -------------------
 BASE = "/Users/stephentaykor/Desktop/flipper_Simulation"
 ENV_FILE = f"{BASE}/Flipper_AI/.env"
 
 SAFE_DIR         = f"{BASE}/my_items_safe"
-ITEMS_FILE       = f"{SAFE_DIR}/items.json"
-SOLD_FILE        = f"{SAFE_DIR}/sold_items.json"
-IDENTIFIERS_FILE = f"{SAFE_DIR}/ebay_item_identifiers.json"
+ITEMS_FILE       = f"{SAFE_DIR}/items.json"   # pre-store inventory, imported once
+STORE_FILE       = f"{SAFE_DIR}/flipper_items.sqlite"
 KEEPA_FILE       = f"{SAFE_DIR}/keepa_ebay_ids.json"
 LOG_FILE         = f"{SAFE_DIR}/ebay_scraper.log"
 LAST_SCRAPE_FILE = f"{SAFE_DIR}/last_scrape_time.json"
+WATERMARK_FILE   = f"{SAFE_DIR}/scrape_watermarks.json"
+TAXONOMY_CACHE_FILE = f"{SAFE_DIR}/category_parents.json"
+QUOTA_FILE       = f"{SAFE_DIR}/browse_quota.json"
+SEEN_INDEX_FILE  = f"{SAFE_DIR}/seen_items.sqlite"
+LEASE_FILE       = f"{SAFE_DIR}/shard_leases.sqlite"
 
 os.makedirs(SAFE_DIR, exist_ok=True)
 
 # ------------------- SETTINGS -------------------
-REQUEST_DELAY = (2.5, 6.0)
+DAILY_CALL_CAP = 5000    # Browse calls per day, split by yield (see quota_allocator.py)
+CYCLE_SECONDS = 7200     # one scrape window (lease round) every 2 hours
+CLAIM_BATCH = 4          # shards a worker leases at a time
+VERIFY_SHARD = "__verify__"   # one worker per round runs the URL verifier
 SOFT_RESET_HOURS = 26
 VERIFY_BATCH_PRINT = 50
+VERIFY_CONCURRENCY = 10   # items checked at once (HTTP tier + browser)
 
 USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
@@ -119,123 +147,180 @@ def load_env():
         "EBAY_REFRESH_TOKEN": os.getenv("EBAY_REFRESH_TOKEN"),
     }
 
-def append_json(path, data):
-    try: x = json.load(open(path))
-    except: x = []
-    x.extend(data)
-    json.dump(x, open(path, "w"), indent=2)
-
 def refresh_token(cfg):
-    creds = base64.b64encode(f"{cfg['EBAY_CLIENT_ID']}:{cfg['EBAY_CLIENT_SECRET']}".encode()).decode()
-    r = requests.post(
-        "https://api.ebay.com/identity/v1/oauth2/token",
-        headers={"Authorization": f"Basic {creds}", "Content-Type": "application/x-www-form-urlencoded"},
-        data={"grant_type": "refresh_token", "refresh_token": cfg["EBAY_REFRESH_TOKEN"], "scope":"https://api.ebay.com/oauth/api_scope"}
-    )
-    return r.json().get("access_token")
+    # Shared cached token — only hits the identity API when it is close to expiry
+    return token_provider.get_token(client_id=cfg["EBAY_CLIENT_ID"], client_secret=cfg["EBAY_CLIENT_SECRET"],
+                                    refresh_token=cfg["EBAY_REFRESH_TOKEN"])
 
 def get_last_scrape_time():
+    """Old single global timestamp — only used to seed queries that have no watermark yet."""
     try:
         with open(LAST_SCRAPE_FILE, "r") as f:
             data = json.load(f)
-            return data.get("last_scrape")
+            return utc_stamp(datetime.fromisoformat(data["last_scrape"]))
     except:
         return None
 
-def save_last_scrape_time(timestamp):
-    with open(LAST_SCRAPE_FILE, "w") as f:
-        json.dump({"last_scrape": timestamp}, f)
-
 # ------------------- SCRAPE -------------------
-def scrape(token):
-    ids = []  # Collect all ids for keepa at end
-    h = {"Authorization": f"Bearer {token}", "User-Agent": random.choice(USER_AGENTS)}
+async def scrape(token, leases, round_id):
+    ids = []  # Collect all ids for keepa at end (records.Identifier — slots, not dicts)
+    per_cat = {}
+    total = 0
+
+    marks = WatermarkStore(WATERMARK_FILE, seed=get_last_scrape_time(), log=log)
+    quota = QuotaAllocator(QUOTA_FILE, daily_cap=DAILY_CALL_CAP, cycle_seconds=CYCLE_SECONDS, log=log)
+    parents = query_planner.load_category_parents(token, TAXONOMY_CACHE_FILE, log=log)
+    # max_calls=1: every planned query costs at least its first page
+    planned, _ = query_planner.plan(CATEGORIES, CONDITIONS, max_calls=1, parents=parents, log=log)
+
+    budget = quota.window_budget()
+    alloc = quota.allocate([q["key"] for q in planned], budget)
+    for q in planned:
+        q["max_calls"] = alloc[q["key"]]
+    planned = [q for q in planned if q["max_calls"]]
+    log(f"🎯 Window budget {budget} calls over {len(planned)} queries")
+    by_key = {q["key"]: q for q in planned}
+    seen = SeenIndex(SEEN_INDEX_FILE, seed_from=ITEMS_FILE, log=log)
+    store = ItemStore(STORE_FILE, seed_dir=SAFE_DIR, log=log)
+    stats = {"calls": 0, "items": 0, "failed": 0}
+
+    def on_page(query, offset, batch):
+        nonlocal total
+        cat = query["category"]
+        new, known = seen.split(it["itemId"] for it in batch)
+        fresh = set(new)
+        items, page_ids = [], []
+        for it in batch:
+            if it["itemId"] not in fresh:
+                continue  # known listing — only its last_seen is touched
+            fresh.discard(it["itemId"])
+            items.append(Item.from_browse(it, category=cat["name"]))
+            page_ids.append(Identifier.from_browse(it))
+        # Persist the page before moving its cursor so a crash never skips items
+        if items:
+            store.upsert_items(items)
+            store.upsert_identifiers(page_ids)
+        seen.mark(new, known)
+        marks.page_done(query, offset, len(batch), batch[-1].get("itemCreationDate") if batch else None)
+        leases.renew(query["key"])
+        quota.record(query["key"], 1, len(new))
+        ids.extend(page_ids)
+        total += len(items)
+        per_cat[cat["name"]] = per_cat.get(cat["name"], 0) + len(items)
 
-    last_scrape = get_last_scrape_time()
-    if last_scrape:
-        filter_time = f"itemStartDate:[{last_scrape}..NOW]"
-    else:
-        filter_time = "itemStartDate:[NOW/HOUR-2..NOW]"  # Fallback for first run
-
-    for cat in CATEGORIES:
-        items = []  # Reset items per category
-        call_count = 0  # Track API calls per category (max 10)
-        for cond in CONDITIONS:
-            offset = 0
-            while call_count < 10:  # Limit to 10 calls per category
-                params = {
-                    "category_ids": cat["id"], "q": cat["name"].lower(),
-                    "limit": "200", "offset": offset,
-                    "filter": f"conditionIds:{cond['id']},{filter_time}",
-                    "fieldgroups":"PRODUCT",
-                }
-
-                r = requests.get("https://api.ebay.com/buy/browse/v1/item_summary/search", headers=h, params=params)
-                batch = r.json().get("itemSummaries", [])
-                call_count += 1  # Increment call count
-                if not batch: break
-
-                for it in batch:
-                    items.append({
-                        "item_id": it["itemId"], "title": it.get("title"),
-                        "url": it.get("itemWebUrl"), "price": it.get("price",{}).get("value"),
-                        "condition": it.get("condition"), "category": cat["name"],
-                        "scraped_at": datetime.now().isoformat()
-                    })
-                    prod = it.get("product") or {}
-                    ids.append({
-                        "item_id": it["itemId"], "brand": prod.get("brand"),
-                        "mpn": prod.get("mpn"), "gtin": prod.get("gtin"),
-                        "upc": prod.get("upc"), "ean": prod.get("ean")
-                    })
-
-                if len(batch) < 200: break
-                offset += 200
-                time.sleep(random.uniform(*REQUEST_DELAY))
-                if call_count >= 10:
-                    break  # Exit condition loop if limit hit
-            if call_count >= 10:
-                break  # Exit category if limit hit
-
-        # Save items at the end of each category
-        append_json(ITEMS_FILE, items)
-        log(f"✅ Scraped and saved {len(items)} items from category {cat['name']}")
+    try:
+        # Lease a few shards at a time until every query in this round is done by someone
+        while keys := leases.claim(list(by_key), round_id, limit=CLAIM_BATCH):
+            try:
+                part = await harvest(token, marks.plan([by_key[k] for k in keys]), on_page,
+                                     on_done=marks.query_done, on_unauthorized=token_provider.invalidate,
+                                     user_agent=random.choice(USER_AGENTS), log=log)
+            except BaseException:
+                leases.release(keys)   # not done — free them for another worker right away
+                raise
+            leases.release(keys, round_id)
+            quota.close_window(part["calls"])
+            for k in stats:
+                stats[k] += part[k]
+    finally:
+        seen.close()
+        store.close()
+    log(f"🧩 Round {round_id}: {leases.status(round_id)}")
+
+    for name, n in per_cat.items():
+        log(f"✅ Scraped and saved {n} items from category {name}")
+    log(f"📡 {stats['calls']} Browse calls, {stats['failed']} failed pages, {total} new items saved")
 
     return ids
 
 # ------------------- VERIFY URLs -------------------
-async def verify_urls():
-    try: items = json.load(open(ITEMS_FILE))
-    except: return
-
-    sold, active = [], []
-
-    async with async_playwright() as pw:
-        browser = await pw.chromium.launch(headless=True)
-        for idx, it in enumerate(items):
-            if idx % VERIFY_BATCH_PRINT == 0:
-                log(f"Verifying {idx}/{len(items)}")
-
-            page = await browser.new_page()
-            try:
-                await page.goto(it["url"], timeout=15000)
-                ended = await page.locator("text=listing has ended").count()
-                removed = await page.locator("text=listing was ended").count()
-                gone = await page.locator("text=longer available").count()
-
-                (sold if (ended or removed or gone) else active).append(it)
-            except:
-                active.append(it)
-            await page.close()
-        await browser.close()
+async def browser_sold(pool, url, full=False):
+    """True / False from the rendered page; None when it came back as a bot challenge."""
+    try:
+        async with pool.page(full=full) as page:
+            await page.goto(url, timeout=15000)
+            if await page.locator("text=Pardon Our Interruption").count():
+                pool.recycle(page)
+                return None
+            ended = await page.locator("text=listing has ended").count()
+            removed = await page.locator("text=listing was ended").count()
+            gone = await page.locator("text=longer available").count()
+            return bool(ended or removed or gone)
+    except:
+        return False
 
-    append_json(SOLD_FILE, sold)
-    json.dump(active, open(ITEMS_FILE,"w"), indent=2)
-    log(f"✅ Sold moved: {len(sold)} | Active saved: {len(active)}")
+async def verify_urls(leases, token):
+    store = ItemStore(STORE_FILE, log=log)
+    writer = None
+    try:
+        total = store.count_due()   # the schedule decides what is worth re-checking (see recheck.py)
+        writer = CheckpointWriter(STORE_FILE, log=log)   # checkpoints as it goes, not one write at the end
+        counts = {"sold": 0, "active": 0, "unknown": 0, "cached": 0}
+        rows = store.due(typed=True)
+        sem = asyncio.Semaphore(VERIFY_CONCURRENCY)
+
+        pool = await browser_pool.shared()   # warm pages, reused between items
+        pages = await http_verifier.shared(log=log)
+        quota = QuotaAllocator(QUOTA_FILE, daily_cap=DAILY_CALL_CAP, cycle_seconds=CYCLE_SECONDS, log=log)
+        async with BrowseStatus(token, log=log, quota=quota) as api:   # getItems spends the same daily cap
+
+            async def verify(it, known):
+                fast, evidence = known.get(it.item_id), "api"
+                async with sem:
+                    if not fast and it.url:
+                        fast, evidence = await pages.status(it.url), "http"
+                    if fast:
+                        is_sold = fast[0] == "sold"
+                    else:   # neither the API nor the raw HTML could tell — open the page
+                        evidence = "browser"
+                        is_sold = await browser_sold(pool, it.url)
+                        if is_sold is None:   # challenge — retry where its scripts can run
+                            is_sold = await browser_sold(pool, it.url, full=True)
+                # Only the checked rows change — items other workers added meanwhile are untouched
+                if is_sold:
+                    writer.sold(it, evidence=evidence)
+                    counts["sold"] += 1
+                elif not it.item_id:
+                    return
+                elif is_sold is None:   # still walled — never a verdict, retried soon
+                    writer.checked(it.item_id, "unknown", evidence="bot_detected")
+                    counts["unknown"] += 1
+                else:
+                    writer.checked(it.item_id, "active", evidence=evidence)
+                    counts["active"] += 1
+
+            idx = 0
+            while chunk := list(itertools.islice(rows, VERIFY_BATCH_PRINT)):
+                log(f"Verifying {idx}/{total}")
+                leases.renew(VERIFY_SHARD)
+                idx += len(chunk)
+                cached = store.fresh(it.item_id for it in chunk)   # checked within its TTL — no request
+                chunk = [it for it in chunk if it.item_id not in cached]
+                counts["cached"] += len(cached)
+                known = await api.statuses([it.item_id for it in chunk])   # getItems first
+                await asyncio.gather(*(verify(it, known) for it in chunk))
+        log(f"✅ Sold moved: {counts['sold']} | Active saved: {counts['active']} | Unknown: {counts['unknown']} "
+            f"| Cached: {counts['cached']} | Browse API {api.stats}")
+    finally:
+        await http_verifier.close_shared()
+        await browser_pool.close_shared()
+        if writer:
+            writer.close()
+        store.close()
 
 # ------------------- MAIN LOOP -------------------
+def save_keepa_ids(ids, round_id):
+    """This round's UPC/EAN list — merged with what other workers wrote this round."""
+    keepa = {code for d in ids for code in d.codes()}
+    with file_lock(KEEPA_FILE):
+        if os.path.exists(KEEPA_FILE) and os.path.getmtime(KEEPA_FILE) >= round_id * CYCLE_SECONDS:
+            try: keepa.update(json.load(open(KEEPA_FILE)))
+            except: pass
+        json.dump(sorted(keepa), open(KEEPA_FILE,"w"), indent=2)
+
 async def main():
     start = datetime.now()
+    leases = LeaseCoordinator(LEASE_FILE, log=log)
 
     while True:
         if datetime.now() - start > timedelta(hours=SOFT_RESET_HOURS):
@@ -250,22 +335,37 @@ async def main():
             time.sleep(300)
             continue
 
-        log("🚀 Scraping...")
-        ids = scrape(token)
-        append_json(IDENTIFIERS_FILE, ids)
-
-        keepa = sorted({d[k] for d in ids for k in ("gtin","upc","ean") if d.get(k)})
-        json.dump(keepa, open(KEEPA_FILE,"w"), indent=2)
-
-        # Save the current time as last scrape time
-        save_last_scrape_time(datetime.now().isoformat())
-
+        round_id = leases.current_round(CYCLE_SECONDS)
+        log(f"🚀 Scraping (worker {leases.worker_id}, round {round_id})...")
+        ids = await scrape(token, leases, round_id)
+        save_keepa_ids(ids, round_id)
         log(f"✅ Scraping complete")
-        log("🔎 Verifying...")
-        await verify_urls()
 
-        log("⏳ Sleeping 2 hours...")  # Changed to 2 hours
-        time.sleep(7200)  # Changed to 7200 seconds
+        if leases.claim([VERIFY_SHARD], round_id):
+            log("🔎 Verifying...")
+            try:
+                await verify_urls(leases, token)
+            except BaseException:
+                leases.release([VERIFY_SHARD])
+                raise
+            leases.release([VERIFY_SHARD], round_id)
+
+        wait = leases.seconds_to_next_round(CYCLE_SECONDS)
+        log(f"⏳ Sleeping {wait/60:.0f} min until the next round...")
+        time.sleep(wait)
+
+def run_worker(workers=1):
+    rate_limiter.share(workers)   # buckets are per process — split the rates between the workers
+    asyncio.run(main())
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # --workers N: N scraper processes on this machine sharing the lease table
+    n = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else 1
+    if n == 1:
+        run_worker()
+    else:
+        procs = [multiprocessing.Process(target=run_worker, args=(n,), name=f"scraper-{i}") for i in range(n)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
@@ -1,17 +1,21 @@
 #!/usr/bin/env python3
-import os, json, time, random, base64
-import requests
+import os, json, time, random
+import http_client
+import token_provider
 from datetime import datetime
 from dotenv import load_dotenv
+from item_store import ItemStore
+from seen_index import SeenIndex
 
 # Paths
 BASE = "/Users/stephentaykor/Desktop/flipper_Simulation"
 ENV = f"{BASE}/Flipper_AI/.env"
 OUT = f"{BASE}/my_items_safe"
-ITEMS_FILE = f"{OUT}/items.json"
-IDENT_FILE = f"{OUT}/identifiers.json"
+ITEMS_FILE = f"{OUT}/items.json"   # pre-store inventory, imported once
+STORE_FILE = f"{OUT}/flipper_items.sqlite"
 KEEPA_FILE = f"{OUT}/keepa_ids.json"
 LOG = f"{OUT}/ebay_scrape.log"
+SEEN_INDEX_FILE = f"{OUT}/seen_items.sqlite"  # shared with ebay_scraper_no_rocket_sauce.py (same item store)
 
 os.makedirs(OUT, exist_ok=True)
 load_dotenv(ENV)
@@ -30,25 +34,7 @@ def log(msg):
     print(msg)
 
 def refresh_token():
-    cid = os.getenv("EBAY_CLIENT_ID")
-    sec = os.getenv("EBAY_CLIENT_SECRET")
-    ref = os.getenv("EBAY_REFRESH_TOKEN")
-    h = base64.b64encode(f"{cid}:{sec}".encode()).decode()
-
-    r = requests.post(
-        "https://api.ebay.com/identity/v1/oauth2/token",
-        headers={"Authorization": f"Basic {h}", "Content-Type":"application/x-www-form-urlencoded"},
-        data={"grant_type":"refresh_token","refresh_token":ref,"scope":"https://api.ebay.com/oauth/api_scope"},
-        timeout=30
-    )
-    return r.json().get("access_token")
-
-def append(path, data):
-    old = []
-    if os.path.exists(path):
-        try: old = json.load(open(path))
-        except: pass
-    json.dump(old + data, open(path, "w"), indent=2)
+    return token_provider.get_token()
 
 def scrape():
     token = refresh_token()
@@ -56,18 +42,26 @@ def scrape():
 
     log("🔍 Scraping eBay...")
     headers = {"Authorization":f"Bearer {token}","User-Agent":random.choice(USER_AGENTS)}
-    all_items, all_ids = [], set()
+    all_items, all_idents, all_ids = [], [], set()
+    seen = SeenIndex(SEEN_INDEX_FILE, seed_from=ITEMS_FILE, log=log)
+    new_ids, known_ids = set(), set()
 
     for cat in CATS:
         for cond in CONDS:
             offset = 0
             while True:
                 p = {"category_ids":cat,"limit":"200","offset":str(offset),"filter":f"conditionIds:{cond}"}
-                r = requests.get("https://api.ebay.com/buy/browse/v1/item_summary/search",headers=headers,params=p,timeout=60)
+                r = http_client.get("https://api.ebay.com/buy/browse/v1/item_summary/search",headers=headers,params=p,timeout=60)
                 data = r.json().get("itemSummaries",[])
                 if not data: break
 
+                new, known = seen.split(x.get("itemId") for x in data)
+                known_ids.update(known)
                 for x in data:
+                    iid = x.get("itemId")
+                    if iid not in new or iid in new_ids:
+                        continue  # already stored — just touched in the seen index
+                    new_ids.add(iid)
                     all_items.append({
                         "item_id":x.get("itemId"),
                         "title":x.get("title"),
@@ -77,18 +71,23 @@ def scrape():
                         "category":cat,
                         "scraped_at":datetime.now().isoformat(),
                     })
+                    prod = x.get("product") or {}
+                    all_idents.append({"item_id":iid, **{k:prod.get(k) for k in ("brand","mpn","gtin","upc","ean")}})
                     for key in ("gtin","upc","ean"):
-                        v = (x.get("product") or {}).get(key)
+                        v = prod.get(key)
                         if v: all_ids.add(v)
 
-                offset += 200
-                time.sleep(random.uniform(1.2, 2.0))
+                offset += 200   # http_client paces Browse calls
 
-    append(ITEMS_FILE, all_items)
-    append(IDENT_FILE, [{"code":c} for c in all_ids])
+    store = ItemStore(STORE_FILE, seed_dir=OUT, log=log)
+    store.upsert_items(all_items)
+    store.upsert_identifiers(all_idents)
+    store.close()
+    seen.mark(new_ids, known_ids)
+    seen.close()
     json.dump(sorted(all_ids), open(KEEPA_FILE,"w"), indent=2)
 
-    log(f"✅ Scraped {len(all_items)} new items")
+    log(f"✅ Scraped {len(all_items)} new items ({len(known_ids)} already known)")
     log(f"✅ {len(all_ids)} product codes saved for Keepa")
 
 if __name__ == "__main__":
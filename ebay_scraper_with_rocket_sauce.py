@@ -4,7 +4,7 @@ ebay_scraper_with_rocket_sauce.py
 
 What this does (in order):
 0) Quick RocketSource connectivity PRECHECK (multipart upload) so you know it's alive
-1) Refresh eBay OAuth token
+1) Get the shared eBay OAuth token (refreshed only near expiry)
 2) Scrape eBay listings by category + condition (PRODUCT fieldgroup enabled)
 3) Extract identifiers (brand/mpn/gtin/upc/ean)
 4) Send to RocketSource (multipart upload) to map → ASINs
@@ -12,11 +12,15 @@ What this does (in order):
 6) Repeat every 2 hours (same cadence as your other script)
 """
 
-import os, json, time, random, base64, csv, io
-import requests
+import os, json, time, random, csv, io, asyncio
+import http_client
+import token_provider
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import subprocess
+from async_harvester import build_queries, harvest
+from item_store import ItemStore
+from seen_index import SeenIndex
 
 # ───────────────────────────────────────────────
 # PATHS / CONFIG
@@ -26,17 +30,17 @@ ENV_FILE = f"{BASE_DIR}/Flipper_AI/.env"
 
 OUTPUT_DIR         = f"{BASE_DIR}/my_items_safe"
 RECENT_DIR         = f"{BASE_DIR}/my_items_recent"
-ITEMS_FILE         = f"{OUTPUT_DIR}/ebay_items.json"
-IDENTIFIERS_FILE   = f"{OUTPUT_DIR}/ebay_item_identifiers.json"
+ITEMS_FILE         = f"{OUTPUT_DIR}/ebay_items.json"   # pre-store output, seeds the seen index
+STORE_FILE         = f"{OUTPUT_DIR}/flipper_items.sqlite"
 ROCKET_RESULTS_FILE= f"{OUTPUT_DIR}/rocket_results.json"
 KEEPA_INPUT_FILE   = f"{OUTPUT_DIR}/keepa_ebay_ids.json"
 PIPELINE_LOG       = f"{OUTPUT_DIR}/ebay_scraper_with_rocket_sauce.log"
 PRECHECK_LOG       = f"{OUTPUT_DIR}/rocket_precheck.log"
+SEEN_INDEX_FILE    = f"{OUTPUT_DIR}/ebay_items_seen.sqlite"
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(RECENT_DIR, exist_ok=True)
 
-REQUEST_DELAY = (2.5, 5.0)
 MAX_RETRIES   = 5
 RUN_INTERVAL_SECONDS = 2 * 60 * 60   # 2 hours
 
@@ -91,100 +95,71 @@ def load_env():
     return conf
 
 def refresh_ebay_token(client_id, client_secret, refresh_token):
-    plog("🔑 Refreshing eBay OAuth token")
-    creds = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
-    resp = requests.post(
-        "https://api.ebay.com/identity/v1/oauth2/token",
-        headers={
-            "Authorization": f"Basic {creds}",
-            "Content-Type": "application/x-www-form-urlencoded",
-        },
-        data={
-            "grant_type": "refresh_token",
-            "refresh_token": refresh_token,
-            "scope": "https://api.ebay.com/oauth/api_scope"
-        },
-        timeout=30,
-    )
-    if resp.status_code == 200:
-        plog("✅ Token refreshed successfully")
-        return resp.json()["access_token"]
-    plog(f"❌ Failed to refresh token: {resp.status_code} {resp.text}")
-    return None
+    # Shared cached token (token_provider.py) — only mints a new one near expiry
+    token = token_provider.get_token(client_id=client_id, client_secret=client_secret, refresh_token=refresh_token)
+    if token:
+        plog("✅ eBay token ready")
+    else:
+        plog("❌ Failed to get eBay token")
+    return token
 
 # ───────────────────────────────────────────────
 # EBAY SCRAPER (PRODUCT fieldgroup enabled)
 # ───────────────────────────────────────────────
-def append_json(path, data_list):
-    existing = []
-    if os.path.exists(path):
-        try:
-            with open(path, "r") as f:
-                existing = json.load(f)
-        except Exception:
-            existing = []
-    existing.extend(data_list)
-    with open(path, "w") as f:
-        json.dump(existing, f, indent=2)
-
 def scrape_ebay_items(token):
     plog("🔍 Scraping eBay items (with PRODUCT fieldgroup)...")
-    headers = {"Authorization": f"Bearer {token}", "User-Agent": random.choice(USER_AGENTS)}
     all_items, identifiers = [], []
-
-    for cat in CATEGORIES:
-        for cond in CONDITIONS:
-            params = {
-                "category_ids": cat["id"],
-                "q": cat["name"].lower(),
-                "limit": "200",
-                "filter": f"conditionIds:{cond['id']}",
-                "fieldgroups": "PRODUCT",  # 👈 this is key to populate product identifiers
-            }
-            try:
-                resp = requests.get(
-                    "https://api.ebay.com/buy/browse/v1/item_summary/search",
-                    headers=headers, params=params, timeout=60
-                )
-                plog(f"📦 {cat['name']} ({cond['name']}) → {resp.status_code}")
-            except Exception as e:
-                plog(f"💥 eBay request error: {e}")
-                time.sleep(3)
+    seen = SeenIndex(SEEN_INDEX_FILE, seed_from=ITEMS_FILE, log=plog)
+    new_ids, known_ids = set(), set()
+
+    def on_page(query, offset, batch):
+        cat, cond = query["category"], query["condition"]
+        new, known = seen.split(i.get("itemId") for i in batch)
+        new -= new_ids  # same listing from two queries this run
+        known_ids.update(known)
+        plog(f"📦 {cat['name']} ({cond['name']}) offset {offset} → {len(batch)} items, {len(new)} new")
+        for i in batch:
+            iid = i.get("itemId")
+            if iid not in new:
                 continue
-
-            if resp.status_code != 200:
-                time.sleep(3)
-                continue
-
-            data = resp.json()
-            for i in data.get("itemSummaries", []):
-                iid = i.get("itemId")
-                title = i.get("title", "")
-                all_items.append({
+            new.discard(iid)
+            new_ids.add(iid)
+            title = i.get("title", "")
+            all_items.append({
+                "item_id": iid,
+                "title": title,
+                "price": i.get("price", {}).get("value"),
+                "url": i.get("itemWebUrl"),
+                "condition": i.get("condition"),
+                "category": cat["name"],
+                "scraped_at": datetime.now().isoformat(),
+            })
+            prod = (i.get("product") or {})  # might be missing
+            if prod:
+                identifiers.append({
                     "item_id": iid,
                     "title": title,
-                    "price": i.get("price", {}).get("value"),
-                    "url": i.get("itemWebUrl"),
-                    "condition": i.get("condition"),
-                    "category": cat["name"],
-                    "scraped_at": datetime.now().isoformat(),
+                    "brand": prod.get("brand"),
+                    "mpn":   prod.get("mpn"),
+                    "gtin":  prod.get("gtin"),
+                    "upc":   prod.get("upc"),
+                    "ean":   prod.get("ean"),
                 })
-                prod = (i.get("product") or {})  # might be missing
-                if prod:
-                    identifiers.append({
-                        "item_id": iid,
-                        "title": title,
-                        "brand": prod.get("brand"),
-                        "mpn":   prod.get("mpn"),
-                        "gtin":  prod.get("gtin"),
-                        "upc":   prod.get("upc"),
-                        "ean":   prod.get("ean"),
-                    })
-            time.sleep(random.uniform(*REQUEST_DELAY))
-
-    append_json(ITEMS_FILE, all_items)
-    append_json(IDENTIFIERS_FILE, identifiers)
-    plog(f"💾 Saved {len(all_items)} items, {len(identifiers)} identifiers.")
+
+    # One page per category/condition, same as before — just all at once
+    queries = build_queries(CATEGORIES, CONDITIONS, max_calls=len(CONDITIONS))
+    stats = asyncio.run(harvest(token, queries, on_page, on_unauthorized=token_provider.invalidate,
+                                user_agent=random.choice(USER_AGENTS), log=plog))
+    plog(f"📡 {stats['calls']} Browse calls, {stats['failed']} failed pages")
+
+    store = ItemStore(STORE_FILE, seed_dir=OUTPUT_DIR, log=plog)
+    store.upsert_items(all_items)
+    store.upsert_identifiers(identifiers)
+    store.export_identifiers(OUTPUT_DIR)   # converter / RocketSource scripts read the JSON file
+    store.close()
+    seen.mark(new_ids, known_ids)
+    seen.close()
+    plog(f"💾 Saved {len(all_items)} new items, {len(identifiers)} identifiers ({len(known_ids)} already known).")
     return identifiers
 
 # ───────────────────────────────────────────────
@@ -237,7 +212,7 @@ def rocketsource_precheck(rocket_key):
     data = {"marketplace":"amazon"}
 
     try:
-        r = requests.post(ROCKETSOURCE_ENDPOINT, headers=headers, data=data, files=files, timeout=30)
+        r = http_client.post(ROCKETSOURCE_ENDPOINT, headers=headers, data=data, files=files, timeout=30)
         prelog(f"🔌 JSON-multipart status: {r.status_code}")
         if 200 <= r.status_code < 300:
             prelog(f"✅ Precheck OK (JSON multipart). Snippet: {r.text[:200]}")
@@ -252,7 +227,7 @@ def rocketsource_precheck(rocket_key):
         "file": ("items.csv", _identifiers_to_csv_bytes(probe_items), "text/csv")
     }
     try:
-        r = requests.post(ROCKETSOURCE_ENDPOINT, headers=headers, data=data, files=files, timeout=30)
+        r = http_client.post(ROCKETSOURCE_ENDPOINT, headers=headers, data=data, files=files, timeout=30)
         prelog(f"🔌 CSV-multipart status: {r.status_code}")
         if 200 <= r.status_code < 300:
             prelog(f"✅ Precheck OK (CSV multipart). Snippet: {r.text[:200]}")
@@ -284,7 +259,7 @@ def run_rocket_sauce(api_key, identifiers):
         data = {"marketplace": "amazon"}
 
         try:
-            r = requests.put(url, headers=headers, data=data, files=files, timeout=90)  # <-- changed to PUT
+            r = http_client.put(url, headers=headers, data=data, files=files, timeout=90)  # <-- changed to PUT
             if 200 <= r.status_code < 300:
                 results = r.json().get("results", [])
                 for r_item in results:
@@ -296,8 +271,6 @@ def run_rocket_sauce(api_key, identifiers):
         except Exception as e:
             log_both(f"💥 RocketSource exception: {e}")
 
-        time.sleep(3)
-
     asin_file = f"{OUTPUT_DIR}/rocket_results.json"
     with open(asin_file, "w") as f:
         json.dump(asin_map, f, indent=2)
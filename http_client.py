@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+http_client.py
+One shared requests.Session for every stage (scrapers, OAuth, RocketSource, ScrapingDog).
+
+✅ Keep-alive connection pool per host (no new TCP/TLS handshake per call)
+✅ gzip/deflate responses
+✅ Central connect/read timeouts
+✅ Retries on connection errors and 5xx — idempotent methods only, unless the call passes idempotent=True
+✅ Paced per upstream by rate_limiter.py; 429/503 slow that upstream down and are retried
+✅ Response hooks for request metrics
+
+Usage:
+    import http_client
+    r = http_client.get(url, headers=..., params=...)
+    r = http_client.post(url, data=..., timeout=90)   # per-call override
+    r = http_client.post(TOKEN_URL, data=..., idempotent=True)   # safe to resend → 5xx retried too
+"""
+
+import threading
+from urllib.parse import urlparse
+import requests
+import rate_limiter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ───────────────────────────────────────────────
+# SETTINGS
+# ───────────────────────────────────────────────
+DEFAULT_TIMEOUT = (10, 60)         # (connect, read) seconds
+POOL_HOSTS      = 16               # host pools kept alive
+POOL_PER_HOST   = 32               # connections kept per host
+RETRY_TOTAL     = 3
+RETRY_BACKOFF   = 1.0              # 1s, 2s, 4s ...
+RETRY_STATUSES  = (500, 502, 504)   # 429/503 go through the rate limiter instead
+THROTTLE_STATUSES = (429, 503)
+
+_sessions = {}
+_lock = threading.Lock()
+_hooks = []
+_metrics = {}
+
+# ───────────────────────────────────────────────
+# METRICS
+# ───────────────────────────────────────────────
+def add_hook(fn):
+    """Register fn(response) — called after every response from the shared session."""
+    _hooks.append(fn)
+
+def metrics():
+    """Per-host counters: calls, errors (>=400), seconds, bytes."""
+    with _lock:
+        return {h: dict(m) for h, m in _metrics.items()}
+
+def _record(resp, *args, **kwargs):
+    host = urlparse(resp.url).hostname or "?"
+    size = resp.headers.get("Content-Length")
+    with _lock:
+        m = _metrics.setdefault(host, {"calls": 0, "errors": 0, "seconds": 0.0, "bytes": 0})
+        m["calls"] += 1
+        m["errors"] += resp.status_code >= 400
+        m["seconds"] += resp.elapsed.total_seconds()
+        m["bytes"] += int(size) if size and size.isdigit() else 0
+    for fn in _hooks:
+        try:
+            fn(resp)
+        except Exception as e:
+            print(f"⚠️ http_client hook failed: {e}")
+    return resp
+
+# ───────────────────────────────────────────────
+# SESSION
+# ───────────────────────────────────────────────
+def session(idempotent=False):
+    """
+    The process-wide pooled session (created on first use). urllib3 only retries its
+    default idempotent methods; idempotent=True gives a second session that retries
+    every method, for POST/PATCH calls the caller knows are safe to resend.
+    """
+    s = _sessions.get(idempotent)
+    if s is None:
+        with _lock:
+            s = _sessions.get(idempotent)
+            if s is None:
+                retry = Retry(
+                    total=RETRY_TOTAL, connect=RETRY_TOTAL, read=RETRY_TOTAL,
+                    status=RETRY_TOTAL, backoff_factor=RETRY_BACKOFF,
+                    status_forcelist=RETRY_STATUSES,
+                    respect_retry_after_header=True, raise_on_status=False,
+                    **({"allowed_methods": None} if idempotent else {}),
+                )
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_PER_HOST, max_retries=retry)
+                s = requests.Session()
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers.update({"Accept-Encoding": "gzip, deflate"})
+                s.hooks["response"].append(_record)
+                _sessions[idempotent] = s
+    return s
+
+def request(method, url, idempotent=False, **kwargs):
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    bucket = rate_limiter.for_url(url)
+    # Open file handles can't be re-sent, so those uploads get one shot
+    replayable = not any(hasattr(v[1] if isinstance(v, tuple) else v, "read")
+                         for v in (kwargs.get("files") or {}).values())
+    for attempt in range(RETRY_TOTAL + 1):
+        bucket.acquire()
+        resp = session(idempotent).request(method, url, **kwargs)
+        bucket.observe(resp.status_code, resp.headers.get("Retry-After"))
+        if resp.status_code not in THROTTLE_STATUSES or attempt == RETRY_TOTAL or not replayable:
+            return resp
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)
+
+def head(url, **kwargs):
+    return request("HEAD", url, **kwargs)
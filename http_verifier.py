@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+http_verifier.py
+Browserless first tier for item-page checks: a plain GET through the same proxy, classified
+from the raw HTML. Only bot walls and pages it can't call go on to the browser (browser_pool.py).
+
+✅ One aiohttp session per proxy endpoint — keep-alive connections reused across checks
+✅ Redirects followed: a listing bounced to search / category browse (GONE_PATHS) counts as ended;
+   a redirect to the challenge or sign-in pages is a bot wall, anywhere else escalates
+✅ 404 / 410 → ended; 403 / 429 / 503 / challenge page → escalate and slow that proxy down
+✅ Paced per proxy exit ("ebay_web@host:port" in rate_limiter.py), so N proxies give N× the rate
+✅ gzip, no JS, no sub-resources — a check is one parse of one document (stats["bytes"] is the wire size)
+
+Result per URL:
+    ("sold", price)   ended / out of stock / gone
+    ("active", None)  buyable and nothing says it ended
+    None              challenge, error, no clear marker or both kinds of marker → browser tier
+
+Usage:
+    pages = await http_verifier.shared()
+    result = await pages.status(url, proxy_url) or await browser_check(url, proxy_url)
+    await http_verifier.close_shared()
+"""
+
+import asyncio, re
+from urllib.parse import urlparse
+import aiohttp
+import rate_limiter
+
+MAX_PER_PROXY   = 16          # open connections per proxy endpoint
+REQUEST_TIMEOUT = 20
+MAX_REDIRECTS   = 5
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate",
+}
+GONE_STATUSES  = {404, 410}
+CHALLENGE = ("pardon our interruption", "checking your browser")
+CHALLENGE_PATHS = ("/splashui/", "/signin", "/ws/ebayisapi.dll")   # bot wall / forced sign-in
+GONE_PATHS = ("/sch/", "/b/")   # where eBay sends a removed listing
+ENDED = ("listing has ended", "listing was ended", "no longer available", "ended by the seller",
+         "schema.org/outofstock", "schema.org/soldout")
+ACTIVE = ("schema.org/instock", "add to cart", "place bid")
+_PRICE = re.compile(r'itemprop="price"[^>]*content="(\d+(?:\.\d{1,2})?)"')
+
+def classify(html, redirected_to=None):
+    """
+    (status, price) from an item page's HTML — ("bot_detected", None) for a challenge page,
+    None when nothing on the page decides it.
+    """
+    page = html.lower()
+    if any(k in page for k in CHALLENGE):
+        return ("bot_detected", None)
+    if redirected_to:
+        to = urlparse(redirected_to)
+        if (to.hostname or "").startswith("signin.") or to.path.lower().startswith(CHALLENGE_PATHS):
+            return ("bot_detected", None)
+        if to.path.startswith(GONE_PATHS):
+            return ("sold", None)   # listing removed — eBay shows search results instead
+        if "/itm/" not in to.path:
+            return None             # somewhere unexpected — let the browser look
+    ended, active = any(k in page for k in ENDED), any(k in page for k in ACTIVE)
+    if ended and active:
+        return None   # e.g. a multi-variation listing with one variation sold out — let the browser look
+    if ended:
+        m = _PRICE.search(html)
+        return ("sold", float(m.group(1)) if m else None)
+    if active:
+        return ("active", None)
+    return None
+
+def _limiter(proxy):
+    p = urlparse(proxy) if proxy else None
+    return rate_limiter.get(f"ebay_web@{p.hostname}:{p.port}" if p else "ebay_web")
+
+class PageStatus:
+    def __init__(self, max_per_proxy=MAX_PER_PROXY, log=print):
+        self.max_per_proxy = max_per_proxy
+        self.log = log
+        self.stats = {"fetches": 0, "resolved": 0, "escalated": 0, "bytes": 0}
+        self._sessions = {}   # proxy → ClientSession
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        for s in self._sessions.values():
+            await s.close()
+        self._sessions.clear()
+
+    def _session(self, proxy):
+        if proxy not in self._sessions:
+            self._sessions[proxy] = aiohttp.ClientSession(
+                headers=HEADERS, timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                connector=aiohttp.TCPConnector(limit=self.max_per_proxy, ttl_dns_cache=300))
+        return self._sessions[proxy]
+
+    async def status(self, url, proxy=None):
+        """One GET → (status, price), or None to escalate to the browser tier."""
+        limiter = _limiter(proxy)
+        await limiter.acquire_async()
+        self.stats["fetches"] += 1
+        try:
+            async with self._session(proxy).get(url, proxy=proxy, max_redirects=MAX_REDIRECTS) as r:
+                limiter.observe(r.status, r.headers.get("Retry-After"))
+                if r.status in GONE_STATUSES:
+                    result = ("sold", None)
+                elif r.status != 200:
+                    if r.status == 403:
+                        limiter.throttled()   # 429 / 503 were handled by observe()
+                    result = None
+                else:
+                    body = await r.read()
+                    size = r.headers.get("Content-Length")
+                    self.stats["bytes"] += int(size) if size and size.isdigit() else len(body)
+                    result = classify(body.decode(r.charset or "utf-8", "replace"),
+                                      str(r.url) if r.history else None)
+                    if result and result[0] == "bot_detected":
+                        limiter.throttled()
+                        result = None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.log(f"⚠️ HTTP check failed for {url}: {e}")
+            result = None
+        self.stats["resolved" if result else "escalated"] += 1
+        return result
+
+# ─── one tier per process ─────────────────────────
+_shared = None
+
+async def shared(**kwargs):
+    """The process-wide HTTP tier (sessions open lazily, so this must run inside the event loop)."""
+    global _shared
+    if _shared is None:
+        _shared = PageStatus(**kwargs)
+    return _shared
+
+async def close_shared():
+    global _shared
+    if _shared is not None:
+        await _shared.close()
+        _shared = None
@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+"""
+item_store.py
+One indexed SQLite store for the whole pipeline, replacing items.json / sold_items.json /
+urls.json / the identifier dumps that every stage loaded and rewrote in full.
+
+✅ items (active inventory), sold, identifiers, verification — keyed on item_id
+✅ Indexed on status, category, scraped_at (sold: sold_at, category)
+✅ Upserts in O(batch); range queries stream rows instead of loading the world
+✅ Moving an item to sold is one transaction (no half-written files)
+✅ Imports the old JSON files the first time it is opened
+✅ `python item_store.py export <dir>` writes the JSON files for anything that still wants them
+✅ typed=True streams slot records (see records.py) instead of dicts — for the big verifier/scorer passes
+✅ Sold history is tiered: the sold table is the hot tier (last HOT_DAYS), older sales move to
+   gzip JSONL month partitions (sold_cold/sold-YYYY-MM.jsonl.gz) — retention runs on open;
+   sold(..., cold=True) reads across both tiers
+✅ FLIPPER_FLAT_DIR=<dir> also mirrors items/sold into append-only JSONL segments (see segment_log.py)
+✅ verification doubles as the result cache: status, sold_price, checked_at and evidence
+   (which tier decided) per item; fresh() returns the ones still inside recheck.TTL_MINUTES
+✅ schedule is the re-verification queue: next_check per item (policy in recheck.py), indexed —
+   due() streams only the items whose time has come, soonest first
+
+Usage:
+    store = ItemStore(STORE_FILE, seed_dir=SAFE_DIR)
+    store.upsert_items(records)
+    for it in store.items(status="active", category="Laptops", since="2025-10-01"):
+        ...
+    store.mark_sold([item])             # item dict, optionally with sold_price / sold_at
+    store.record_checks([(item_id, "unknown", None)])   # optional 4th field: evidence ("api", "http", ...)
+    store.fresh(item_ids)               # results still inside their TTL — skip these
+    for it in store.due(typed=True): ...  # verifier pass — only what is due
+"""
+
+import gzip, itertools, json, os, sqlite3, sys
+from datetime import datetime, timedelta
+from segment_log import SegmentLog
+from shard_leases import file_lock
+from records import Item, SoldItem, as_dict, _num
+import recheck
+
+BASE = "/Users/stephentaykor/Desktop/flipper_Simulation"
+STORE_FILE = f"{BASE}/my_items_safe/flipper_items.sqlite"
+PAGE_ROWS  = 1000   # rows fetched per round trip when streaming
+FLAT_DIR   = os.getenv("FLIPPER_FLAT_DIR")   # flat-file mirror for shops that keep JSONL
+HOT_DAYS   = int(os.getenv("FLIPPER_HOT_DAYS", "30"))   # sales younger than this stay in the sold table
+COLD_KEEP_MONTHS = None   # cold partitions older than this many months are deleted (None = keep all)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id TEXT PRIMARY KEY, status TEXT NOT NULL DEFAULT 'active', title TEXT, price REAL,
+    url TEXT, category TEXT, condition TEXT, scraped_at TEXT, updated_at TEXT, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS items_status ON items (status, scraped_at);
+CREATE INDEX IF NOT EXISTS items_category ON items (category, scraped_at);
+CREATE INDEX IF NOT EXISTS items_scraped ON items (scraped_at);
+
+CREATE TABLE IF NOT EXISTS sold (
+    item_id TEXT PRIMARY KEY, title TEXT, price REAL, sold_price REAL, url TEXT, category TEXT,
+    scraped_at TEXT, sold_at TEXT, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS sold_at ON sold (sold_at);
+CREATE INDEX IF NOT EXISTS sold_category ON sold (category, sold_at);
+
+-- item_ids of sales moved to the cold tier (a stale feed must not bring them back either);
+-- title kept so identifiers() can still name archived sales
+CREATE TABLE IF NOT EXISTS sold_cold_ids (item_id TEXT PRIMARY KEY, month TEXT, title TEXT);
+
+CREATE TABLE IF NOT EXISTS identifiers (
+    item_id TEXT PRIMARY KEY, brand TEXT, mpn TEXT, gtin TEXT, upc TEXT, ean TEXT);
+
+CREATE TABLE IF NOT EXISTS verification (
+    item_id TEXT PRIMARY KEY, status TEXT, sold_price REAL, checked_at TEXT, checks INTEGER DEFAULT 1,
+    evidence TEXT);
+CREATE INDEX IF NOT EXISTS verification_status ON verification (status, checked_at);
+
+-- re-verification queue: one row per inventory item; `changes` = status flips seen so far
+CREATE TABLE IF NOT EXISTS schedule (
+    item_id TEXT PRIMARY KEY, next_check TEXT NOT NULL, ends_at TEXT, score REAL, changes INTEGER DEFAULT 0);
+CREATE INDEX IF NOT EXISTS schedule_next ON schedule (next_check, item_id);
+"""
+
+# Column order the records.*.from_row decoders expect
+RECORD_COLUMNS = {
+    "items": ("item_id", "status", "title", "price", "url", "category", "condition", "scraped_at", "data"),
+    "sold":  ("item_id", "title", "price", "sold_price", "url", "category", "scraped_at", "sold_at", "data"),
+}
+
+def _category(it):
+    return it.get("category") or it.get("categoryPath")
+
+def _ends_at(it):
+    return it.get("ends_at") or it.get("itemEndDate") or it.get("endTime")
+
+class ItemStore:
+    def __init__(self, path=STORE_FILE, seed_dir=None, log=print, flat_dir=FLAT_DIR, hot_days=HOT_DAYS):
+        self.log = log
+        self.hot_days = hot_days
+        self.cold_dir = os.path.join(os.path.dirname(path) or ".", "sold_cold")
+        self.flat = None
+        if flat_dir:
+            self.flat = {name: SegmentLog(os.path.join(flat_dir, name), log=log) for name in ("items", "sold")}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        scheduled = self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'schedule'").fetchone()
+        self.db.executescript(SCHEMA)
+        if "evidence" not in {r[1] for r in self.db.execute("PRAGMA table_info(verification)")}:
+            self.db.execute("ALTER TABLE verification ADD COLUMN evidence TEXT")   # store from before the cache
+        if "title" not in {r[1] for r in self.db.execute("PRAGMA table_info(sold_cold_ids)")}:
+            self._backfill_cold_titles()
+        if not scheduled:
+            # Store from before the schedule existed: everything is due once, then the policy takes over
+            with self.db:
+                self.db.execute("INSERT OR IGNORE INTO schedule (item_id, next_check, ends_at) "
+                                "SELECT item_id, COALESCE(scraped_at, ?), COALESCE(json_extract(data, '$.ends_at'), "
+                                "json_extract(data, '$.itemEndDate'), json_extract(data, '$.endTime')) FROM items",
+                                (datetime.now().isoformat(),))
+        if seed_dir and self.count() == 0 and self.count_sold(cold=True) == 0:
+            self.import_json(seed_dir)
+        if hot_days:
+            self.apply_retention()
+
+    # ─── items ────────────────────────────────────
+    def upsert_items(self, records, status="active"):
+        now = datetime.now().isoformat()
+        rows, ends = [], []
+        for it in map(as_dict, records):
+            if it.get("item_id"):
+                rows.append((it["item_id"], status, it.get("title"), _num(it.get("price")), it.get("url"),
+                             _category(it), it.get("condition"), it.get("scraped_at"), now, json.dumps(it)))
+                ends.append((it["item_id"], now, _ends_at(it)))
+        # A stale feed must not bring a sold listing back into inventory
+        self.db.executemany(
+            """INSERT INTO items (item_id, status, title, price, url, category, condition, scraped_at, updated_at, data)
+               SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM sold WHERE item_id = ?1)
+                 AND NOT EXISTS (SELECT 1 FROM sold_cold_ids WHERE item_id = ?1)
+               ON CONFLICT(item_id) DO UPDATE SET status = excluded.status, title = excluded.title,
+                 price = excluded.price, url = excluded.url, category = excluded.category,
+                 condition = excluded.condition, scraped_at = COALESCE(items.scraped_at, excluded.scraped_at),
+                 updated_at = excluded.updated_at, data = excluded.data""", rows)
+        # New items are due straight away; a re-scrape only refreshes the end date
+        self.db.executemany(
+            """INSERT INTO schedule (item_id, next_check, ends_at)
+               SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM items WHERE item_id = ?1)
+               ON CONFLICT(item_id) DO UPDATE SET ends_at = COALESCE(excluded.ends_at, schedule.ends_at)""", ends)
+        self.db.commit()
+        if self.flat:
+            sold = self._in("sold", [r[0] for r in rows]) | self._in("sold_cold_ids", [r[0] for r in rows])
+            self.flat["items"].append(json.loads(r[-1]) for r in rows if r[0] not in sold)
+        return len(rows)
+
+    def _where(self, status=None, category=None, since=None, until=None, column="scraped_at"):
+        clauses, args = [], []
+        for sql, val in (("status = ?", status), ("category = ?", category),
+                         (f"{column} >= ?", since), (f"{column} < ?", until)):
+            if val is not None:
+                clauses.append(sql)
+                args.append(val)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def _stream(self, table, where, args, limit=None, record=None):
+        # Keyset pages on rowid: no read transaction held open while callers spend hours per batch
+        last, left = 0, limit
+        cond = (where + " AND" if where else " WHERE") + " rowid > ?"
+        cols = ", ".join(RECORD_COLUMNS[table]) if record else "data"
+        while left is None or left > 0:
+            n = PAGE_ROWS if left is None else min(PAGE_ROWS, left)
+            rows = self.db.execute(f"SELECT rowid, {cols} FROM {table}{cond} ORDER BY rowid LIMIT {n}",
+                                   args + [last]).fetchall()
+            for last, *row in rows:
+                yield record.from_row(row) if record else json.loads(row[0])
+            if len(rows) < n:
+                return
+            if left is not None:
+                left -= len(rows)
+
+    def items(self, status="active", category=None, since=None, until=None, limit=None, typed=False):
+        """Stream item dicts (records.Item with typed=True) in insertion order. status=None → every status."""
+        where, args = self._where(status, category, since, until)
+        return self._stream("items", where, args, limit, Item if typed else None)
+
+    def count(self, status=None, category=None, since=None, until=None):
+        where, args = self._where(status, category, since, until)
+        return self.db.execute(f"SELECT COUNT(*) FROM items{where}", args).fetchone()[0]
+
+    def _in(self, table, item_ids):
+        ids, found = list(item_ids), set()
+        for n in range(0, len(ids), 500):
+            chunk = ids[n:n + 500]
+            q = f"SELECT item_id FROM {table} WHERE item_id IN ({','.join('?' * len(chunk))})"
+            found.update(r[0] for r in self.db.execute(q, chunk))
+        return found
+
+    def _data(self, table, item_ids):
+        """{item_id: stored JSON dict} for the ids present in `table`."""
+        ids, found = list(item_ids), {}
+        for n in range(0, len(ids), 500):
+            chunk = ids[n:n + 500]
+            q = f"SELECT item_id, data FROM {table} WHERE item_id IN ({','.join('?' * len(chunk))})"
+            found.update((iid, json.loads(data)) for iid, data in self.db.execute(q, chunk) if data)
+        return found
+
+    def known(self, item_ids):
+        """Subset of item_ids already stored (inventory or sold)."""
+        ids = list(item_ids)
+        return self._in("items", ids) | self._in("sold", ids) | self._in("sold_cold_ids", ids)
+
+    def urls(self, status="active"):
+        return [u for (u,) in self.db.execute("SELECT url FROM items WHERE status = ? AND url IS NOT NULL", (status,))]
+
+    # ─── sold ─────────────────────────────────────
+    def mark_sold(self, records):
+        """Move items to the sold table (and out of items) in one transaction."""
+        return self.apply_results(records, ())
+
+    def apply_results(self, sold, results, evidence=None):
+        """
+        One verifier checkpoint in ONE transaction: `sold` item dicts move to the sold
+        table, `results` [(item_id, status, sold_price[, evidence])] update items that stay.
+        `evidence` {item_id: ...} is what decided each sold item. Ids already in the cold
+        tier only leave inventory — a second sold row would count the sale twice.
+        """
+        evidence = evidence or {}
+        now = datetime.now().isoformat()
+        rows, checks = [], []
+        sold = [it for it in map(as_dict, sold) if it.get("item_id")]
+        stored = self._data("items", [it["item_id"] for it in sold])   # records from due() carry no JSON
+        archived = self._in("sold_cold_ids", [it["item_id"] for it in sold])   # already counted in the cold tier
+        for it in sold:
+            if it["item_id"] in archived:
+                continue
+            it = {**stored.get(it["item_id"], {}), **it, "sold": True}
+            it.setdefault("sold_at", now)
+            rows.append((it["item_id"], it.get("title"), _num(it.get("price")), _num(it.get("sold_price")),
+                         it.get("url"), _category(it), it.get("scraped_at"), it["sold_at"], json.dumps(it)))
+            checks.append((it["item_id"], "sold", _num(it.get("sold_price")), now, evidence.get(it["item_id"])))
+        kept = [(r[0], r[1], _num(r[2]), now, r[3] if len(r) > 3 else None) for r in results]
+        plan = self._plan(kept)
+        with self.db:
+            self.db.executemany(
+                """INSERT OR REPLACE INTO sold (item_id, title, price, sold_price, url, category, scraped_at, sold_at, data)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+            self.db.executemany("DELETE FROM items WHERE item_id = ?", ((it["item_id"],) for it in sold))
+            self.db.executemany("DELETE FROM schedule WHERE item_id = ?", ((it["item_id"],) for it in sold))
+            self.db.executemany("""INSERT INTO schedule (next_check, changes, item_id) VALUES (?, ?, ?)
+                                   ON CONFLICT(item_id) DO UPDATE SET next_check = excluded.next_check,
+                                     changes = excluded.changes""", plan)
+            self._checks(checks + kept)
+            self.db.executemany("UPDATE items SET status = ?, updated_at = ? WHERE item_id = ?",
+                                ((st, now, iid) for iid, st, *_ in kept))
+        if self.flat:
+            self.flat["sold"].append(json.loads(r[-1]) for r in rows)
+            self.flat["items"].delete(r[0] for r in rows)
+        return len(rows)
+
+    def sold(self, category=None, since=None, until=None, limit=None, typed=False, cold=False):
+        """
+        Stream sold dicts (records.SoldItem with typed=True), filtered on sold_at.
+        Hot tier only unless cold=True — then the matching cold partitions come first (oldest sales).
+        """
+        where, args = self._where(None, category, since, until, column="sold_at")
+        hot = self._stream("sold", where, args, limit, SoldItem if typed else None)
+        if not cold:
+            return hot
+        rows = self._cold(category, since, until)
+        if typed:
+            rows = map(SoldItem.from_dict, rows)
+        return itertools.islice(itertools.chain(rows, hot), limit)
+
+    def count_sold(self, category=None, since=None, until=None, cold=False):
+        where, args = self._where(None, category, since, until, column="sold_at")
+        n = self.db.execute(f"SELECT COUNT(*) FROM sold{where}", args).fetchone()[0]
+        if cold:
+            if category is None and since is None and until is None:
+                n += self.db.execute("SELECT COUNT(*) FROM sold_cold_ids").fetchone()[0]
+            else:
+                n += sum(1 for _ in self._cold(category, since, until))
+        return n
+
+    # ─── cold tier ────────────────────────────────
+    def _partition(self, month):
+        return os.path.join(self.cold_dir, f"sold-{month}.jsonl.gz")
+
+    def _read_partition(self, month):
+        try:
+            with gzip.open(self._partition(month), "rt") as f:
+                for line in f:
+                    yield line
+        except FileNotFoundError:
+            return
+
+    def _cold(self, category=None, since=None, until=None):
+        """Sold dicts from the cold partitions overlapping [since, until)."""
+        if not os.path.isdir(self.cold_dir):
+            return
+        for name in sorted(os.listdir(self.cold_dir)):
+            if not (name.startswith("sold-") and name.endswith(".jsonl.gz")):
+                continue
+            month = name[len("sold-"):-len(".jsonl.gz")]
+            if (since and month < since[:7]) or (until and month > until[:7]):
+                continue   # whole partition outside the range
+            for line in self._read_partition(month):
+                it = json.loads(line)
+                stamp = it.get("sold_at") or ""
+                if ((since and stamp < since) or (until and stamp >= until)
+                        or (category is not None and _category(it) != category)):
+                    continue
+                yield it
+
+    def apply_retention(self):
+        """Move sales older than hot_days into month partitions; drop partitions past COLD_KEEP_MONTHS."""
+        cutoff = (datetime.now() - timedelta(days=self.hot_days)).isoformat()
+        oldest = self.db.execute("SELECT MIN(sold_at) FROM sold").fetchone()[0]   # index lookup
+        moved = 0
+        if oldest and oldest < cutoff:
+            os.makedirs(self.cold_dir, exist_ok=True)
+            months = [m for (m,) in self.db.execute(
+                "SELECT DISTINCT substr(sold_at, 1, 7) FROM sold WHERE sold_at < ?", (cutoff,))]
+            for month in months:
+                moved += self._archive_month(month, cutoff)
+        if COLD_KEEP_MONTHS and os.path.isdir(self.cold_dir):
+            keep = (datetime.now() - timedelta(days=31 * COLD_KEEP_MONTHS)).strftime("%Y-%m")
+            for name in os.listdir(self.cold_dir):
+                if name.startswith("sold-") and name.endswith(".jsonl.gz") and name[5:12] < keep:
+                    os.unlink(os.path.join(self.cold_dir, name))
+                    self.db.execute("DELETE FROM sold_cold_ids WHERE month = ?", (name[5:12],))
+                    self.db.commit()
+                    self.log(f"🧹 Dropped cold partition {name}")
+        if moved:
+            self.log(f"🧊 Moved {moved} sales older than {self.hot_days} days to the cold tier")
+        return moved
+
+    def _backfill_cold_titles(self):
+        """Store from before sold_cold_ids had a title: read it back from the partitions once."""
+        with self.db:
+            self.db.execute("ALTER TABLE sold_cold_ids ADD COLUMN title TEXT")
+            self.db.executemany("UPDATE sold_cold_ids SET title = ? WHERE item_id = ?",
+                                ((it.get("title"), it["item_id"]) for it in self._cold()))
+
+    def _archive_month(self, month, cutoff):
+        path = self._partition(month)
+        with file_lock(path):
+            # Re-read under the lock — another process may have archived these rows already
+            rows = self.db.execute("SELECT item_id, data, title FROM sold WHERE sold_at < ? AND substr(sold_at, 1, 7) = ?",
+                                   (cutoff, month)).fetchall()
+            if not rows:
+                return 0
+            # Latest copy per item_id — a crash after the rename but before the delete is healed here
+            merged = {json.loads(line)["item_id"]: line.rstrip("\n") for line in self._read_partition(month)}
+            merged.update((iid, data) for iid, data, _ in rows)
+            tmp = path + ".tmp"
+            with gzip.open(tmp, "wt") as f:
+                for data in merged.values():
+                    f.write(data + "\n")
+            os.replace(tmp, path)
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO sold_cold_ids (item_id, month, title) VALUES (?, ?, ?)",
+                                    ((iid, month, title) for iid, _, title in rows))
+                self.db.executemany("DELETE FROM sold WHERE item_id = ?", ((iid,) for iid, *_ in rows))
+        return len(rows)
+
+    # ─── identifiers ──────────────────────────────
+    def upsert_identifiers(self, records):
+        rows = [(r["item_id"], r.get("brand"), r.get("mpn"), r.get("gtin"), r.get("upc"), r.get("ean"))
+                for r in map(as_dict, records) if r.get("item_id")]
+        self.db.executemany("INSERT OR REPLACE INTO identifiers (item_id, brand, mpn, gtin, upc, ean) "
+                            "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.db.commit()
+
+    def identifiers(self):
+        """Identifier rows with the listing title (items, sold or the cold tier) — the ebay_item_identifiers.json shape."""
+        cols = ("item_id", "title", "brand", "mpn", "gtin", "upc", "ean")
+        for row in self.db.execute(
+                "SELECT x.item_id, COALESCE(i.title, s.title, c.title, ''), x.brand, x.mpn, x.gtin, x.upc, x.ean "
+                "FROM identifiers x LEFT JOIN items i ON i.item_id = x.item_id "
+                "LEFT JOIN sold s ON s.item_id = x.item_id LEFT JOIN sold_cold_ids c ON c.item_id = x.item_id"):
+            yield dict(zip(cols, row))
+
+    # ─── verification ─────────────────────────────
+    def _checks(self, rows):
+        self.db.executemany(
+            """INSERT INTO verification (item_id, status, sold_price, checked_at, evidence) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(item_id) DO UPDATE SET status = excluded.status, sold_price = excluded.sold_price,
+                 checked_at = excluded.checked_at, evidence = excluded.evidence,
+                 checks = verification.checks + 1""", rows)
+
+    def _plan(self, kept):
+        """(next_check, changes, item_id) for items that were just checked and stay in inventory."""
+        info = {}
+        ids = [k[0] for k in kept]
+        for n in range(0, len(ids), 500):
+            chunk = ids[n:n + 500]
+            info.update((r[0], r[1:]) for r in self.db.execute(
+                f"""SELECT i.item_id, i.scraped_at, i.price, s.ends_at, s.score, COALESCE(s.changes, 0), v.status
+                    FROM items i LEFT JOIN schedule s ON s.item_id = i.item_id
+                    LEFT JOIN verification v ON v.item_id = i.item_id
+                    WHERE i.item_id IN ({','.join('?' * len(chunk))})""", chunk))
+        now, plan = datetime.now(), []
+        for iid, status, *_ in kept:
+            if iid not in info:
+                continue
+            scraped_at, price, ends_at, score, changes, before = info[iid]
+            changes += before is not None and before != status
+            at = recheck.next_check(now, status, scraped_at, ends_at, price, score, changes)
+            plan.append((at.isoformat(), changes, iid))
+        return plan
+
+    def due(self, now=None, limit=None, typed=False):
+        """
+        Stream inventory items whose next_check has passed, soonest first (records.Item with typed=True).
+        Items re-scheduled while the pass runs are not returned again.
+        """
+        now = (now or datetime.now()).isoformat()
+        cols = ", ".join(f"i.{c}" for c in RECORD_COLUMNS["items"])
+        last, left = ("", ""), limit
+        while left is None or left > 0:
+            n = PAGE_ROWS if left is None else min(PAGE_ROWS, left)
+            rows = self.db.execute(
+                f"""SELECT s.next_check, {cols} FROM schedule s JOIN items i ON i.item_id = s.item_id
+                    WHERE s.next_check <= ? AND (s.next_check, s.item_id) > (?, ?)
+                    ORDER BY s.next_check, s.item_id LIMIT {n}""", [now, *last]).fetchall()
+            for row in rows:
+                last = (row[0], row[1])
+                yield Item.from_row(row[1:], raw=False) if typed else json.loads(row[-1])   # apply_results re-reads data
+            if len(rows) < n:
+                return
+            if left is not None:
+                left -= len(rows)
+
+    def count_due(self, now=None):
+        now = (now or datetime.now()).isoformat()
+        return self.db.execute("SELECT COUNT(*) FROM schedule WHERE next_check <= ?", (now,)).fetchone()[0]
+
+    def set_scores(self, pairs):
+        """[(item_id, score)] from the scorer — read by the schedule the next time each item is checked."""
+        self.db.executemany("UPDATE schedule SET score = ? WHERE item_id = ?", ((sc, iid) for iid, sc in pairs))
+        self.db.commit()
+
+    def fresh(self, item_ids, now=None):
+        """{item_id: (status, sold_price, checked_at, evidence)} for results younger than their status's TTL."""
+        now = now or datetime.now()
+        ttl = [(st, (now - timedelta(minutes=m)).isoformat()) for st, m in recheck.TTL_MINUTES.items() if m > 0]
+        if not ttl:
+            return {}
+        cond = " OR ".join("(status = ? AND checked_at >= ?)" for _ in ttl)
+        args = [v for pair in ttl for v in pair]
+        ids, out = list(item_ids), {}
+        for n in range(0, len(ids), 500):
+            chunk = ids[n:n + 500]
+            out.update((r[0], r[1:]) for r in self.db.execute(
+                f"""SELECT item_id, status, sold_price, checked_at, evidence FROM verification
+                    WHERE item_id IN ({','.join('?' * len(chunk))}) AND ({cond})""", chunk + args))
+        return out
+
+    def record_checks(self, results):
+        """[(item_id, status, sold_price[, evidence])] for items that stay in inventory ('active' / 'unknown')."""
+        self.apply_results((), results)
+
+    def verification_counts(self):
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM verification GROUP BY status").fetchall())
+
+    # ─── JSON import / export ─────────────────────
+    def import_json(self, folder):
+        """Load the pre-store JSON files from `folder` (items.json, sold_items.json, identifiers)."""
+        def load(name):
+            path = os.path.join(folder, name)
+            try:
+                with open(path, "r") as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                return []
+            except Exception as e:
+                self.log(f"⚠️ Could not import {path}: {e}")
+                return []
+        items, sold = load("items.json"), load("sold_items.json")
+        idents = load("ebay_item_identifiers.json")
+        n = self.upsert_items(items)
+        # older verifiers put inaccessible items in sold_items.json with sold="unknown"
+        unknown = [it for it in sold if it.get("sold") == "unknown"]
+        self.upsert_items(unknown, status="unknown")
+        m = self.mark_sold([it for it in sold if it.get("sold") != "unknown"])
+        self.upsert_identifiers(x for x in idents if isinstance(x, dict))
+        self.log(f"🌱 Imported {n} items, {m} sold, {len(unknown)} unknown from {folder}")
+
+    def _dump(self, folder, name, rows):
+        os.makedirs(folder, exist_ok=True)
+        tmp = os.path.join(folder, name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(rows, f, indent=2)
+        os.replace(tmp, os.path.join(folder, name))
+
+    def export_identifiers(self, folder):
+        """ebay_item_identifiers.json for the RocketSource / converter scripts that still read the file."""
+        self._dump(folder, "ebay_item_identifiers.json", list(self.identifiers()))
+
+    def export_json(self, folder):
+        for name, rows in (("items.json", list(self.items())), ("sold_items.json", list(self.sold(cold=True))),
+                           ("urls.json", self.urls())):
+            self._dump(folder, name, rows)
+        self.export_identifiers(folder)
+        self.log(f"💾 Exported store to {folder}")
+
+    def close(self):
+        if self.flat:
+            for seg in self.flat.values():
+                seg.close()
+        self.db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] in ("export", "import"):
+        store = ItemStore()
+        if sys.argv[1] == "export":
+            store.export_json(sys.argv[2])
+        else:
+            store.import_json(sys.argv[2])
+        store.close()
+    else:
+        print("usage: item_store.py export|import <dir>")
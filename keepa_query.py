@@ -11,6 +11,9 @@ import time
 from datetime import datetime
 from dotenv import load_dotenv
 from keepa import Keepa
+import http_client
+import rate_limiter
+from records import KeepaProduct, load_json
 
 # ───────────────────────────────────────────────
 # CONFIGURATION
@@ -23,7 +26,6 @@ LOG_FILE = f"{BASE_DIR}/my_items_safe/keepa_query.log"
 
 MAX_BATCH_SIZE = 100           # Process 100 IDs per loop
 LOOP_INTERVAL = 1800           # 30 minutes in seconds
-SLEEP_BETWEEN_CALLS = 2        # seconds between Keepa requests
 
 # ───────────────────────────────────────────────
 # HELPERS
@@ -55,15 +57,14 @@ def save_results(results: list):
     os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
     if os.path.exists(OUTPUT_FILE):
         try:
-            with open(OUTPUT_FILE, "r") as f:
-                existing = json.load(f)
+            existing = load_json(OUTPUT_FILE, KeepaProduct)
         except Exception:
             existing = []
     else:
         existing = []
-    combined = {i["item_id"]: i for i in existing + results}.values()
+    combined = {p.item_id: p for p in existing + results}.values()
     with open(OUTPUT_FILE, "w") as f:
-        json.dump(list(combined), f, indent=2)
+        json.dump([p.to_dict() for p in combined], f, indent=2)
     log(f"💾 Saved {len(results)} new items. Total in file: {len(combined)}")
 
 # ───────────────────────────────────────────────
@@ -81,41 +82,23 @@ def run_keepa_query(api: Keepa):
     for i, asin in enumerate(ids, start=1):
         log(f"🔍 [{i}/{len(ids)}] Querying Keepa for {asin}")
         try:
+            rate_limiter.get("keepa").acquire()
             products = api.query(asin, domain=1, stats="sold,price")
 
             for product in products:
                 if not hasattr(product, "asin"):
                     continue
 
-                title = getattr(product, "title", "Unknown Title")
-                csv_data = getattr(product, "csv", None)
-
-                if csv_data and len(csv_data) > 1:
-                    first_timestamp = csv_data[0][0]
-                    last_timestamp = csv_data[-1][0]
-                    first_sale = datetime.fromtimestamp(first_timestamp).strftime('%Y-%m-%d')
-                    last_sale = datetime.fromtimestamp(last_timestamp).strftime('%Y-%m-%d')
-                    duration_days = (datetime.fromtimestamp(last_timestamp) - datetime.fromtimestamp(first_timestamp)).days
-                    price = str(csv_data[-1][1]) if csv_data[-1][1] else "N/A"
-
-                    flipper_items.append({
-                        "item_id": product.asin,
-                        "title": title,
-                        "listing_date": first_sale,
-                        "duration": f"{duration_days} days" if duration_days > 0 else "1 day",
-                        "sold_price": price,
-                        "url": f"https://www.amazon.com/dp/{product.asin}",
-                        "categoryPath": getattr(product, 'category', 'Unknown')
-                    })
-                    log(f"✅ Processed {asin} — {title[:40]}... Sold for {price}")
+                rec = KeepaProduct.from_keepa(product)
+                if rec:
+                    flipper_items.append(rec)
+                    log(f"✅ Processed {asin} — {rec.title[:40]}... Sold for {rec.sold_price or 'N/A'}")
                 else:
                     log(f"⚠️ No sales data for {asin}")
 
-            time.sleep(SLEEP_BETWEEN_CALLS)
-
         except Exception as e:
             log(f"💥 Error on {asin}: {e}")
-            time.sleep(5)
+            rate_limiter.get("keepa").throttled(5)
 
     if flipper_items:
         save_results(flipper_items)
@@ -131,7 +114,8 @@ def main():
     if not api_key:
         raise ValueError("❌ No Keepa API key found in .env (keepa_API=...)")
 
-    api = Keepa(api_key)
+    # keepa manages its own HTTP calls (no session hook) — give it the shared read timeout
+    api = Keepa(api_key, timeout=http_client.DEFAULT_TIMEOUT[1])
     log(f"🔑 Keepa API initialized ({api_key[:10]}...)")
 
     while True:
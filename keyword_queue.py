@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+keyword_queue.py
+SQLite work queue for the keyword-path crawler (safe_Image.txt).
+
+✅ One row per keyword: status, next offset, items found, attempts
+✅ claim() hands each keyword to exactly one worker (safe across processes too)
+✅ A worker that dies mid-keyword leaves it 'running'; it is re-queued after STALE_SECONDS
+✅ counts() is one GROUP BY on an indexed column — no file parsing
+✅ Imports the old progress.json "done" map on first use
+
+Statuses: pending → running → done   (empty/failed go back to pending for the next run)
+"""
+
+import json, os, sqlite3, time
+
+STALE_SECONDS = 900   # 'running' longer than this = the worker is gone
+
+class KeywordQueue:
+    def __init__(self, db_path, log=print):
+        self.log = log
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS keywords (
+            keyword TEXT PRIMARY KEY, status TEXT DEFAULT 'pending', next_offset INTEGER DEFAULT 0,
+            items INTEGER DEFAULT 0, attempts INTEGER DEFAULT 0, updated REAL DEFAULT 0, error TEXT)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS keywords_status ON keywords (status, updated)")
+        self.run_started = time.time()
+
+    def sync(self, keywords, progress_file=None):
+        """Add keywords not in the queue yet; on an empty queue, carry over progress.json."""
+        first = self.db.execute("SELECT COUNT(*) FROM keywords").fetchone()[0] == 0
+        self.db.execute("BEGIN IMMEDIATE")
+        self.db.executemany("INSERT OR IGNORE INTO keywords (keyword) VALUES (?)", ((k,) for k in keywords))
+        if first and progress_file and os.path.exists(progress_file):
+            try:
+                with open(progress_file, "r") as f:
+                    done = [k for k, v in json.load(f).get("done", {}).items() if v]
+                self.db.executemany("UPDATE keywords SET status = 'done' WHERE keyword = ?", ((k,) for k in done))
+                self.log(f"🌱 Imported {len(done)} finished keywords from {progress_file}")
+            except Exception as e:
+                self.log(f"⚠️ Could not import {progress_file}: {e}")
+        self.db.execute("COMMIT")
+
+    def claim(self):
+        """Next keyword for this worker, or None when nothing is left for this run."""
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            # Both lookups walk the (status, updated) index
+            row = self.db.execute(
+                "SELECT keyword, next_offset FROM keywords WHERE status = 'pending' AND updated < ? "
+                "ORDER BY updated LIMIT 1", (self.run_started,)).fetchone()
+            if not row:
+                row = self.db.execute(
+                    "SELECT keyword, next_offset FROM keywords WHERE status = 'running' AND updated < ? "
+                    "LIMIT 1", (now - STALE_SECONDS,)).fetchone()
+            if row:
+                self.db.execute("UPDATE keywords SET status = 'running', updated = ?, attempts = attempts + 1 "
+                                "WHERE keyword = ?", (now, row[0]))
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return row   # (keyword, offset) or None
+
+    def done(self, keyword, items, next_offset):
+        self.db.execute("UPDATE keywords SET status = 'done', items = items + ?, next_offset = ?, "
+                        "updated = ?, error = NULL WHERE keyword = ?", (items, next_offset, time.time(), keyword))
+
+    def retry_later(self, keyword, error=None):
+        """No results / failed — back to pending, but not again in this run."""
+        self.db.execute("UPDATE keywords SET status = 'pending', updated = ?, error = ? WHERE keyword = ?",
+                        (time.time(), error, keyword))
+
+    def release(self, keyword):
+        """Give it back untouched (e.g. quota hit) so it can be retried in this run."""
+        self.db.execute("UPDATE keywords SET status = 'pending', updated = 0, attempts = attempts - 1 "
+                        "WHERE keyword = ?", (keyword,))
+
+    def counts(self):
+        """{"pending": n, "running": n, "done": n}"""
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM keywords GROUP BY status").fetchall())
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+pack_store.py
+Packed per-listing archive: one append-only data file + an item_id → offset index,
+instead of one small JSON file per listing.
+
+✅ put_many() appends a batch to items.pack — one write, one index transaction
+✅ get(item_id) is one index lookup + one pread; iteration reads the pack front to back
+✅ Writing an item again supersedes the old copy (compact() drops the dead bytes — offline,
+   while no other process has the pack open)
+✅ Index is SQLite next to the pack; a crash between the two is repaired on open
+   by indexing whatever the pack holds past the last indexed record, and a torn last
+   line is cut off before anything is appended after it
+✅ `python pack_store.py migrate <json_dir> <pack_dir>` packs an existing tree of per-item files
+
+Layout:
+    <dir>/items.pack     one line per record: ["<item_id>", {...record...}]
+                         (items-<n>.pack after a compaction — the index names the live file)
+    <dir>/index.sqlite   item_id → (offset, length)
+
+Usage:
+    pack = PackStore(f"{base_dir}/pack")
+    pack.put_many((it["itemId"], it) for it in items)
+    pack.get("v1|110588420747|0")
+    for item_id, record in pack: ...
+"""
+
+import fcntl, json, os, sqlite3, sys
+from contextlib import contextmanager
+
+class PackStore:
+    def __init__(self, path, log=print):
+        self.path = path
+        self.log = log
+        os.makedirs(path, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(path, "index.sqlite"), timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS idx (item_id TEXT PRIMARY KEY, offset INTEGER, length INTEGER)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_offset ON idx (offset)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("INSERT OR IGNORE INTO meta VALUES ('pack', 'items.pack')")
+        self.db.commit()
+        self._data = os.path.join(path, self.db.execute("SELECT value FROM meta WHERE key = 'pack'").fetchone()[0])
+        open(self._data, "ab").close()
+        self._fd = os.open(self._data, os.O_RDONLY)
+        with self._locked():
+            self._recover()
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.path, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _indexed_end(self):
+        row = self.db.execute("SELECT offset + length FROM idx ORDER BY offset DESC LIMIT 1").fetchone()
+        return row[0] if row else 0
+
+    def _recover(self):
+        """Index records appended after the last committed index transaction. Call under the lock."""
+        end, size = self._indexed_end(), os.path.getsize(self._data)
+        if end >= size:
+            return
+        rows = []
+        with open(self._data, "rb") as f:
+            f.seek(end)
+            offset = end
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # torn write
+                rows.append((json.loads(line)[0], offset, len(line)))
+                offset += len(line)
+        if offset < size:
+            # Cut the torn tail so the next append starts a fresh line instead of joining it
+            os.truncate(self._data, offset)
+            self.log(f"🩹 Dropped {size - offset} bytes of a torn pack write")
+        if rows:
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO idx (item_id, offset, length) VALUES (?, ?, ?)", rows)
+            self.log(f"🩹 Indexed {len(rows)} unindexed pack records")
+
+    def _torn(self):
+        size = os.path.getsize(self._data)
+        return size > 0 and os.pread(self._fd, 1, size - 1) != b"\n"
+
+    # ─── writes ───────────────────────────────────
+    def put_many(self, pairs):
+        """[(item_id, record)] → one append + one index transaction. Returns the count."""
+        lines = [(str(k), (json.dumps([str(k), rec], separators=(",", ":")) + "\n").encode()) for k, rec in pairs]
+        if not lines:
+            return 0
+        with self._locked():
+            if self._torn():   # another process died mid-append since we opened the pack
+                self._recover()
+            with open(self._data, "ab") as f:
+                offset = f.tell()
+                f.write(b"".join(line for _, line in lines))
+                f.flush()
+                os.fsync(f.fileno())
+            rows = []
+            for k, line in lines:
+                rows.append((k, offset, len(line)))
+                offset += len(line)
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO idx (item_id, offset, length) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def put(self, item_id, record):
+        return self.put_many([(item_id, record)])
+
+    # ─── reads ────────────────────────────────────
+    def get(self, item_id):
+        row = self.db.execute("SELECT offset, length FROM idx WHERE item_id = ?", (str(item_id),)).fetchone()
+        if not row:
+            return None
+        return json.loads(os.pread(self._fd, row[1], row[0]))[1]
+
+    def __contains__(self, item_id):
+        return self.db.execute("SELECT 1 FROM idx WHERE item_id = ?", (str(item_id),)).fetchone() is not None
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM idx").fetchone()[0]
+
+    def __iter__(self):
+        """(item_id, record) for the live copy of every item, in pack order."""
+        live = self.db.execute("SELECT offset FROM idx ORDER BY offset")
+        with open(self._data, "rb") as f:
+            pos = 0
+            for (offset,) in live:
+                if offset != pos:
+                    f.seek(offset)   # only skips over superseded copies
+                line = f.readline()
+                pos = offset + len(line)
+                item_id, rec = json.loads(line)
+                yield item_id, rec
+
+    # ─── maintenance ──────────────────────────────
+    def compact(self):
+        """Rewrite the pack with live records only. Offline: other open PackStores keep the old file."""
+        with self._locked():
+            gen = int(self.db.execute("SELECT COUNT(*) FROM meta WHERE key LIKE 'compacted:%'").fetchone()[0]) + 1
+            name = f"items-{gen}.pack"
+            new = os.path.join(self.path, name)
+            rows, offset = [], 0
+            with open(new, "wb") as out:
+                for item_id, rec in self:
+                    line = (json.dumps([item_id, rec], separators=(",", ":")) + "\n").encode()
+                    out.write(line)
+                    rows.append((item_id, offset, len(line)))
+                    offset += len(line)
+                out.flush()
+                os.fsync(out.fileno())
+            before, old = os.path.getsize(self._data), self._data
+            # New offsets and the new file name commit together — a crash leaves one consistent pair
+            with self.db:
+                self.db.execute("DELETE FROM idx")
+                self.db.executemany("INSERT INTO idx (item_id, offset, length) VALUES (?, ?, ?)", rows)
+                self.db.execute("UPDATE meta SET value = ? WHERE key = 'pack'", (name,))
+                self.db.execute("INSERT INTO meta VALUES (?, ?)", (f"compacted:{gen}", str(before)))
+            os.close(self._fd)
+            self._data = new
+            self._fd = os.open(new, os.O_RDONLY)
+            os.unlink(old)
+        self.log(f"🗜️ Compacted pack {before} → {offset} bytes ({len(rows)} records)")
+
+    def close(self):
+        os.close(self._fd)
+        self.db.close()
+
+# ─── migration ────────────────────────────────────
+def _key(rec, filename):
+    """itemId / item_id from the record, else the id after the last '_' of <title>_<id>.json."""
+    if isinstance(rec, dict) and (rec.get("itemId") or rec.get("item_id")):
+        return rec.get("itemId") or rec.get("item_id")
+    return filename[:-len(".json")].rsplit("_", 1)[-1]
+
+def migrate(json_dir, pack_dir, delete=False, batch=1000, log=print):
+    """Pack every *.json under json_dir. With delete=True the files go once their batch is committed."""
+    pack = PackStore(pack_dir, log=log)
+    pending, done, failed = [], 0, 0
+
+    def flush():
+        nonlocal done
+        pack.put_many((k, rec) for k, rec, _ in pending)
+        if delete:
+            for _, _, path in pending:
+                os.unlink(path)
+        done += len(pending)
+        pending.clear()
+
+    for root, _, files in os.walk(json_dir):
+        for name in files:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                with open(path, "r") as f:
+                    rec = json.load(f)
+            except Exception as e:
+                failed += 1
+                log(f"⚠️ Skipping {path}: {e}")
+                continue
+            pending.append((_key(rec, name), rec, path))
+            if len(pending) >= batch:
+                flush()
+    flush()
+    log(f"📦 Packed {done} files from {json_dir} into {pack_dir} ({len(pack)} items, {failed} unreadable)")
+    pack.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "migrate":
+        migrate(sys.argv[2], sys.argv[3], delete="--delete" in sys.argv)
+    elif len(sys.argv) == 3 and sys.argv[1] == "compact":
+        p = PackStore(sys.argv[2])
+        p.compact()
+        p.close()
+    else:
+        print("usage: pack_store.py migrate <json_dir> <pack_dir> [--delete] | compact <pack_dir>")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+query_planner.py
+Turns the configured CATEGORIES × CONDITIONS into the smallest set of Browse queries.
+
+✅ Merges conditions into one filter: conditionIds:{1000|3000}
+✅ Collapses a category listed several times (different keywords) into one query:
+   category-only below the top level (a superset of every keyword query); a top-level
+   category keeps q — Browse rejects it without one — with the keywords OR-ed: q=(a, b)
+✅ Drops a category whose ancestor already has a category-only query
+   (parent map from the Taxonomy API, cached on disk)
+✅ Reports how many queries / budgeted calls the plan saved
+
+Browse only accepts ONE category per call, so different categories are never merged.
+Output queries have the same shape as async_harvester.build_queries().
+"""
+
+import json, os, time
+import http_client
+
+TAXONOMY_TREE_URL = "https://api.ebay.com/commerce/taxonomy/v1/category_tree/0"   # 0 = EBAY_US
+TAXONOMY_MAX_AGE  = 7 * 24 * 3600   # refresh the cached parent map weekly
+
+# ───────────────────────────────────────────────
+# CATEGORY TREE
+# ───────────────────────────────────────────────
+def load_category_parents(token, cache_path, log=print):
+    """{category_id: parent_id} for the whole marketplace tree. Cached; {} if unavailable."""
+    if os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < TAXONOMY_MAX_AGE:
+        try:
+            with open(cache_path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            log(f"⚠️ Bad taxonomy cache {cache_path}: {e}")
+
+    try:
+        r = http_client.get(TAXONOMY_TREE_URL, headers={"Authorization": f"Bearer {token}"}, timeout=(10, 120))
+        if r.status_code != 200:
+            log(f"⚠️ Taxonomy tree → {r.status_code}; planning without parent/child pruning")
+            return {}
+        root = r.json().get("rootCategoryNode") or {}
+    except Exception as e:
+        log(f"⚠️ Taxonomy tree error: {e}; planning without parent/child pruning")
+        return {}
+
+    parents, stack = {}, [root]
+    while stack:
+        node = stack.pop()
+        pid = (node.get("category") or {}).get("categoryId")
+        for child in node.get("childCategoryTreeNodes") or []:
+            cid = (child.get("category") or {}).get("categoryId")
+            if cid and pid:
+                parents[cid] = pid
+            stack.append(child)
+
+    tmp = cache_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(parents, f)
+    os.replace(tmp, cache_path)
+    log(f"🌳 Cached {len(parents)} category parents → {cache_path}")
+    return parents
+
+def ancestors(cat_id, parents):
+    seen = set()
+    while cat_id in parents and cat_id not in seen:
+        seen.add(cat_id)
+        cat_id = parents[cat_id]
+        yield cat_id
+
+def is_top_level(cat_id, parents):
+    """True for a root-level category — or any id the tree doesn't know, to stay safe."""
+    return cat_id not in parents or parents[cat_id] not in parents
+
+# ───────────────────────────────────────────────
+# PLAN
+# ───────────────────────────────────────────────
+def plan(categories, conditions, max_calls=10, parents=None, use_keyword=True,
+         fieldgroups="PRODUCT", log=print):
+    """
+    Returns (queries, report). `max_calls` is the per-category budget — a merged
+    query gets the whole budget of the one category it stands for.
+    """
+    parents = parents or {}
+    cond_ids = sorted({c["id"] for c in conditions})
+    cond = {"id": "|".join(cond_ids), "name": "+".join(c["name"] for c in conditions)}
+    cond_filter = f"conditionIds:{{{'|'.join(cond_ids)}}}" if len(cond_ids) > 1 else f"conditionIds:{cond_ids[0]}"
+
+    # 1) group configured entries by category id, keep first name for logs
+    by_id = {}
+    for cat in categories:
+        entry = by_id.setdefault(cat["id"], {"id": cat["id"], "name": cat["name"], "keywords": []})
+        kw = cat["name"].lower() if use_keyword else None
+        if kw not in entry["keywords"]:
+            entry["keywords"].append(kw)
+
+    # 2) several keywords in one category → one query; category-only unless it is top-level
+    for cid, entry in by_id.items():
+        if len(entry["keywords"]) > 1:
+            if is_top_level(cid, parents):
+                entry["keywords"] = [f"({', '.join(entry['keywords'])})"]   # Browse OR syntax
+            else:
+                entry["keywords"] = [None]
+
+    # 3) drop categories covered by a category-only ancestor
+    open_ids = {cid for cid, e in by_id.items() if e["keywords"] == [None]}
+    covered = {cid for cid in by_id if any(a in open_ids for a in ancestors(cid, parents))}
+
+    queries = []
+    for cid, entry in by_id.items():
+        if cid in covered:
+            continue
+        kw = entry["keywords"][0]
+        params = {"category_ids": cid, "filter": cond_filter}
+        if kw:
+            params["q"] = kw
+        if fieldgroups:
+            params["fieldgroups"] = fieldgroups
+        queries.append({"key": f"{cid}:{cond['id']}:{kw or ''}",
+                        "category": {"id": cid, "name": entry["name"]}, "condition": dict(cond),
+                        "params": params, "max_calls": max_calls})
+
+    naive_queries = len(categories) * len(conditions)
+    report = {
+        "naive_queries": naive_queries,
+        "planned_queries": len(queries),
+        "naive_calls": len(categories) * max_calls,
+        "planned_calls": len(queries) * max_calls,
+        "duplicates": len(categories) - len(by_id),
+        "covered_by_parent": len(covered),
+    }
+    report["saved_queries"] = naive_queries - len(queries)
+    report["saved_calls"] = report["naive_calls"] - report["planned_calls"]
+    log(f"🧮 Plan: {naive_queries} → {len(queries)} queries, budget {report['naive_calls']} → "
+        f"{report['planned_calls']} calls (saved {report['saved_calls']}; "
+        f"{report['duplicates']} duplicate, {len(covered)} under a parent)")
+    return queries, report
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+quota_allocator.py
+Splits the daily Browse call cap across queries by recent yield.
+
+✅ Tracks calls used today (resets at 00:00 UTC, same as eBay's quota)
+✅ Window budget = calls left today / windows left today
+✅ Records new unique items per call for every query key (EWMA)
+✅ Every query keeps a minimum exploration share, the rest goes by yield
+✅ State survives restarts (JSON, atomic write)
+✅ Workers sharing the file add their calls/yields to it instead of overwriting
+✅ Other Browse callers (getItems in api_verifier.py) take() from the same daily cap
+"""
+
+import json, math, os
+from datetime import datetime, timedelta, timezone
+from shard_leases import file_lock
+
+DAILY_CALL_CAP = 5000
+EXPLORE_SHARE  = 0.2      # fraction of each window spread evenly over all queries
+YIELD_ALPHA    = 0.3      # EWMA weight of the newest window
+MAX_CALLS_PER_QUERY = 50  # Browse stops paging at offset 10000 (50 × 200)
+
+def _today():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+class QuotaAllocator:
+    def __init__(self, path, daily_cap=DAILY_CALL_CAP, cycle_seconds=7200, log=print):
+        self.path = path
+        self.daily_cap = daily_cap
+        self.cycle_seconds = cycle_seconds
+        self.log = log
+        self.state = {"day": _today(), "used": 0, "yield": {}}
+        self._reload()
+        self._window = {}
+
+    def _reload(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    self.state.update(json.load(f))
+            except Exception as e:
+                self.log(f"⚠️ Could not read {self.path}: {e} — starting with no yield history")
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)
+
+    # ─── budget ───────────────────────────────────
+    def window_budget(self):
+        if self.state["day"] != _today():
+            self.state["day"], self.state["used"] = _today(), 0
+        now = datetime.now(timezone.utc)
+        reset = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        windows_left = max(1, math.ceil((reset - now).total_seconds() / self.cycle_seconds))
+        left = max(0, self.daily_cap - self.state["used"])
+        return left // windows_left
+
+    def allocate(self, keys, budget):
+        """{key: calls}. Minimum share first, remainder proportional to yield."""
+        if not keys or budget <= 0:
+            return {k: 0 for k in keys}
+        ylds = self.state["yield"]
+        known = [ylds[k]["per_call"] for k in keys if k in ylds]
+        prior = sum(known) / len(known) if known else 1.0   # unseen queries start at the mean
+        score = {k: ylds[k]["per_call"] if k in ylds else prior for k in keys}
+        order = sorted(keys, key=lambda k: score[k], reverse=True)
+
+        floor = max(1, int(budget * EXPLORE_SHARE / len(keys)))
+        alloc = {k: 0 for k in keys}
+        left = budget
+        for k in order:                     # best yielders get the floor first if it doesn't stretch
+            take = min(floor, left)
+            alloc[k], left = take, left - take
+
+        total = sum(score.values())
+        if left and total > 0:
+            shares = {k: left * score[k] / total for k in keys}
+            for k in keys:
+                alloc[k] += int(shares[k])
+            spare = budget - sum(alloc.values())
+            for k in sorted(keys, key=lambda k: shares[k] - int(shares[k]), reverse=True)[:spare]:
+                alloc[k] += 1
+
+        # Whatever the per-query cap cuts off goes to the best yielders with room left
+        excess = sum(max(0, v - MAX_CALLS_PER_QUERY) for v in alloc.values())
+        alloc = {k: min(v, MAX_CALLS_PER_QUERY) for k, v in alloc.items()}
+        for k in order:
+            add = min(MAX_CALLS_PER_QUERY - alloc[k], excess)
+            alloc[k], excess = alloc[k] + add, excess - add
+        return alloc
+
+    # ─── other callers ────────────────────────────
+    def charge(self, calls):
+        """Add `calls` (negative = refund) to today's count; returns the calls left today."""
+        with file_lock(self.path):
+            self._reload()
+            if self.state["day"] != _today():
+                self.state["day"], self.state["used"] = _today(), 0
+            self.state["used"] = max(0, self.state["used"] + calls)
+            self.save()
+            return max(0, self.daily_cap - self.state["used"])
+
+    def take(self, calls):
+        """Reserve up to `calls` from today's cap; returns how many were granted (0 once it is spent)."""
+        with file_lock(self.path):
+            self._reload()
+            if self.state["day"] != _today():
+                self.state["day"], self.state["used"] = _today(), 0
+            granted = max(0, min(calls, self.daily_cap - self.state["used"]))
+            self.state["used"] += granted
+            self.save()
+            return granted
+
+    # ─── yield ────────────────────────────────────
+    def record(self, key, calls, new_items):
+        w = self._window.setdefault(key, [0, 0])
+        w[0] += calls
+        w[1] += new_items
+
+    def close_window(self, calls_used):
+        """Fold this window's per-query yield into the EWMA and charge the calls."""
+        with file_lock(self.path):
+            self._reload()   # other workers may have charged calls since we read it
+            if self.state["day"] != _today():
+                self.state["day"], self.state["used"] = _today(), 0
+            self.state["used"] += calls_used
+            for key, (calls, new) in self._window.items():
+                if not calls:
+                    continue
+                rate = new / calls
+                old = self.state["yield"].get(key)
+                per_call = rate if old is None else YIELD_ALPHA * rate + (1 - YIELD_ALPHA) * old["per_call"]
+                self.state["yield"][key] = {"per_call": round(per_call, 3), "last_calls": calls, "last_new": new}
+            self.save()
+        self._window = {}
+        self.log(f"📈 Quota: {self.state['used']}/{self.daily_cap} calls used today")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+rate_limiter.py
+Adaptive token-bucket limiter per upstream (Browse, identity, RocketSource, Keepa, ScrapingDog, eBay web).
+
+✅ Runs at the configured rate with a small burst
+✅ 429/503 (or a bot wall) → rate halves and the upstream pauses for Retry-After
+✅ Clean responses → rate creeps back up to the configured ceiling
+✅ Same limiter from threads (acquire) and asyncio (acquire_async)
+✅ rates() shows what every upstream is running at right now
+✅ share(n) in each of n worker processes — together they stay within the configured rates
+
+Usage:
+    import rate_limiter
+    rate_limiter.get("keepa").acquire()
+    await rate_limiter.get("browse").acquire_async()
+    rate_limiter.for_url(url)        # picks the upstream from the URL
+"""
+
+import asyncio, threading, time
+from urllib.parse import urlparse
+
+# name: (max calls/sec, burst, min calls/sec)
+LIMITS = {
+    "browse":      (5.0, 10, 0.2),
+    "identity":    (1.0, 2, 0.1),
+    "rocketsource": (2.0, 2, 0.1),
+    "keepa":       (0.5, 1, 0.05),    # was a fixed 2s sleep between calls
+    "scrapingdog": (5.0, 5, 0.2),
+    "ebay_web":    (10.0, 10, 0.5),   # item pages through the proxy pool
+    "default":     (10.0, 10, 0.5),
+}
+INCREASE_EVERY = 20      # clean calls before the rate steps back up
+INCREASE_STEP  = 0.10    # +10% of the ceiling per step
+DEFAULT_PAUSE  = 30      # seconds when a 429 carries no Retry-After
+
+# ───────────────────────────────────────────────
+# BUCKET
+# ───────────────────────────────────────────────
+class TokenBucket:
+    def __init__(self, name, rate, burst, min_rate):
+        self.name = name
+        self.max_rate = self.rate = rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.clean = 0
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token now; return how long the caller must wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.paused_until - now)
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttled(self, retry_after=None):
+        """429 / 503 / bot wall: halve the rate and pause the whole upstream."""
+        try:
+            pause = float(retry_after) if retry_after is not None else DEFAULT_PAUSE
+        except ValueError:
+            pause = DEFAULT_PAUSE   # HTTP-date form — not worth parsing
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            self.tokens = min(self.tokens, 0)
+            self.clean = 0
+        print(f"🐢 {self.name}: throttled → {self.rate:.2f}/s, pausing {pause:.0f}s", flush=True)
+
+    def ok(self):
+        with self.lock:
+            self.clean += 1
+            if self.clean >= INCREASE_EVERY and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * INCREASE_STEP)
+                self.clean = 0
+
+    def observe(self, status, retry_after=None):
+        """Feed an HTTP status back into the limiter."""
+        if status in (429, 503):
+            self.throttled(retry_after)
+        elif status < 500:
+            self.ok()
+
+# ───────────────────────────────────────────────
+# REGISTRY
+# ───────────────────────────────────────────────
+_buckets = {}
+_registry_lock = threading.Lock()
+_share = 1
+
+def share(n):
+    """This process is one of n hitting the same upstreams: run every bucket at 1/n of LIMITS."""
+    global _share
+    with _registry_lock:
+        _share = max(1, n)
+        _buckets.clear()   # rebuilt at the new rate on next get()
+
+def get(name):
+    with _registry_lock:
+        if name not in _buckets:
+            rate, burst, min_rate = LIMITS.get(name, LIMITS["default"])
+            _buckets[name] = TokenBucket(name, rate / _share, max(1, round(burst / _share)), min_rate / _share)
+        return _buckets[name]
+
+def upstream_for(url):
+    p = urlparse(url)
+    host, path = p.hostname or "", p.path or ""
+    if host.endswith("ebay.com") and host.startswith("api."):
+        return "identity" if path.startswith("/identity") else "browse"
+    if host.endswith("ebay.com"):
+        return "ebay_web"
+    if "rocketsource" in host or "rocketsauce" in host:
+        return "rocketsource"
+    if "keepa" in host:
+        return "keepa"
+    if "scrapingdog" in host:
+        return "scrapingdog"
+    return "default"
+
+def for_url(url):
+    return get(upstream_for(url))
+
+def rates():
+    """{upstream: {"rate": current/s, "max": ceiling/s, "paused_for": seconds}}"""
+    now = time.monotonic()
+    with _registry_lock:
+        return {n: {"rate": round(b.rate, 3), "max": b.max_rate,
+                    "paused_for": round(max(0.0, b.paused_until - now), 1)}
+                for n, b in _buckets.items()}
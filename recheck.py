@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+recheck.py
+When an inventory item is due for its next verification — the policy behind
+ItemStore.due() (see item_store.py), so a verifier pass only looks at what is likely to have changed.
+
+✅ Past itemEndDate → due now; ending before the next regular check → checked just after it ends
+✅ Fresh listings are checked often, week-old quiet ones drift out towards MAX_HOURS
+✅ Expensive / high-score items (Score_Real_items.py writes the score back) come round sooner
+✅ Every status flip seen so far shortens the interval; "unknown" is retried within UNKNOWN_HOURS
+✅ Never sooner than MIN_HOURS, never later than MAX_HOURS
+✅ TTL_MINUTES: how long a stored result is trusted outright (ItemStore.fresh) — a verifier
+   skips those items without any network call; FLIPPER_TTL_<STATUS> (minutes) overrides
+
+All times are naive local ISO strings, like every other timestamp in the store.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+BASE_HOURS    = 12       # a listing scraped today, average value, never changed
+MIN_HOURS     = 0.5
+MAX_HOURS     = 7 * 24
+UNKNOWN_HOURS = 1        # bot wall / error last time — try again soon
+END_GRACE     = timedelta(minutes=10)   # eBay takes a moment to flip an ended listing
+AGE_DAYS      = 3        # every AGE_DAYS of listing age doubles the interval…
+MAX_BOOST     = 4.0      # …and value can divide it by at most this much
+TTL_MINUTES   = {status: float(os.getenv(f"FLIPPER_TTL_{status.upper()}", default))
+                 for status, default in (("active", 30), ("unknown", 0), ("sold", 24 * 60))}
+
+def parse_time(value):
+    """ISO string (naive local or with Z / offset) → naive local datetime, None if unusable."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+
+def next_check(now, status, scraped_at=None, ends_at=None, price=None, score=None, changes=0):
+    """Naive datetime of the next verification for an item that just came back `status`."""
+    end = parse_time(ends_at)
+    if end and end <= now:
+        return now   # already over — the next pass settles it
+    if status == "unknown":
+        hours = UNKNOWN_HOURS
+    else:
+        scraped = parse_time(scraped_at)
+        age_days = max(0.0, (now - scraped).total_seconds() / 86400) if scraped else 0.0
+        value = 1 + max(score or 0, 0) / 100 + (price or 0) / 500
+        hours = BASE_HOURS * (1 + age_days / AGE_DAYS) / min(value, MAX_BOOST) / (1 + (changes or 0))
+    at = now + timedelta(hours=min(max(hours, MIN_HOURS), MAX_HOURS))
+    if end and end + END_GRACE < at:
+        at = end + END_GRACE
+    return at
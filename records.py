@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+records.py
+Slot-based records for the big in-memory lists (verifier batches, scorer inputs, identifier dumps).
+
+✅ __slots__ classes — no per-object dict, field names are not stored per item
+✅ Prices are floats, not strings; missing fields are None
+✅ `raw` (JSON text, parsed only by to_dict) is kept only where a full dict is written back:
+   store rows for the scorer feed, and from_dict(raw=True) keeps just the keys without a slot.
+   Verifier batches (store.due) carry none — the store merges the stored JSON when one is sold
+✅ Decoders for the Browse itemSummary, the item store row, the on-disk JSON
+   (load_json builds records while parsing, the dicts never all exist at once)
+   and the keepa library's product objects
+✅ to_dict() / as_dict() turn any record back into the dict the rest of the pipeline expects
+
+Usage:
+    for it in store.items(typed=True):   it.url, it.price ...
+    keepa = load_json(KEEPA_SOLD_DATA, KeepaProduct)
+    store.upsert_items([Item.from_browse(summary, category="Laptops")])
+"""
+
+import json
+from datetime import datetime
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+def _extra(d, fields):
+    """JSON text of the keys a record has no slot for (None when there are none)."""
+    extra = {k: v for k, v in d.items() if k not in fields}
+    return json.dumps(extra, separators=(",", ":")) if extra else None
+
+class Item:
+    """An active (or not yet re-verified) listing."""
+    __slots__ = ("item_id", "title", "price", "url", "category", "condition", "scraped_at",
+                 "status", "sold_price", "sold_at", "ends_at", "raw")
+    FIELDS = __slots__
+    sold = False
+    UPDATED = ("sold_price", "sold_at")   # set by the verifiers — override what `raw` says
+
+    def __init__(self, item_id, title=None, price=None, url=None, category=None, condition=None,
+                 scraped_at=None, status=None, sold_price=None, sold_at=None, raw=None, ends_at=None):
+        self.item_id = item_id
+        self.title = title
+        self.price = price
+        self.url = url
+        self.category = category
+        self.condition = condition
+        self.scraped_at = scraped_at
+        self.status = status
+        self.sold_price = sold_price
+        self.sold_at = sold_at
+        self.ends_at = ends_at   # itemEndDate when eBay gives one (auctions, timed listings)
+        self.raw = raw
+
+    @classmethod
+    def from_browse(cls, summary, category=None, scraped_at=None):
+        """Browse API itemSummary → Item (category = the planner's category name)."""
+        return cls(summary["itemId"], summary.get("title"), _num((summary.get("price") or {}).get("value")),
+                   summary.get("itemWebUrl"), category, summary.get("condition"),
+                   scraped_at or datetime.now().isoformat(), status="active", ends_at=summary.get("itemEndDate"))
+
+    @classmethod
+    def from_row(cls, row, raw=True):
+        """items table: (item_id, status, title, price, url, category, condition, scraped_at, data)."""
+        item_id, status, title, price, url, category, condition, scraped_at, data = row
+        return cls(item_id, title, price, url, category, condition, scraped_at, status, raw=data if raw else None)
+
+    @classmethod
+    def from_dict(cls, d, raw=False):
+        return cls(d.get("item_id"), d.get("title"), _num(d.get("price")), d.get("url"),
+                   d.get("category") or d.get("categoryPath"), d.get("condition"), d.get("scraped_at"),
+                   sold_price=_num(d.get("sold_price")), sold_at=d.get("sold_at"),
+                   raw=_extra(d, cls.FIELDS) if raw else None, ends_at=d.get("ends_at") or d.get("itemEndDate"))
+
+    def to_dict(self):
+        d = json.loads(self.raw) if self.raw else {}
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            if name in ("raw", "status") or value is None:
+                continue
+            if name in self.UPDATED:
+                d[name] = value
+            else:
+                d.setdefault(name, value)
+        return d
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.item_id!r}, {self.title!r})"
+
+class SoldItem(Item):
+    """A row of the sold table. `duration` is the only field the scorer needs from the JSON."""
+    __slots__ = ("duration",)
+    FIELDS = Item.FIELDS + __slots__
+    sold = True
+
+    def __init__(self, item_id, duration=None, **fields):
+        super().__init__(item_id, **fields)
+        self.duration = duration
+
+    @classmethod
+    def from_row(cls, row):
+        """sold table: (item_id, title, price, sold_price, url, category, scraped_at, sold_at, data)."""
+        item_id, title, price, sold_price, url, category, scraped_at, sold_at, data = row
+        # Only parse the JSON when it actually carries a duration
+        duration = json.loads(data).get("duration") if '"duration"' in data else None
+        return cls(item_id, duration, title=title, price=price, url=url, category=category,
+                   scraped_at=scraped_at, sold_price=sold_price, sold_at=sold_at, raw=data)
+
+    @classmethod
+    def from_dict(cls, d, raw=False):
+        return cls(d.get("item_id"), d.get("duration"), title=d.get("title"), price=_num(d.get("price")),
+                   url=d.get("url"), category=d.get("category") or d.get("categoryPath"),
+                   scraped_at=d.get("scraped_at"), sold_price=_num(d.get("sold_price")), sold_at=d.get("sold_at"),
+                   raw=_extra(d, cls.FIELDS) if raw else None)
+
+class Identifier:
+    __slots__ = ("item_id", "brand", "mpn", "gtin", "upc", "ean")
+
+    def __init__(self, item_id, brand=None, mpn=None, gtin=None, upc=None, ean=None):
+        self.item_id = item_id
+        self.brand = brand
+        self.mpn = mpn
+        self.gtin = gtin
+        self.upc = upc
+        self.ean = ean
+
+    @classmethod
+    def from_browse(cls, summary):
+        prod = summary.get("product") or {}
+        return cls(summary["itemId"], prod.get("brand"), prod.get("mpn"), prod.get("gtin"),
+                   prod.get("upc"), prod.get("ean"))
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d.get("item_id"), d.get("brand"), d.get("mpn"), d.get("gtin"), d.get("upc"), d.get("ean"))
+
+    def codes(self):
+        """The UPC/EAN/GTIN values Keepa can look up."""
+        return [c for c in (self.gtin, self.upc, self.ean) if c]
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class KeepaProduct:
+    """One keepa_sold_data.json entry. `price` is always None — Keepa gives the sold price only."""
+    __slots__ = ("item_id", "title", "listing_date", "duration", "sold_price", "url", "category")
+    sold = False
+    price = None
+
+    def __init__(self, item_id, title=None, listing_date=None, duration=None, sold_price=None,
+                 url=None, category=None):
+        self.item_id = item_id
+        self.title = title
+        self.listing_date = listing_date
+        self.duration = duration
+        self.sold_price = sold_price
+        self.url = url
+        self.category = category
+
+    @classmethod
+    def from_keepa(cls, product):
+        """keepa library product → KeepaProduct, or None without sales history."""
+        csv_data = getattr(product, "csv", None)
+        if not csv_data or len(csv_data) < 2:
+            return None
+        first, last = datetime.fromtimestamp(csv_data[0][0]), datetime.fromtimestamp(csv_data[-1][0])
+        days = (last - first).days
+        return cls(product.asin, getattr(product, "title", "Unknown Title"), first.strftime('%Y-%m-%d'),
+                   f"{days} days" if days > 0 else "1 day", _num(csv_data[-1][1]) or None,
+                   f"https://www.amazon.com/dp/{product.asin}", getattr(product, "category", "Unknown"))
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d.get("item_id"), d.get("title"), d.get("listing_date"), d.get("duration"),
+                   _num(d.get("sold_price")), d.get("url"), d.get("categoryPath") or d.get("category"))
+
+    def to_dict(self):
+        # Plain decimal, never exponent notation (1234567 not 1.23457e+06)
+        price = "N/A" if self.sold_price is None else format(self.sold_price, "f").rstrip("0").rstrip(".")
+        return {"item_id": self.item_id, "title": self.title, "listing_date": self.listing_date,
+                "duration": self.duration, "sold_price": price, "url": self.url, "categoryPath": self.category}
+
+def as_dict(rec):
+    """Records → dicts for code that still speaks dicts; dicts pass through untouched."""
+    return rec if isinstance(rec, dict) else rec.to_dict()
+
+def load_json(path, cls):
+    """
+    JSON array file → list of `cls` records. Objects with an item_id become records as soon as
+    the parser finishes them, so the whole list of dicts is never held at once.
+    """
+    def hook(d):
+        return cls.from_dict(d) if "item_id" in d else d
+    with open(path, "r") as f:
+        data = json.load(f, object_hook=hook)
+    return [r for r in data if isinstance(r, cls)] if isinstance(data, list) else []
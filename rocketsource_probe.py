@@ -4,7 +4,8 @@ probe RockeSource upload endpoints/methods so we can see what they accept.
 Save as rocketsource_probe.py and run with your venv Python.
 """
 
-import requests, os, sys, time, json
+import os, sys, time, json
+import http_client
 
 ROCKET_KEY = "6110|hA5FSgCT60E9kIQcmp3BgA3kPC6KfnpWWimivhoS1503f800"
 BASE = "https://app.rocketsource.io"
@@ -38,7 +39,7 @@ def try_get(path):
     url = BASE + path
     headers = {"Authorization": f"Bearer {ROCKET_KEY}"}
     try:
-        r = requests.get(url, headers=headers, timeout=30)
+        r = http_client.get(url, headers=headers, timeout=30)
         log(f"GET {path} → {r.status_code} | Allow: {r.headers.get('Allow')} | Content-Type: {r.headers.get('Content-Type')}")
         snippet = r.text[:800].replace("\n"," ")
         log(f"   snippet: {snippet}")
@@ -61,9 +62,9 @@ def try_upload(path, method="PUT", use_csv=True):
     log(f"Attempting {method} {path} with {'CSV' if use_csv else 'JSON'} ({os.path.getsize(CSV_PATH) if use_csv else os.path.getsize(JSON_PATH)} bytes)")
     try:
         if method == "PUT":
-            r = requests.put(url, headers=headers, data=data, files=files, timeout=60)
+            r = http_client.put(url, headers=headers, data=data, files=files, timeout=60)
         else:
-            r = requests.post(url, headers=headers, data=data, files=files, timeout=60)
+            r = http_client.post(url, headers=headers, data=data, files=files, timeout=60)
         log(f"  → {r.status_code} | Allow: {r.headers.get('Allow')} | Content-Type: {r.headers.get('Content-Type')}")
         text = r.text[:2000].replace("\n"," ")
         log(f"  resp-snippet: {text}")
@@ -4,13 +4,14 @@ import os
 import threading
 import time
 import json
+from item_store import ItemStore
+import columnar_snapshot
 
 # Paths to scripts (update if needed)
 SCRAPER_SCRIPT = "/Users/stephentaykor/Desktop/flipper_Simulation/Flipper/Flipper/ebay_scraping_recent.py"
 VERIFIER_SCRIPT = "/Users/stephentaykor/Desktop/flipper_Simulation/Flipper/Flipper/verify_url.py"
 SCORER_SCRIPT = "/Users/stephentaykor/Desktop/flipper_Simulation/Flipper/Flipper/Score_Real_items.py"
-COMBINED_ITEMS_FILE = "/Users/stephentaykor/Desktop/flipper_Simulation/my_items_safe/combined_items.json"
-SAFE_ITEMS_FILE = "/Users/stephentaykor/Desktop/flipper_Simulation/my_items_safe/items.json"
+STORE_FILE = "/Users/stephentaykor/Desktop/flipper_Simulation/my_items_safe/flipper_items.sqlite"
 RECENT_ITEMS_FILE = "/Users/stephentaykor/Desktop/flipper_Simulation/my_items_recent/items.json"
 
 def run_script(script_path, description):
@@ -30,25 +31,16 @@ def run_script(script_path, description):
 
 def combine_items():
     print("🔗 Combining items from both sources...")
-    items = []
-    for path in [SAFE_ITEMS_FILE, RECENT_ITEMS_FILE]:
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                try:
-                    items.extend(json.load(f))
-                except Exception as e:
-                    print(f"⚠️ Could not load {path}: {e}")
-    # Deduplicate by item_id
-    seen = set()
-    deduped = []
-    for item in items:
-        iid = item.get("item_id")
-        if iid and iid not in seen:
-            seen.add(iid)
-            deduped.append(item)
-    with open(COMBINED_ITEMS_FILE, "w") as f:
-        json.dump(deduped, f, indent=2)
-    print(f"✅ Combined {len(deduped)} unique items.")
+    # The safe feed already lives in the item store; upsert the recent feed into it (dedup on item_id)
+    store = ItemStore(STORE_FILE)
+    if os.path.exists(RECENT_ITEMS_FILE):
+        with open(RECENT_ITEMS_FILE, "r") as f:
+            try:
+                store.upsert_items(json.load(f))
+            except Exception as e:
+                print(f"⚠️ Could not load {RECENT_ITEMS_FILE}: {e}")
+    print(f"✅ Combined {store.count()} unique items.")
+    store.close()
 
 def main():
     print("🔄 Starting full pipeline: Scraper → Verifier → Combine → Scorer")
@@ -65,9 +57,13 @@ def main():
 
     # Step 3: Combine items from both sources
     combine_items()
+
+    # Step 3b: Columnar snapshot for the scorer's trend pass (skipped without pyarrow)
+    if columnar_snapshot.pa is not None:
+        columnar_snapshot.export()
     
     # Step 4: Run Scorer on combined items
-    if not run_script(COMBINED_ITEMS_FILE, "Scorer (Score_Real_items.py)"):
+    if not run_script(SCORER_SCRIPT, "Scorer (Score_Real_items.py)"):
         print("❌ Pipeline stopped at scorer.")
         return
     
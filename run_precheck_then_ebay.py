@@ -14,11 +14,12 @@ import time
 import socket
 import tempfile
 import logging
-import requests
+import http_client
 from dotenv import load_dotenv
 from datetime import datetime
 from pathlib import Path
 from typing import Tuple
+from urllib.parse import urlparse
 
 # ------- Config -------
 BASE_DIR = Path("/Users/stephentaykor/Desktop/flipper_Simulation")
@@ -100,7 +101,7 @@ def do_multipart_upload_test(endpoint: str, sample_identifiers: list) -> Tuple[i
     Try to POST a multipart form upload.
     Returns: (status_code_or_-1, text_snippet, response_json_or_empty)
     """
-    host = requests.utils.urlparse(endpoint).hostname or ""
+    host = urlparse(endpoint).hostname or ""
     logging.info(f"Trying endpoint: {endpoint} (DNS OK?) {dns_ok(host)}")
     # Build a tiny JSON file to upload (or a CSV fallback)
     mapped_payload = {
@@ -129,7 +130,7 @@ def do_multipart_upload_test(endpoint: str, sample_identifiers: list) -> Tuple[i
     }
 
     try:
-        resp = requests.post(endpoint, headers=headers, files=files, data=data, timeout=90)
+        resp = http_client.post(endpoint, headers=headers, files=files, data=data, timeout=90)
         # close & cleanup
         files["file"][1].close()
         os.unlink(tmp_name)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+seen_index.py
+Persistent item_id index so scrapers only append listings they have never stored.
+
+✅ Bloom filter in memory (saved next to the DB) answers "definitely new" without disk I/O
+✅ SQLite set on disk confirms Bloom positives (no false drops)
+✅ Known ids get a cheap last_seen/seen_count touch instead of a duplicate record
+✅ Seeds itself from an existing items file on first use
+✅ Safe to share between scraper processes (Bloom picks up rows other processes add, and
+   close() saves it under the write lock so the saved filter always covers the stamped rows)
+
+Usage:
+    idx = SeenIndex(f"{SAFE_DIR}/seen_items.sqlite", seed_from=ITEMS_FILE)
+    new, known = idx.split(ids)      # read only
+    ...save the records for `new`...
+    idx.mark(new, known)             # now they count as seen
+    idx.close()
+"""
+
+import hashlib, json, math, os, sqlite3
+from datetime import datetime
+
+BLOOM_CAPACITY = 2_000_000
+BLOOM_FP_RATE  = 0.01
+
+# ───────────────────────────────────────────────
+# BLOOM FILTER
+# ───────────────────────────────────────────────
+class BloomFilter:
+    def __init__(self, capacity=BLOOM_CAPACITY, fp_rate=BLOOM_FP_RATE):
+        self.size = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        d = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.size.to_bytes(8, "little") + self.hashes.to_bytes(1, "little") + self.bits)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            raw = f.read()
+        bf = cls.__new__(cls)
+        bf.size, bf.hashes = int.from_bytes(raw[:8], "little"), raw[8]
+        bf.bits = bytearray(raw[9:])
+        return bf
+
+# ───────────────────────────────────────────────
+# INDEX
+# ───────────────────────────────────────────────
+class SeenIndex:
+    def __init__(self, db_path, seed_from=None, log=print):
+        self.db_path = db_path
+        self.bloom_path = db_path + ".bloom"
+        self.log = log
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS seen (
+            item_id TEXT PRIMARY KEY, first_seen TEXT, last_seen TEXT, seen_count INTEGER DEFAULT 1)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS seen_first ON seen (first_seen)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.commit()
+
+        if self._count() == 0 and seed_from and os.path.exists(seed_from):
+            self._seed(seed_from)
+        self._rowid = self._max_rowid()   # before the Bloom load: rows added meanwhile are pulled by _sync
+        self.bloom = self._load_bloom()
+        self._version = self._data_version()
+
+    def _seed(self, path):
+        try:
+            with open(path, "r") as f:
+                ids = [x["item_id"] for x in json.load(f) if x.get("item_id")]
+        except Exception as e:
+            self.log(f"⚠️ Could not seed seen index from {path}: {e}")
+            return
+        now = datetime.now().isoformat()
+        self.db.executemany("INSERT OR IGNORE INTO seen (item_id, first_seen, last_seen) VALUES (?, ?, ?)",
+                            ((i, now, now) for i in ids))
+        self.db.commit()
+        self.log(f"🌱 Seeded seen index with {len(ids)} ids from {path}")
+
+    def _count(self):
+        return self.db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def _load_bloom(self):
+        # The Bloom file is only written on close(); after a crash it misses ids, so rebuild
+        saved = self.db.execute("SELECT value FROM meta WHERE key = 'bloom_rows'").fetchone()
+        if os.path.exists(self.bloom_path) and saved and int(saved[0]) == self._count():
+            try:
+                return BloomFilter.load(self.bloom_path)
+            except Exception as e:
+                self.log(f"⚠️ Rebuilding Bloom filter ({e})")
+        bf = BloomFilter()
+        for (iid,) in self.db.execute("SELECT item_id FROM seen"):
+            bf.add(iid)
+        return bf
+
+    def _max_rowid(self):
+        return self.db.execute("SELECT COALESCE(MAX(rowid), 0) FROM seen").fetchone()[0]
+
+    def _data_version(self):
+        return self.db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _catch_up(self):
+        # seen is append-only and SQLite has one writer at a time, so rowids commit in order
+        for rowid, iid in self.db.execute("SELECT rowid, item_id FROM seen WHERE rowid > ?", (self._rowid,)):
+            self.bloom.add(iid)
+            self._rowid = max(self._rowid, rowid)
+
+    def _sync(self):
+        """Another scraper process committed — pull its new ids into our Bloom filter."""
+        version = self._data_version()
+        if version == self._version:
+            return
+        self._catch_up()
+        self._version = version
+
+    def split(self, item_ids):
+        """(new, known) sets — read only, nothing is marked yet."""
+        self._sync()
+        ids = {i for i in item_ids if i}
+        maybe = [i for i in ids if i in self.bloom]
+        known = set()
+        for n in range(0, len(maybe), 500):
+            chunk = maybe[n:n + 500]
+            q = f"SELECT item_id FROM seen WHERE item_id IN ({','.join('?' * len(chunk))})"
+            known.update(r[0] for r in self.db.execute(q, chunk))
+        return ids - known, known
+
+    def mark(self, new, known=()):
+        """Insert `new`, touch last_seen/seen_count on `known`. Call after the records are saved."""
+        now = datetime.now().isoformat()
+        self.db.executemany("UPDATE seen SET last_seen = ?, seen_count = seen_count + 1 WHERE item_id = ?",
+                            ((now, i) for i in known))
+        self.db.executemany("INSERT OR IGNORE INTO seen (item_id, first_seen, last_seen) VALUES (?, ?, ?)",
+                            ((i, now, now) for i in new))
+        self.db.commit()
+        for i in new:
+            self.bloom.add(i)
+
+    def ingest(self, item_ids):
+        """split() + mark() in one go. Returns the set that was never seen before."""
+        new, known = self.split(item_ids)
+        self.mark(new, known)
+        return new
+
+    def __contains__(self, item_id):
+        if item_id not in self.bloom:
+            return False
+        return self.db.execute("SELECT 1 FROM seen WHERE item_id = ?", (item_id,)).fetchone() is not None
+
+    def close(self):
+        # Hold the write lock so no other process inserts between the catch-up, the count and
+        # the save — the stamp then matches the saved filter even with several workers closing
+        self.db.commit()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self._catch_up()
+            self.bloom.save(self.bloom_path)
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bloom_rows', ?)", (str(self._count()),))
+            self.db.commit()
+        except BaseException:
+            self.db.rollback()
+            raise
+        finally:
+            self.db.close()
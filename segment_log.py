@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+segment_log.py
+Append-only JSONL segments for shops that keep flat files next to (or instead of) item_store.py.
+
+✅ append() writes one line per record to the head segment — O(batch), never a rewrite
+✅ Head rotates at SEGMENT_BYTES; sealed segments are never modified again
+✅ compact() merges sealed segments keeping the latest record per item_id (tombstones drop it)
+✅ Runs in a background thread (compact_in_background / auto after append); close() waits for it
+✅ snapshot() opens every segment of one manifest — readers see a consistent view
+   even while compaction swaps files underneath them
+
+Layout:
+    <dir>/MANIFEST.json          {"segments": ["seg-000001.jsonl", ...], "next": 7}
+    <dir>/seg-000007.jsonl       last entry in the manifest = head (appends go here)
+
+Usage:
+    log = SegmentLog(f"{SAFE_DIR}/items_log")
+    log.append(records)                      # dicts with item_id
+    log.delete(item_ids)                     # tombstones
+    for rec in log.snapshot():  ...          # streamed, latest per item_id not guaranteed
+    for rec in log.latest():    ...          # latest per item_id (reads the whole snapshot)
+    log.close()                              # joins a running compaction
+"""
+
+import fcntl, json, os, sys, threading
+from contextlib import contextmanager
+
+SEGMENT_BYTES  = 64 * 1024 * 1024   # rotate the head at 64 MB
+COMPACT_AFTER  = 8                  # sealed segments before an automatic compaction
+TOMBSTONE      = "_deleted"
+
+class SegmentLog:
+    def __init__(self, path, segment_bytes=SEGMENT_BYTES, compact_after=COMPACT_AFTER, log=print):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.compact_after = compact_after
+        self.log = log
+        self._manifest = os.path.join(path, "MANIFEST.json")
+        self._compacting = threading.Lock()
+        self._compactor = None
+        os.makedirs(path, exist_ok=True)
+        with self._locked(fcntl.LOCK_EX):
+            if not os.path.exists(self._manifest):
+                self._write_manifest({"segments": ["seg-000001.jsonl"], "next": 2})
+                open(os.path.join(path, "seg-000001.jsonl"), "a").close()
+
+    # ─── manifest ─────────────────────────────────
+    @contextmanager
+    def _locked(self, mode):
+        with open(os.path.join(self.path, ".lock"), "a") as lock:
+            fcntl.flock(lock, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_manifest(self):
+        with open(self._manifest, "r") as f:
+            return json.load(f)
+
+    def _write_manifest(self, m):
+        tmp = self._manifest + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(m, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._manifest)
+
+    def _new_segment(self, m):
+        name = f"seg-{m['next']:06d}.jsonl"
+        m["next"] += 1
+        open(os.path.join(self.path, name), "a").close()
+        return name
+
+    # ─── writes ───────────────────────────────────
+    def append(self, records):
+        lines = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+        if not lines:
+            return
+        with self._locked(fcntl.LOCK_EX):
+            m = self._read_manifest()
+            head = os.path.join(self.path, m["segments"][-1])
+            with open(head, "a") as f:
+                f.write(lines)
+            if os.path.getsize(head) >= self.segment_bytes:
+                m["segments"].append(self._new_segment(m))
+                self._write_manifest(m)
+            sealed = len(m["segments"]) - 1
+        if sealed >= self.compact_after:
+            self.compact_in_background()
+
+    def delete(self, item_ids):
+        self.append({"item_id": i, TOMBSTONE: True} for i in item_ids)
+
+    # ─── reads ────────────────────────────────────
+    def snapshot(self):
+        """Stream every record of one manifest version (head read up to its size right now)."""
+        with self._locked(fcntl.LOCK_SH):
+            m = self._read_manifest()
+            files = [open(os.path.join(self.path, s), "r") for s in m["segments"]]
+            head_size = os.fstat(files[-1].fileno()).st_size
+        # Handles are open: compaction may unlink the files, we keep reading them
+        try:
+            for n, f in enumerate(files):
+                last = n == len(files) - 1
+                read = 0
+                for line in f:
+                    read += len(line.encode())
+                    if last and read > head_size:
+                        break
+                    if line.endswith("\n"):
+                        yield json.loads(line)
+        finally:
+            for f in files:
+                f.close()
+
+    def latest(self):
+        """Latest record per item_id, tombstoned ids left out."""
+        keep, anon = {}, []
+        for rec in self.snapshot():
+            iid = rec.get("item_id")
+            if iid is None:
+                anon.append(rec)
+            else:
+                keep.pop(iid, None)   # re-insert so order = last write
+                keep[iid] = rec
+        yield from anon
+        for rec in keep.values():
+            if not rec.get(TOMBSTONE):
+                yield rec
+
+    # ─── compaction ───────────────────────────────
+    def compact(self):
+        """Merge all sealed segments into one (latest per item_id). The head keeps taking appends."""
+        if not self._compacting.acquire(blocking=False):
+            return False   # one compaction at a time per process
+        guard = open(os.path.join(self.path, ".compact.lock"), "a")
+        try:
+            try:
+                fcntl.flock(guard, fcntl.LOCK_EX | fcntl.LOCK_NB)   # ...and across processes
+            except BlockingIOError:
+                return False
+            with self._locked(fcntl.LOCK_EX):
+                m = self._read_manifest()
+                head = os.path.join(self.path, m["segments"][-1])
+                if len(m["segments"]) == 1 and os.path.getsize(head) == 0:
+                    return False
+                m["segments"].append(self._new_segment(m))   # seal the current head
+                merged = f"seg-{m['next']:06d}.jsonl"          # reserve the output name
+                m["next"] += 1
+                self._write_manifest(m)
+                sealed = m["segments"][:-1]
+
+            # Latest line per item_id, kept as raw text — no re-encoding
+            keep, anon = {}, []
+            for name in sealed:
+                with open(os.path.join(self.path, name), "r") as f:
+                    for line in f:
+                        if not line.endswith("\n"):
+                            continue
+                        rec = json.loads(line)
+                        iid = rec.get("item_id")
+                        if iid is None:
+                            anon.append(line)
+                        else:
+                            keep.pop(iid, None)
+                            keep[iid] = None if rec.get(TOMBSTONE) else line
+            # The merged segment is the oldest one left, so tombstones have nothing to hide any more
+            lines = anon + [l for l in keep.values() if l is not None]
+
+            tmp = os.path.join(self.path, merged + ".tmp")   # written outside the lock — appends go on
+            with open(tmp, "w") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._locked(fcntl.LOCK_EX):
+                m = self._read_manifest()
+                os.replace(tmp, os.path.join(self.path, merged))
+                # sealed segments are a prefix of the manifest — only appends/rotations happened since
+                m["segments"] = [merged] + m["segments"][len(sealed):]
+                self._write_manifest(m)
+                for name in sealed:
+                    os.unlink(os.path.join(self.path, name))   # open snapshots keep their handles
+            self.log(f"🗜️ Compacted {len(sealed)} segments → {merged} ({len(lines)} records)")
+            return True
+        finally:
+            fcntl.flock(guard, fcntl.LOCK_UN)
+            guard.close()
+            self._compacting.release()
+
+    def compact_in_background(self):
+        if self._compactor and self._compactor.is_alive():
+            return self._compactor   # compact() would return straight away anyway
+        self._compactor = threading.Thread(target=self.compact, name="segment-compactor", daemon=True)
+        self._compactor.start()
+        return self._compactor
+
+    def close(self):
+        """Wait for a background compaction — exiting mid-merge would leave its temp segment behind."""
+        if self._compactor:
+            self._compactor.join()
+            self._compactor = None
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "compact":
+        SegmentLog(sys.argv[2]).compact()
+    else:
+        print("usage: segment_log.py compact <dir>")
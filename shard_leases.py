@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+shard_leases.py
+Lets several scraper processes (or machines sharing SAFE_DIR) split one sweep.
+
+✅ Every planned query key is a shard; a worker claims a few at a time
+✅ Lease table in SQLite — claims are atomic (BEGIN IMMEDIATE)
+✅ Each shard runs once per round (round = one CYCLE_SECONDS window)
+✅ Leases expire; a crashed worker's shards are reclaimed by the others
+✅ file_lock() for the shared JSON files the workers all write
+
+Machines sharing a directory need a filesystem with working POSIX locks
+(SQLite and flock both depend on it) — a local disk or a proper NFS mount.
+
+Usage:
+    leases = LeaseCoordinator(f"{SAFE_DIR}/shard_leases.sqlite")
+    rnd = leases.current_round(CYCLE_SECONDS)
+    while (keys := leases.claim(all_keys, rnd, limit=4)):
+        ...scrape keys, leases.renew(key) as pages arrive...
+        leases.release(keys, rnd)
+"""
+
+import fcntl, os, socket, sqlite3, time
+from contextlib import contextmanager
+
+LEASE_SECONDS = 600   # a worker that goes quiet this long loses its shards
+
+@contextmanager
+def file_lock(path):
+    """Exclusive flock on <path>.lock for read-modify-write of a shared file."""
+    with open(path + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+class LeaseCoordinator:
+    def __init__(self, db_path, worker_id=None, lease_seconds=LEASE_SECONDS, log=print):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.log = log
+        self.db = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS shards (
+            key TEXT PRIMARY KEY, owner TEXT, lease_until REAL DEFAULT 0,
+            done_round INTEGER DEFAULT -1, runs INTEGER DEFAULT 0, last_done REAL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS shards_round ON shards (done_round)")
+
+    # ─── rounds ───────────────────────────────────
+    @staticmethod
+    def current_round(cycle_seconds):
+        return int(time.time() // cycle_seconds)
+
+    @staticmethod
+    def seconds_to_next_round(cycle_seconds):
+        return cycle_seconds - time.time() % cycle_seconds
+
+    # ─── leases ───────────────────────────────────
+    def claim(self, keys, round_id, limit=None):
+        """Lease up to `limit` of `keys` not yet done this round and not held by a live worker."""
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.executemany("INSERT OR IGNORE INTO shards (key) VALUES (?)", ((k,) for k in keys))
+            wanted = set(keys)
+            rows = self.db.execute(
+                "SELECT key, owner FROM shards WHERE done_round < ? AND (owner IS NULL OR lease_until < ?) "
+                "ORDER BY COALESCE(last_done, 0), key", (round_id, now)).fetchall()
+            rows = [r for r in rows if r[0] in wanted][:limit]
+            self.db.executemany("UPDATE shards SET owner = ?, lease_until = ? WHERE key = ?",
+                                ((self.worker_id, now + self.lease_seconds, k) for k, _ in rows))
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        stolen = [k for k, owner in rows if owner and owner != self.worker_id]
+        if stolen:
+            self.log(f"♻️ Reclaimed {len(stolen)} expired shard lease(s): {', '.join(stolen[:5])}")
+        return [k for k, _ in rows]
+
+    def renew(self, *keys):
+        self.db.executemany("UPDATE shards SET lease_until = ? WHERE key = ? AND owner = ?",
+                            ((time.time() + self.lease_seconds, k, self.worker_id) for k in keys))
+
+    def release(self, keys, round_id=None):
+        """Give the shards back. With round_id they count as done for that round."""
+        now = time.time()
+        if round_id is None:
+            self.db.executemany("UPDATE shards SET owner = NULL, lease_until = 0 WHERE key = ? AND owner = ?",
+                                ((k, self.worker_id) for k in keys))
+        else:
+            self.db.executemany(
+                "UPDATE shards SET owner = NULL, lease_until = 0, done_round = ?, runs = runs + 1, "
+                "last_done = ? WHERE key = ? AND owner = ?",
+                ((round_id, now, k, self.worker_id) for k in keys))
+
+    def status(self, round_id):
+        """{"done": n, "leased": n, "waiting": n} for the round."""
+        now = time.time()
+        done, leased, total = self.db.execute(
+            "SELECT SUM(done_round >= ?), SUM(done_round < ? AND owner IS NOT NULL AND lease_until >= ?), COUNT(*) "
+            "FROM shards", (round_id, round_id, now)).fetchone()
+        done, leased = done or 0, leased or 0
+        return {"done": done, "leased": leased, "waiting": total - done - leased}
+
+    def close(self):
+        self.db.close()
@@ -1,5 +1,7 @@
 import asyncio
 from limited_check_url import limited_check_url
+import browser_pool
+import http_verifier
 
 async def main():
     url = "https://www.ebay.com/itm/155399653056"  # sample listing
@@ -8,5 +10,7 @@ async def main():
     
     result = await limited_check_url(url, proxy, sem)
     print("RESULT:", result)
+    await http_verifier.close_shared()
+    await browser_pool.close_shared()
 
 asyncio.run(main())
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
-import os, json, csv, io, requests
+import os, json, csv, io
+import http_client
 from dotenv import load_dotenv
 from datetime import datetime
 
@@ -53,7 +54,7 @@ def to_csv_bytes(items):
 
 def dns_ok(url):
     try:
-        requests.get(url.split("/")[0] + "//" + url.split("/")[2], timeout=2)
+        http_client.get(url.split("/")[0] + "//" + url.split("/")[2], timeout=2)
         return True
     except:
         return False
@@ -76,11 +77,11 @@ def attempt(url, items):
     for mode, field, content, ctype in modes:
         try:
             if field is None:
-                r = requests.post(url, headers=headers, json=items, timeout=20)
+                r = http_client.post(url, headers=headers, json=items, timeout=20)
             else:
                 files = { field: ("items."+("json" if mode=="json" else "csv"), content, ctype) }
                 data = {"marketplace":"amazon"}
-                r = requests.post(url, headers=headers, data=data, files=files, timeout=20)
+                r = http_client.post(url, headers=headers, data=data, files=files, timeout=20)
 
             status = r.status_code
             text = r.text[:200]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+token_provider.py
+One eBay OAuth token for every script, refreshed only when it is about to expire.
+
+✅ In-memory cache per (grant, scope) — repeat calls in a process are free
+✅ On-disk cache shared by every script (chmod 600)
+✅ File lock around refresh so concurrent scripts mint ONE token, not one each
+✅ Honours expires_in, refreshes REFRESH_MARGIN seconds early
+✅ invalidate(bad_token) after a 401 → next get_token() refreshes (once, not per caller)
+
+Usage:
+    import token_provider
+    token = token_provider.get_token()                               # user token (refresh_token grant)
+    token = token_provider.get_token(grant="client_credentials")     # application token
+"""
+
+import base64, fcntl, json, os, threading, time
+import http_client
+
+BASE = "/Users/stephentaykor/Desktop/flipper_Simulation"
+CACHE_FILE = f"{BASE}/my_items_safe/.ebay_oauth_cache.json"
+LOCK_FILE  = CACHE_FILE + ".lock"
+
+TOKEN_URL = "https://api.ebay.com/identity/v1/oauth2/token"
+DEFAULT_SCOPE = "https://api.ebay.com/oauth/api_scope"
+REFRESH_MARGIN = 300   # seconds before expiry we stop handing the token out
+
+_memory = {}
+_mem_lock = threading.Lock()
+
+# ───────────────────────────────────────────────
+# DISK CACHE
+# ───────────────────────────────────────────────
+def _read_cache():
+    try:
+        with open(CACHE_FILE, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _write_cache(cache):
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    tmp = CACHE_FILE + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, CACHE_FILE)
+
+def _fresh(entry):
+    return bool(entry) and entry.get("expires_at", 0) - REFRESH_MARGIN > time.time()
+
+# ───────────────────────────────────────────────
+# REFRESH
+# ───────────────────────────────────────────────
+def _mint(grant, scope, client_id, client_secret, refresh_token):
+    creds = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
+    data = {"grant_type": grant, "scope": scope}
+    if grant == "refresh_token":
+        data["refresh_token"] = refresh_token
+    r = http_client.post(
+        TOKEN_URL,
+        headers={"Authorization": f"Basic {creds}", "Content-Type": "application/x-www-form-urlencoded"},
+        data=data, timeout=30, idempotent=True,   # minting twice is harmless
+    )
+    if r.status_code != 200:
+        print(f"❌ Token refresh failed: {r.status_code} {r.text[:200]}", flush=True)
+        return None
+    body = r.json()
+    return {"access_token": body["access_token"],
+            "expires_at": time.time() + int(body.get("expires_in", 7200))}
+
+def get_token(grant="refresh_token", scope=DEFAULT_SCOPE, client_id=None,
+              client_secret=None, refresh_token=None, force=False, reject=None):
+    """
+    Cached access token, or None if eBay refused to issue one.
+    force=True always mints; reject=<token> skips a cached token equal to it.
+    """
+    key = f"{grant}|{scope}"
+    usable = lambda e: _fresh(e) and not force and e.get("access_token") != reject
+    with _mem_lock:
+        if usable(_memory.get(key)):
+            return _memory[key]["access_token"]
+
+        client_id = client_id or os.getenv("EBAY_CLIENT_ID")
+        client_secret = client_secret or os.getenv("EBAY_CLIENT_SECRET")
+        refresh_token = refresh_token or os.getenv("EBAY_REFRESH_TOKEN")
+
+        os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+        with open(LOCK_FILE, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                cache = _read_cache()
+                entry = cache.get(key)
+                # Another script may have refreshed while we waited on the lock
+                if usable(entry):
+                    _memory[key] = entry
+                    return entry["access_token"]
+
+                entry = _mint(grant, scope, client_id, client_secret, refresh_token)
+                if not entry:
+                    return None
+                cache[key] = entry
+                _write_cache(cache)
+                _memory[key] = entry
+                print(f"🔑 New eBay token ({grant}), valid {int(entry['expires_at'] - time.time())}s", flush=True)
+                return entry["access_token"]
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+def invalidate(bad_token, grant="refresh_token", scope=DEFAULT_SCOPE):
+    """Call after a 401. Returns a new token (or the one another caller already refreshed)."""
+    key = f"{grant}|{scope}"
+    with _mem_lock:
+        current = (_memory.get(key) or {}).get("access_token")
+    if current and current != bad_token:
+        return current
+    return get_token(grant=grant, scope=scope, reject=bad_token)
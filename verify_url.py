@@ -1,13 +1,21 @@
 import asyncio
+import itertools
 import json
 import os
 import time
 import random
-import base64
 import ssl
 from datetime import datetime
 from dotenv import load_dotenv
-import requests
+import token_provider
+import rate_limiter
+from item_store import ItemStore
+from checkpoint_writer import CheckpointWriter
+from api_verifier import BrowseStatus, resolved
+from quota_allocator import QuotaAllocator
+import browser_pool
+import http_verifier
+from limited_check_url import limited_check_url   # HTTP tier, then a pooled page
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -24,18 +32,15 @@ load_dotenv("/Users/stephentaykor/Desktop/flipper_Simulation/Flipper_AI/.env")
 EBAY_CLIENT_ID = os.getenv("EBAY_CLIENT_ID")
 EBAY_CLIENT_SECRET = os.getenv("EBAY_CLIENT_SECRET")
 EBAY_REFRESH_TOKEN = os.getenv("EBAY_REFRESH_TOKEN")
-TOKEN_URL = "https://api.ebay.com/identity/v1/oauth2/token"
 
 # ────────────────────────────────────────────────────────────────
 # File paths
 # ────────────────────────────────────────────────────────────────
 BASE_DIR = "/Users/stephentaykor/Desktop/flipper_Simulation"
-SAFE_ITEMS_FILE = f"{BASE_DIR}/my_items_safe/items.json"
-RECENT_ITEMS_FILE = f"{BASE_DIR}/my_items_recent/items.json"
-SOLD_ITEMS_FILE = f"{BASE_DIR}/my_items_safe/sold_items.json"
-ITEMS_FILE = f"{BASE_DIR}/my_items_safe/items.json"
-SCORING_PATH = f"{BASE_DIR}/my_items_safe.json"
-URLS_PATH = f"{BASE_DIR}/my_items_safe/urls.json"
+SAFE_DIR = f"{BASE_DIR}/my_items_safe"
+RECENT_ITEMS_FILE = f"{BASE_DIR}/my_items_recent/items.json"   # written by the recent scraper, merged into the store
+STORE_FILE = f"{SAFE_DIR}/flipper_items.sqlite"
+QUOTA_FILE = f"{SAFE_DIR}/browse_quota.json"   # daily Browse cap shared with the scraper
 LOG_FILE = f"{BASE_DIR}/my_items_safe/verifier.log"
 
 # ────────────────────────────────────────────────────────────────
@@ -71,38 +76,33 @@ def log_progress(message: str):
         f.write(f"{datetime.now()}: {message}\n")
 
 def refresh_token():
-    creds = base64.b64encode(f"{EBAY_CLIENT_ID}:{EBAY_CLIENT_SECRET}".encode()).decode()
-    resp = requests.post(
-        TOKEN_URL,
-        headers={"Content-Type": "application/x-www-form-urlencoded",
-                 "Authorization": f"Basic {creds}"},
-        data={
-            "grant_type": "refresh_token",
-            "refresh_token": EBAY_REFRESH_TOKEN,
-            "scope": "https://api.ebay.com/oauth/api_scope"
-        }
-    )
-    if resp.status_code == 200:
-        log_progress("🔑 Refreshed token")
-        return resp.json()["access_token"]
-    log_progress(f"❌ Token refresh failed: {resp.text}")
-    return None
+    token = token_provider.get_token(client_id=EBAY_CLIENT_ID, client_secret=EBAY_CLIENT_SECRET,
+                                     refresh_token=EBAY_REFRESH_TOKEN)
+    if token:
+        log_progress("🔑 eBay token ready")
+    else:
+        log_progress("❌ Token refresh failed")
+    return token
 
 def is_flipper_data(path):
     return path.startswith(BASE_DIR)
 
-def save_items(file_path, items):
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    existing = []
-    if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            try:
-                existing = json.load(f)
-            except json.JSONDecodeError:
-                existing = []
-    combined = {i["item_id"]: i for i in existing + items}.values()
-    with open(file_path, "w") as f:
-        json.dump(list(combined), f, indent=2)
+def merge_recent(store):
+    """Pull the recent scraper's items.json into the store (upsert, sold ids skipped)."""
+    if not os.path.exists(RECENT_ITEMS_FILE):
+        log_progress(f"No file found at {RECENT_ITEMS_FILE}")
+        return
+    try:
+        with open(RECENT_ITEMS_FILE, 'r') as f:
+            n = store.upsert_items(json.load(f))
+        log_progress(f"Merged {n} items from {RECENT_ITEMS_FILE}")
+    except json.JSONDecodeError as e:
+        log_progress(f"Error reading {RECENT_ITEMS_FILE}: {e}")
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
 
 # ────────────────────────────────────────────────────────────────
 # Selenium Core (Stable)
@@ -193,70 +193,30 @@ def save_items(file_path, items):
 #                 print(f"Driver quit for {url}")
 #     return ("bot_detected", None)
 
-async def limited_check_url(url, proxy_url, semaphore):
-    async with semaphore:
-        # Placeholder: always return ("active", None)
-        # Replace this with your Playwright logic later
-        print(f"Playwright placeholder for {url} with proxy {proxy_url}")
-        await asyncio.sleep(0.1)
-        return ("active", None)
-
 async def verify_and_clean_items(max_retries=5):
     log_progress("Starting verifier")
     print(f"🚀 Starting verifier (NZDT: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
     # Validate Flipper-specific paths
-    if not all(is_flipper_data(path) for path in [SAFE_ITEMS_FILE, RECENT_ITEMS_FILE, ITEMS_FILE, SOLD_ITEMS_FILE, SCORING_PATH, URLS_PATH]):
+    if not all(is_flipper_data(path) for path in [RECENT_ITEMS_FILE, STORE_FILE]):
         log_progress("Error: Detected non-Flipper data paths, exiting")
         print("Error: Detected non-Flipper data paths, exiting")
         return
 
-    # Load and combine items
-    items = []
-    for file_path in [SAFE_ITEMS_FILE, RECENT_ITEMS_FILE]:
-        try:
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    file_items = json.load(f)
-                    items.extend(file_items)
-                    log_progress(f"Loaded {len(file_items)} items from {file_path}")
-                    print(f"Loaded {len(file_items)} items from {file_path}")
-            else:
-                log_progress(f"No file found at {file_path}")
-                print(f"No file found at {file_path}")
-        except json.JSONDecodeError as e:
-            log_progress(f"Error reading {file_path}: {e}")
-            print(f"Error reading {file_path}: {e}")
-            continue
-
-    if not items:
-        log_progress("No items to process, exiting")
-        print("No items to process, exiting")
-        return
-
-    # Deduplicate on item_id
-    seen_ids = set()
-    deduped_items = []
-    for item in items:
-        item_id = item.get("item_id")
-        if item_id and item_id not in seen_ids:
-            seen_ids.add(item_id)
-            deduped_items.append(item)
-    items = deduped_items
-    log_progress(f"Combined and deduped {len(items)} items")
-    print(f"Combined and deduped {len(items)} items")
-
-    # Load existing sold items
-    sold_items = []
+    store = ItemStore(STORE_FILE, seed_dir=SAFE_DIR, log=log_progress)
     try:
-        if os.path.exists(SOLD_ITEMS_FILE):
-            with open(SOLD_ITEMS_FILE, 'r') as f:
-                sold_items = json.load(f)
-                log_progress(f"Loaded {len(sold_items)} existing sold items from {SOLD_ITEMS_FILE}")
-                print(f"Loaded {len(sold_items)} existing sold items from {SOLD_ITEMS_FILE}")
-    except json.JSONDecodeError as e:
-        log_progress(f"Error reading {SOLD_ITEMS_FILE}: {e}")
-        print(f"Error reading {SOLD_ITEMS_FILE}: {e}")
+        await _verify_due(store, max_retries)
+    finally:
+        store.close()   # also on the early exits below and on errors
+
+async def _verify_due(store, max_retries):
+    merge_recent(store)
+    total = store.count_due()   # only what the schedule says is due (see recheck.py) — active or unknown
+    if not total:
+        log_progress(f"Nothing due of {store.count()} items, exiting")
+        print(f"Nothing due of {store.count()} items, exiting")
+        return
+    log_progress(f"{total} of {store.count()} items due for verification, {store.count_sold()} already sold")
 
     # Refresh token
     token = refresh_token()
@@ -265,68 +225,75 @@ async def verify_and_clean_items(max_retries=5):
         print("No valid token, exiting")
         return
 
-    # Verify items in batches
+    # Verify items in batches — first pass streams the store, retries only the inaccessible ones
     retry_count = 0
-    items_to_check = items
-
-    while retry_count < max_retries and items_to_check:
-        print(f"🔄 Pass {retry_count+1} | Checking {len(items_to_check)} items...")
-        active_items = []
-        sold_items = []
-        inaccessible_items = []
-        items_processed = 0
-
-        semaphore = asyncio.Semaphore(CONCURRENCY)
-        for i in range(0, len(items_to_check), BATCH_SIZE):
-            batch = items_to_check[i:i+BATCH_SIZE]
-            print(f"🔢 Batch {i//BATCH_SIZE+1}: Checking items {i+1}-{min(i+BATCH_SIZE, len(items_to_check))} of {len(items_to_check)}")
-            tasks = []
-            for j, item in enumerate(batch):
-                url = item.get("url")
-                proxy = get_rotated_proxy(i + j)
-                if url and isinstance(url, str):
-                    tasks.append(limited_check_url(url, proxy, semaphore))
-                else:
-                    tasks.append(asyncio.to_thread(lambda: (False, None)))
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            for j, result in enumerate(results):
-                item = batch[j]
-                if isinstance(result, Exception):
-                    print(f"❌ Exception for item {item.get('item_id')}: {result}")
-                    status, sold_price = (False, None)
-                else:
-                    status, sold_price = result
-                print(f"    Processed item {i+j+1}/{len(items_to_check)}: {item.get('title', '')[:40]}... Status: {status}")
-
-                if status == "sold":
-                    item["sold"] = True
-                    item["sold_price"] = sold_price
-                    sold_items.append(item)
-                elif status == "active":
-                    item["sold"] = False
-                    active_items.append(item)
-                else:  # bot_detected or error
-                    item["sold"] = "unknown"
-                    inaccessible_items.append(item)
-
-            await asyncio.sleep(random.uniform(2, 4))  # Shorter sleep for stability
-
-        # Save after each pass
-        save_items(ITEMS_FILE, active_items)
-        with open(SOLD_ITEMS_FILE, 'w') as f:
-            json.dump(sold_items, f, indent=2)
-        save_items(SCORING_PATH, active_items)
-        urls = [item["url"] for item in active_items if item.get("url")]
-        with open(URLS_PATH, 'w') as f:
-            json.dump(urls, f, indent=2)
-
-        print(f"Pass {retry_count+1} complete: {len(sold_items)} sold, {len(active_items)} active, {len(inaccessible_items)} inaccessible")
-        log_progress(f"Pass {retry_count+1} complete: {len(sold_items)} sold, {len(active_items)} active, {len(inaccessible_items)} inaccessible")
-
-        # Prepare for next retry
-        items_to_check = inaccessible_items
-        retry_count += 1
-
+    items_to_check = store.due(typed=True)   # slot records, soonest-due first
+    writer = CheckpointWriter(STORE_FILE, log=log_progress)   # an unknown → active retry is written once
+    api = BrowseStatus(token, log=log_progress,   # getItems first, the browser only for what it can't resolve
+                       quota=QuotaAllocator(QUOTA_FILE, log=log_progress))
+    try:
+        while retry_count < max_retries and items_to_check:
+            print(f"🔄 Pass {retry_count+1} | Checking {total if retry_count == 0 else len(items_to_check)} items...")
+            n_active = n_sold = n_cached = 0
+            inaccessible_items = []
+
+            semaphore = asyncio.Semaphore(CONCURRENCY)
+            for n, batch in enumerate(batches(items_to_check, BATCH_SIZE)):
+                i = n * BATCH_SIZE
+                print(f"🔢 Batch {n+1}: Checking items {i+1}-{i+len(batch)}")
+                cached = store.fresh(it.item_id for it in batch)   # checked within its TTL — no request at all
+                batch = [it for it in batch if it.item_id not in cached]
+                n_cached += len(cached)
+                if not batch:
+                    continue
+                known = await api.statuses([it.item_id for it in batch])
+                tasks = []
+                for j, item in enumerate(batch):
+                    url = item.url
+                    proxy = get_rotated_proxy(i + j)
+                    if known.get(item.item_id):
+                        tasks.append(resolved(known[item.item_id]))
+                    elif url and isinstance(url, str):
+                        tasks.append(limited_check_url(url, proxy, semaphore))
+                    else:
+                        tasks.append(asyncio.to_thread(lambda: (False, None)))
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+                for j, result in enumerate(results):
+                    item = batch[j]
+                    if isinstance(result, Exception):
+                        print(f"❌ Exception for item {item.item_id}: {result}")
+                        status, sold_price = (False, None)
+                    else:
+                        status, sold_price = result
+                    print(f"    Processed item {i+j+1}: {(item.title or '')[:40]}... Status: {status}")
+                    evidence = "api" if known.get(item.item_id) else "page"
+
+                    # Queued for the background writer — only these rows are written
+                    if status in ("sold", "ended"):
+                        item.sold_price = sold_price
+                        writer.sold(item, evidence=evidence)
+                        n_sold += 1
+                    elif status == "active":
+                        writer.checked(item.item_id, "active", evidence=evidence)
+                        n_active += 1
+                    else:  # bot_detected or error
+                        if status == "bot_detected":
+                            rate_limiter.get("ebay_web").throttled()
+                        writer.checked(item.item_id, "unknown", evidence=str(status))
+                        inaccessible_items.append(item)
+
+            print(f"Pass {retry_count+1} complete: {n_sold} sold, {n_active} active, {len(inaccessible_items)} inaccessible, {n_cached} cached")
+            log_progress(f"Pass {retry_count+1} complete: {n_sold} sold, {n_active} active, {len(inaccessible_items)} inaccessible, {n_cached} cached")
+            log_progress(f"Browse API: {api.stats}")
+
+            # Prepare for next retry
+            items_to_check = inaccessible_items
+            retry_count += 1
+    finally:
+        await api.close()
+        await http_verifier.close_shared()
+        await browser_pool.close_shared()
+        writer.close()
     print(f"✅ Verification finished after {retry_count} passes.")
     log_progress(f"Verification finished after {retry_count} passes.")
 
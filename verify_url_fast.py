@@ -1,22 +1,39 @@
 #!/usr/bin/env python3
 """
 verify_url_fast.py — AGGRESSIVE MODE
-✅ Anything not verified ACTIVE = SOLD
+✅ Anything not verified ACTIVE = SOLD — except a bot challenge, which is never a verdict:
+   it is retried once on a script-enabled page and otherwise left "unknown"
 ✅ No UNKNOWN bucket
 ✅ No retries
+✅ Reads/writes the item store (see item_store.py) — only the checked rows change
+✅ Checks only what the re-check schedule says is due (see recheck.py), not the whole inventory
+✅ Results still inside their TTL (ItemStore.fresh) are skipped before any request
+✅ Results go through a background checkpoint writer (see checkpoint_writer.py)
+✅ Browse getItems answers first (see api_verifier.py) — the browser only opens what it couldn't resolve
+✅ Plain HTTP GET next (see http_verifier.py); only challenges / unclear pages reach the browser
+✅ Pages come from the shared warm pool (see browser_pool.py) — no context per URL
+✅ --workers N: N processes, each with its own browser, HTTP tier and event loop, pull
+   batches of due items from one queue; results come back to ONE checkpoint writer here.
+   Each runs its rate limits at 1/N (rate_limiter.share) so together they keep the configured rate
 """
 
-import asyncio, json, os, random, re, ssl
+import asyncio, itertools, multiprocessing, os, queue, re, ssl, sys, threading
 from datetime import datetime
-from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+import browser_pool
+import http_verifier
+import rate_limiter
 from dotenv import load_dotenv
+from item_store import ItemStore
+from checkpoint_writer import CheckpointWriter
+from api_verifier import BrowseStatus
+from quota_allocator import QuotaAllocator
+import token_provider
 
 # ─── PATHS ───────────────────────────────────────────────
 BASE = "/Users/stephentaykor/Desktop/flipper_Simulation"
-ITEMS = f"{BASE}/my_items_safe/items.json"
-SOLD = f"{BASE}/my_items_safe/sold_items.json"
-URLS = f"{BASE}/my_items_safe/urls.json"
+STORE = f"{BASE}/my_items_safe/flipper_items.sqlite"
 LOG  = f"{BASE}/my_items_safe/verifier.log"
+QUOTA = f"{BASE}/my_items_safe/browse_quota.json"   # daily Browse cap shared with the scraper
 os.makedirs(f"{BASE}/my_items_safe", exist_ok=True)
 
 load_dotenv(f"{BASE}/Flipper_AI/.env")
@@ -34,107 +51,211 @@ PORTS = list(range(12321, 12331))
 
 ssl._create_default_https_context = ssl._create_unverified_context
 
-UA_STRINGS = [
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 Chrome/118 Safari/537.36",
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/118 Safari/537.36",
-]
-
 def log(msg):
     t = f"{datetime.now():%Y-%m-%d %H:%M:%S} {msg}"
     print(t)
     with open(LOG, "a") as f: f.write(t + "\n")
 
-def read(path, default): 
-    try: return json.load(open(path))
-    except: return default
-
-def write(path, data):
-    tmp = path + ".tmp"
-    with open(tmp, "w") as f: json.dump(data, f, indent=2)
-    os.replace(tmp, path)
-
 def proxy(i):
     port = PORTS[i % len(PORTS)]
     return f"http://{PROXY_USER}:{PROXY_PASS}@{PROXY_HOST}:{port}"
 
-async def check(browser, url, idx):
-    ctx = await browser.new_context(
-        user_agent=random.choice(UA_STRINGS),
-        proxy={"server": proxy(idx)} if USE_PROXIES else None,
-        viewport={"width": 1280, "height": 900}
-    )
-    page = await ctx.new_page()
-
+async def check(pool, url, idx, full=False):
     try:
-        await page.goto(url, timeout=NAV_TIMEOUT, wait_until="domcontentloaded")
-        html = (await page.content()).lower()
-
-        # ✅ Active keywords
-        active_keys = [
-            "add to cart", "buy it now", "watchlist", "place bid", "best offer",
-            "x-price-primary", "prcIsum".lower()
-        ]
-        if any(k in html for k in active_keys):
-            return "active"
-
-        # ❌ Sold keywords
-        sold_keys = [
-            "listing has ended", "listing was ended", "no longer available",
-            "ended by the seller", "sold"
-        ]
-        if any(k in html for k in sold_keys):
-            return "sold"
-
-        return "sold"  # aggressive default
+        async with pool.page(proxy(idx) if USE_PROXIES else None, full=full) as page:
+            await page.goto(url, timeout=NAV_TIMEOUT, wait_until="domcontentloaded")
+            html = (await page.content()).lower()
+            if "pardon our interruption" in html or "checking your browser" in html:
+                pool.recycle(page)   # this context is flagged — don't hand it out again
+                return "challenge"
+
+            # ✅ Active keywords
+            active_keys = [
+                "add to cart", "buy it now", "watchlist", "place bid", "best offer",
+                "x-price-primary", "prcIsum".lower()
+            ]
+            if any(k in html for k in active_keys):
+                return "active"
+
+            # ❌ Sold keywords
+            sold_keys = [
+                "listing has ended", "listing was ended", "no longer available",
+                "ended by the seller", "sold"
+            ]
+            if any(k in html for k in sold_keys):
+                return "sold"
+
+            return "sold"  # aggressive default
 
     except:
         return "sold"  # any failure = sold
-    finally:
-        await ctx.close()
 
-async def process(browser, chunk, active, sold):
+async def process(pool, pages, chunk, writer, counts, api, base=0):
     sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    known = await api.statuses([it.item_id for it in chunk])   # one API call per 20 items
 
     async def worker(i, item):
-        async with sem:
-            url = item.get("url")
-            if not url:
-                sold.append(item); return
-
-            status = await check(browser, url, i)
-            if status == "active":
-                active.append(item)
-            else:
-                item["sold_at"] = datetime.now().isoformat()
-                sold.append(item)
-                log(f"SOLD: {item.get('title','')[:80]}")
+        resolved = known.get(item.item_id)
+        if resolved:
+            (status, price), evidence = resolved, "api"
+            if price is not None:
+                item.sold_price = price
+        elif not item.url:
+            status, evidence = "sold", "no_url"
+        elif fast := await pages.status(item.url, proxy(base + i) if USE_PROXIES else None):
+            (status, price), evidence = fast, "http"
+            if price is not None:
+                item.sold_price = price
+        else:
+            async with sem:
+                status, evidence = await check(pool, item.url, base + i), "browser"
+                if status == "challenge":   # document-only page can't run the challenge — retry with scripts
+                    status = await check(pool, item.url, base + i, full=True)
+
+        if status == "active":
+            writer.checked(item.item_id, "active", evidence=evidence)
+            counts["active"] += 1
+        elif status == "challenge":
+            writer.checked(item.item_id, "unknown", evidence="bot_detected")
+            counts["unknown"] += 1
+        else:
+            item.sold_at = datetime.now().isoformat()
+            writer.sold(item, evidence=evidence)
+            counts["sold"] += 1
+            log(f"SOLD: {(item.title or '')[:80]}")
 
     await asyncio.gather(*(worker(i,it) for i,it in enumerate(chunk)))
 
+def uncached(store, rows, counts):
+    """Next batch of due items, minus those with a result still inside its TTL ([] when done)."""
+    while batch := list(itertools.islice(rows, BATCH)):
+        cached = store.fresh(it.item_id for it in batch)
+        counts["cached"] += len(cached)
+        if batch := [it for it in batch if it.item_id not in cached]:
+            return batch
+    return []
+
 async def main():
     log("🚀 Aggressive verifier started")
 
-    items = read(ITEMS, [])
-    sold_hist = read(SOLD, [])
-    active, sold = [], []
+    store = ItemStore(STORE, seed_dir=f"{BASE}/my_items_safe")
+    rows = store.due(typed=True)   # only items due a re-check (see recheck.py), soonest first
+    log(f"{store.count_due()} of {store.count()} items due")
+    writer = CheckpointWriter(STORE, log=log)
+    counts = {"active": 0, "sold": 0, "unknown": 0, "cached": 0}
+
+    pool = await browser_pool.shared(contexts_per_proxy=max(1, MAX_CONCURRENCY // len(PORTS)))
+    pages = await http_verifier.shared(log=log)
+    async with BrowseStatus(token_provider.get_token(), log=log, quota=QuotaAllocator(QUOTA, log=log)) as api:
+        while chunk := uncached(store, rows, counts):
+            # Results are queued; the writer flushes them on its own schedule
+            await process(pool, pages, chunk, writer, counts, api)
+            log(f"Batch done: active={counts['active']}, sold={counts['sold']} | API {api.stats} | HTTP {pages.stats} | pool {pool.stats}")
+    await http_verifier.close_shared()
+    await browser_pool.close_shared()
 
-    async with async_playwright() as pw:
-        browser = await pw.chromium.launch(headless=True)
-        chunks = [items[i:i+BATCH] for i in range(0, len(items), BATCH)]
+    writer.close()
+    log(f"✅ DONE | Active={counts['active']} | Sold={counts['sold']} | Unknown={counts['unknown']} | Cached={counts['cached']} | Sold total={store.count_sold()}")
+    store.close()
 
-        for chunk in chunks:
-            await process(browser, chunk, active, sold)
-            sold_hist.extend(sold)
+# ─── --workers N ─────────────────────────────────────────
+class ResultQueue:
+    """Writer stand-in inside a worker process — results go back to the parent's CheckpointWriter."""
+    def __init__(self, q):
+        self.q = q
+
+    def sold(self, item, evidence=None):
+        self.q.put(("sold", (item, evidence)))
+
+    def checked(self, item_id, status, sold_price=None, evidence=None):
+        self.q.put(("checked", (item_id, status, sold_price, evidence)))
+
+async def worker_loop(n, work, results):
+    writer, counts = ResultQueue(results), {"active": 0, "sold": 0, "unknown": 0}
+    pool = await browser_pool.shared(contexts_per_proxy=max(1, MAX_CONCURRENCY // len(PORTS)))
+    pages = await http_verifier.shared(log=log)
+    try:
+        async with BrowseStatus(token_provider.get_token(), log=log, quota=QuotaAllocator(QUOTA, log=log)) as api:
+            while (chunk := await asyncio.to_thread(work.get)) is not None:
+                await process(pool, pages, chunk, writer, counts, api, base=n)   # proxies staggered per worker
+                log(f"[worker {n}] Batch done: active={counts['active']}, sold={counts['sold']} | HTTP {pages.stats} | pool {pool.stats}")
+    finally:
+        await http_verifier.close_shared()
+        await browser_pool.close_shared()
+        results.put(("done", n))
+
+def run_worker(n, workers, work, results):
+    rate_limiter.share(workers)   # buckets are per process — split the rates between the workers
+    asyncio.run(worker_loop(n, work, results))
+
+def run_sharded(n):
+    log(f"🚀 Aggressive verifier started with {n} worker processes")
+
+    store = ItemStore(STORE, seed_dir=f"{BASE}/my_items_safe")
+    rows = store.due(typed=True)
+    log(f"{store.count_due()} of {store.count()} items due")
+    writer = CheckpointWriter(STORE, log=log)   # the only process that writes the store
+    counts = {"active": 0, "sold": 0, "unknown": 0, "cached": 0}
+
+    work, results = multiprocessing.Queue(maxsize=2 * n), multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=run_worker, args=(w, n, work, results), name=f"verifier-{w}")
+             for w in range(n)]
+    for p in procs:
+        p.start()
+
+    def alive():
+        return any(p.is_alive() for p in procs)
+
+    def drain():
+        done = 0
+        while done < n:
+            try:
+                kind, payload = results.get(timeout=5)
+            except queue.Empty:
+                if not alive():
+                    return   # a worker died without saying so
+                continue
+            if kind == "sold":
+                item, ev = payload
+                writer.sold(item, evidence=ev)
+                counts["sold"] += 1
+            elif kind == "checked":
+                item_id, status, sold_price, ev = payload
+                writer.checked(item_id, status, sold_price, evidence=ev)
+                counts[status] += 1
+            else:
+                done += 1
 
-            write(ITEMS, active)
-            write(SOLD, sold_hist)
-            write(URLS, [x["url"] for x in active])
+    drainer = threading.Thread(target=drain, name="verifier-results", daemon=True)
+    drainer.start()
 
-            log(f"Batch done: active={len(active)}, sold={len(sold_hist)}")
+    # The store is read here only — a bounded queue keeps at most 2 batches per worker in flight
+    def put(msg):
+        while alive():
+            try:
+                work.put(msg, timeout=5)
+                return True
+            except queue.Full:
+                continue
+        return False
 
-        await browser.close()
+    while chunk := uncached(store, rows, counts):
+        if not put(chunk):
+            log("❌ All workers exited early")
+            break
+    for _ in procs:
+        put(None)
+    drainer.join()
+    for p in procs:
+        p.join()
 
-    log(f"✅ DONE | Active={len(active)} | Sold={len(sold_hist)}")
+    writer.close()
+    log(f"✅ DONE | Active={counts['active']} | Sold={counts['sold']} | Unknown={counts['unknown']} | Cached={counts['cached']} | Sold total={store.count_sold()}")
+    store.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    n = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else 1
+    if n == 1:
+        asyncio.run(main())
+    else:
+        run_sharded(n)
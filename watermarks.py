@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+watermarks.py
+Per-query incremental watermarks + page cursor for the Browse sweep.
+
+✅ One watermark per (category, condition, keyword) instead of one global last_scrape
+✅ Each cycle pins its window: itemStartDate:[watermark..window_end]
+✅ Page cursor saved (atomically) after every page
+✅ A crash resumes the same window at the saved offset
+✅ Watermark only moves forward once a window has been fully paged
+✅ A window deeper than Browse's offset cap shrinks to end at the oldest listing paged,
+   so the rest is fetched next cycle instead of retrying an offset Browse refuses
+✅ Several workers can share the file — each save merges only the keys it touched
+
+State file layout:
+    {"<query key>": {"watermark": "2025-10-27T01:00:00.000Z",
+                     "window_end": "2025-10-27T03:00:00.000Z" | null,
+                     "offset": 400,
+                     "oldest": "2025-10-27T01:40:12.000Z"}}   # start date of the last listing paged
+"""
+
+import json, os
+from datetime import datetime, timezone
+from shard_leases import file_lock
+
+DEFAULT_SINCE = "NOW/HOUR-2"   # first run for a query with no watermark at all
+
+def utc_stamp(dt=None):
+    """Browse filter timestamp (ISO 8601, UTC, millis, Z)."""
+    dt = (dt or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+class WatermarkStore:
+    def __init__(self, path, seed=None, log=print):
+        """`seed` is the watermark used for queries that have never completed a window."""
+        self.path = path
+        self.seed = seed
+        self.log = log
+        self.state = self._read()
+        self._dirty = set()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            self.log(f"⚠️ Could not read {self.path}: {e} — starting without watermarks")
+            return {}
+
+    def save(self):
+        # Other workers own other keys — write ours over the latest file, not our old copy
+        with file_lock(self.path):
+            disk = self._read()
+            disk.update({k: self.state[k] for k in self._dirty})
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(disk, f, indent=2)
+            os.replace(tmp, self.path)
+        self._dirty.clear()
+
+    def plan(self, queries, now=None):
+        """Add the itemStartDate window, stable sort and resume offset to each query."""
+        window_end = utc_stamp(now)
+        resumed = 0
+        self.state.update(self._read())   # a reclaimed shard's cursor was saved by another worker
+        for q in queries:
+            self._dirty.add(q["key"])
+            st = self.state.setdefault(q["key"], {"watermark": self.seed, "window_end": None, "offset": 0})
+            if st.get("window_end"):
+                resumed += st.get("offset", 0) > 0
+            else:
+                st["window_end"], st["offset"] = window_end, 0
+            since = st.get("watermark") or DEFAULT_SINCE
+            q["params"]["filter"] += f",itemStartDate:[{since}..{st['window_end']}]"
+            q["params"]["sort"] = "newlyListed"
+            q["start_offset"] = st.get("offset", 0)
+        self.save()
+        if resumed:
+            self.log(f"📊 Resuming {resumed} queries from their saved page cursor")
+        return queries
+
+    def page_done(self, query, offset, count, oldest=None):
+        st = self.state[query["key"]]
+        st["offset"] = offset + count
+        if oldest:
+            st["oldest"] = oldest
+        self._dirty.add(query["key"])
+        self.save()
+
+    def query_done(self, query, complete):
+        """Complete window → watermark = window_end, cursor cleared. Otherwise keep the cursor."""
+        st = self.state[query["key"]]
+        if not complete:
+            if query.get("truncated") and st.get("oldest"):
+                # Sorted newest first: everything after `oldest` is in — page the older part next
+                st["window_end"], st["offset"] = st.pop("oldest"), 0
+                self._dirty.add(query["key"])
+                self.save()
+            return
+        st["watermark"], st["window_end"], st["offset"] = st["window_end"], None, 0
+        st.pop("oldest", None)
+        self._dirty.add(query["key"])
+        self.save()